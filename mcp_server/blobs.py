@@ -0,0 +1,436 @@
+from __future__ import annotations
+
+import atexit
+import contextvars
+import hashlib
+import mmap
+import os
+import re
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, Optional, Set, Tuple
+
+from .config import ServerConfig
+from .vfs import file_metadata, get_vfs_cache, vfs_path
+
+PREVIEW_BYTES = 256
+COPY_CHUNK_BYTES = 1024 * 1024
+
+# (client_id, VFS path, size, mtime) as reported by vfs_files().
+BlobKey = Tuple[str, str, int, str]
+
+
+class BlobTooLarge(ValueError):
+    """
+    Raised by BlobStore.put for content larger than the whole store.
+
+    With `put(handover=True)` it carries the download so far: `partial`, a file
+    holding every byte read, and `rest`, the unread remainder of the chunks. The
+    catcher owns both and must delete `partial`.
+    """
+
+    def __init__(
+        self,
+        message: str,
+        partial: Optional[Path] = None,
+        rest: Optional[Iterator[bytes]] = None,
+    ):
+        super().__init__(message)
+        self.partial = partial
+        self.rest = rest
+
+
+class BlobStore:
+    """
+    Content-addressed store of downloaded files under `directory`, named by SHA-256.
+
+    Identical content downloaded from many clients is kept once. An index maps
+    (client_id, path, size, mtime) to a hash, so re-downloading an unchanged file
+    is served locally. Blobs are evicted least recently used once their total size
+    would exceed `max_bytes`; blob files already in `directory` are adopted on start
+    (their index entries are not, they come back with the next download). Content
+    larger than `max_bytes` is refused rather than emptying the store, and blobs
+    pinned by lookup/put stay until unpinned.
+    Ranges are read through mmap so only the pages touched are loaded.
+    """
+
+    def __init__(self, directory: str, max_bytes: int):
+        if directory:
+            self.directory = Path(directory)
+            self.directory.mkdir(parents=True, exist_ok=True)
+        else:
+            self.directory = Path(tempfile.mkdtemp(prefix="mcp-blobs-"))
+            atexit.register(shutil.rmtree, self.directory, True)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._blobs: "OrderedDict[str, int]" = OrderedDict()
+        self._index: Dict[BlobKey, str] = {}
+        self._keys: Dict[str, Set[BlobKey]] = {}
+        self._pins: Dict[str, int] = {}
+        self._bytes = 0
+        self._stats = {"hits": 0, "misses": 0, "deduplicated": 0, "evictions": 0}
+        self._adopt()
+
+    def _adopt(self) -> None:
+        found = []
+        for path in self.directory.glob("??/*"):
+            if len(path.name) == 64 and path.is_file():
+                stat = path.stat()
+                found.append((stat.st_mtime, path.name, stat.st_size))
+        for _, sha256, size in sorted(found):
+            self._blobs[sha256] = size
+            self._bytes += size
+        with self._lock:
+            self._evict_locked(0)
+
+    def path(self, sha256: str) -> Path:
+        return self.directory / sha256[:2] / sha256
+
+    def _evict_locked(self, incoming: int) -> None:
+        for sha256 in list(self._blobs):
+            if self._bytes + incoming <= self.max_bytes:
+                break
+            if self._pins.get(sha256):
+                continue
+            self._bytes -= self._blobs.pop(sha256)
+            self.path(sha256).unlink(missing_ok=True)
+            for key in self._keys.pop(sha256, ()):
+                del self._index[key]
+            self._stats["evictions"] += 1
+
+    def lookup(self, key: BlobKey, pin: bool = False) -> Optional[str]:
+        """
+        Hash of the blob stored for `key`, marking it recently used; None on a miss.
+
+        With `pin` the blob is not evicted until `unpin`.
+        """
+        with self._lock:
+            sha256 = self._index.get(key)
+            if sha256 is None or sha256 not in self._blobs:
+                self._stats["misses"] += 1
+                return None
+            self._blobs.move_to_end(sha256)
+            self._stats["hits"] += 1
+            if pin:
+                self._pins[sha256] = self._pins.get(sha256, 0) + 1
+            return sha256
+
+    def unpin(self, sha256: str) -> None:
+        with self._lock:
+            left = self._pins.pop(sha256, 1) - 1
+            if left:
+                self._pins[sha256] = left
+
+    def put(
+        self,
+        chunks: Iterable[bytes],
+        key: Optional[BlobKey] = None,
+        pin: bool = False,
+        handover: bool = False,
+    ) -> Tuple[str, int]:
+        """
+        Stream `chunks` into the store, hashing as they are written.
+
+        Returns (sha256, size). Content already stored is not kept twice. Raises
+        BlobTooLarge once the content exceeds `max_bytes`; it stops reading `chunks`
+        unless `handover` passes the bytes read and the rest of the stream to the
+        caller through the exception. With `pin` the blob is not evicted until
+        `unpin`.
+        """
+        tmp = self.directory / f".{uuid.uuid4().hex}.partial"
+        digest = hashlib.sha256()
+        size = 0
+        stream = iter(chunks)
+        try:
+            with open(tmp, "wb") as fh:
+                for chunk in stream:
+                    size += len(chunk)
+                    if size > self.max_bytes:
+                        message = (
+                            f"Content exceeds the blob store ({self.max_bytes} bytes)"
+                        )
+                        if handover:
+                            fh.write(chunk)
+                            fh.close()
+                            handed, tmp = tmp, None
+                            raise BlobTooLarge(message, partial=handed, rest=stream)
+                        close = getattr(stream, "close", None)
+                        if close:
+                            close()
+                        raise BlobTooLarge(message)
+                    digest.update(chunk)
+                    fh.write(chunk)
+            sha256 = digest.hexdigest()
+            with self._lock:
+                if sha256 in self._blobs:
+                    self._blobs.move_to_end(sha256)
+                    self._stats["deduplicated"] += 1
+                    tmp.unlink()
+                else:
+                    self._evict_locked(size)
+                    dest = self.path(sha256)
+                    dest.parent.mkdir(exist_ok=True)
+                    os.replace(tmp, dest)
+                    self._blobs[sha256] = size
+                    self._bytes += size
+                if key is not None:
+                    old = self._index.get(key)
+                    if old is not None:
+                        self._keys[old].discard(key)
+                    self._index[key] = sha256
+                    self._keys.setdefault(sha256, set()).add(key)
+                if pin:
+                    self._pins[sha256] = self._pins.get(sha256, 0) + 1
+        except BaseException:
+            if tmp is not None:
+                tmp.unlink(missing_ok=True)
+            raise
+        return sha256, size
+
+    def read(self, sha256: str, offset: int = 0, length: int = 0) -> bytes:
+        """Bytes [offset, offset+length) of a blob (to the end when length is 0)."""
+        with self._lock:
+            if sha256 not in self._blobs:
+                raise KeyError(f"Unknown blob: {sha256}")
+            self._blobs.move_to_end(sha256)
+        try:
+            fh = open(self.path(sha256), "rb")
+        except FileNotFoundError:
+            # Evicted between the check above and the open.
+            raise KeyError(f"Unknown blob: {sha256}") from None
+        with fh:
+            size = os.fstat(fh.fileno()).st_size
+            if size == 0 or offset >= size:
+                return b""
+            end = size if not length else min(size, offset + length)
+            with mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                return mm[offset:end]
+
+    def copy_to(self, sha256: str, dest: Path, offset: int = 0, length: int = 0) -> int:
+        """Copy bytes [offset, offset+length) of a blob to `dest`; returns bytes written."""
+        with self._lock:
+            if sha256 not in self._blobs:
+                raise KeyError(f"Unknown blob: {sha256}")
+            self._blobs.move_to_end(sha256)
+        try:
+            src = open(self.path(sha256), "rb")
+        except FileNotFoundError:
+            raise KeyError(f"Unknown blob: {sha256}") from None
+        written = 0
+        with src, open(dest, "wb") as dst:
+            src.seek(offset)
+            while not length or written < length:
+                want = (
+                    COPY_CHUNK_BYTES
+                    if not length
+                    else min(COPY_CHUNK_BYTES, length - written)
+                )
+                data = src.read(want)
+                if not data:
+                    break
+                dst.write(data)
+                written += len(data)
+        return written
+
+    def size(self, sha256: str) -> int:
+        with self._lock:
+            return self._blobs.get(sha256, 0)
+
+    def describe(self, sha256: str, cached: bool) -> Dict[str, Any]:
+        """Hash, size, local path and a short hex preview of a stored blob."""
+        return {
+            "sha256": sha256,
+            "size": self.size(sha256),
+            "blob_path": str(self.path(sha256)),
+            "cached": cached,
+            "preview_hex": self.read(sha256, 0, PREVIEW_BYTES).hex(),
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                **self._stats,
+                "blobs": len(self._blobs),
+                "indexed": len(self._index),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "directory": str(self.directory),
+            }
+
+
+def indexed_metadata(
+    cfg: ServerConfig, client, client_id: str, path: str, tool: str
+) -> Optional[Dict[str, Any]]:
+    """
+    The file's vfs_files() row when the VFS cache can supply it, else None.
+
+    Without the cache every lookup would cost a parent directory listing per
+    download, so files are then fetched without consulting the index.
+    """
+    if get_vfs_cache(cfg) is None:
+        return None
+    return file_metadata(cfg, client, client_id, path, tool=tool)
+
+
+def _blob_key(
+    client_id: str, path: str, metadata: Optional[Dict[str, Any]]
+) -> Optional[BlobKey]:
+    if not metadata or metadata.get("Size") is None:
+        return None
+    mtime = metadata.get("Mtime") or metadata.get("mtime") or ""
+    return (client_id, vfs_path(path), int(metadata["Size"]), str(mtime))
+
+
+def lookup_vfs_file(
+    store: BlobStore, client_id: str, path: str, metadata: Optional[Dict[str, Any]]
+) -> Optional[str]:
+    """
+    Hash of the stored copy of `path` when `metadata` (its vfs_files() row) shows
+    it unchanged, pinned for the caller to `store.unpin`; None otherwise.
+    """
+    key = _blob_key(client_id, path, metadata)
+    return store.lookup(key, pin=True) if key is not None else None
+
+
+def store_vfs_file(
+    store: BlobStore,
+    client,
+    client_id: str,
+    path: str,
+    metadata: Optional[Dict[str, Any]],
+    handover: bool = False,
+) -> Tuple[str, bool]:
+    """
+    Hash of `path` on `client_id` in the store, downloading it only when needed.
+
+    `metadata` is the file's vfs_files() row; with its Size and Mtime an unchanged
+    file is served from the index. Returns (sha256, served_from_store); the blob is
+    pinned and the caller must `store.unpin` it when done reading. `handover` is
+    passed to BlobStore.put for files larger than the store.
+    """
+    sha256 = lookup_vfs_file(store, client_id, path, metadata)
+    if sha256 is not None:
+        return sha256, True
+    key = _blob_key(client_id, path, metadata)
+    sha256, _ = store.put(
+        client.iter_download(client_id, path), key, pin=True, handover=handover
+    )
+    return sha256, False
+
+
+CLIENT_ID = re.compile(r"C\.[0-9a-f]+")
+
+
+def dest_for(dest_dir: Path, client_id: str, path: str) -> Path:
+    """
+    <dest_dir>/<client_id>/<VFS path> for a downloaded file.
+
+    Raises ValueError for a malformed client_id or a path that would resolve
+    outside `dest_dir` (".." components, symlinks).
+    """
+    if not CLIENT_ID.fullmatch(client_id):
+        raise ValueError(f"Invalid client_id {client_id!r}")
+    root = dest_dir.resolve()
+    dest = (root / client_id / vfs_path(path).lstrip("/")).resolve()
+    if not dest.is_relative_to(root / client_id) or dest == root / client_id:
+        raise ValueError(f"Path {path!r} escapes the destination directory")
+    return dest
+
+
+def _acquire_one(
+    cfg: ServerConfig,
+    store: BlobStore,
+    client,
+    client_id: str,
+    path: str,
+    dest_dir: Optional[Path],
+) -> Dict[str, Any]:
+    entry: Dict[str, Any] = {"client_id": client_id, "path": path}
+    try:
+        # Reject a bad destination before anything is downloaded.
+        dest = dest_for(dest_dir, client_id, path) if dest_dir is not None else None
+        try:
+            metadata = indexed_metadata(cfg, client, client_id, path, "download_files")
+        except Exception:
+            # Without metadata the file is still fetched, just not indexed.
+            metadata = None
+        sha256, cached = store_vfs_file(store, client, client_id, path, metadata)
+        try:
+            entry.update(
+                sha256=sha256,
+                size=store.size(sha256),
+                cached=cached,
+                blob_path=str(store.path(sha256)),
+            )
+            if dest is not None:
+                dest.parent.mkdir(parents=True, exist_ok=True)
+                store.copy_to(sha256, dest)
+                entry["dest_path"] = str(dest)
+        finally:
+            store.unpin(sha256)
+    except Exception as exc:
+        entry["error"] = str(exc)
+    return entry
+
+
+def acquire_vfs_files(
+    cfg: ServerConfig,
+    store: BlobStore,
+    client,
+    targets: Iterable[Tuple[str, str]],
+    concurrency: int,
+    dest_dir: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    Fetch many (client_id, path) files into `store` with `concurrency` workers.
+
+    Repeated targets are fetched once. Returns a manifest with one entry per distinct
+    target (sha256, size, cached, blob_path and dest_path, or error) and totals;
+    `bytes` counts only bytes actually transferred. Failures do not stop the other downloads.
+    """
+    unique = list(dict.fromkeys((cid, vfs_path(path)) for cid, path in targets))
+    out_dir = Path(dest_dir).expanduser() if dest_dir else None
+    started = time.perf_counter()
+    # Workers get a copy of the caller's context so downloads keep the tool call's
+    # session and deadline.
+    context = contextvars.copy_context()
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as pool:
+        futures = [
+            pool.submit(
+                context.copy().run,
+                _acquire_one,
+                cfg,
+                store,
+                client,
+                client_id,
+                path,
+                out_dir,
+            )
+            for client_id, path in unique
+        ]
+        files = [future.result() for future in futures]
+    fetched = [f for f in files if "error" not in f and not f["cached"]]
+    return {
+        "files": files,
+        "downloaded": len(fetched),
+        "cached": sum(1 for f in files if f.get("cached")),
+        "failed": sum(1 for f in files if "error" in f),
+        "unique_blobs": len({f["sha256"] for f in files if "sha256" in f}),
+        "bytes": sum(f["size"] for f in fetched),
+        "elapsed_seconds": round(time.perf_counter() - started, 3),
+    }
+
+
+@lru_cache(maxsize=1)
+def get_blob_store(cfg: ServerConfig) -> Optional[BlobStore]:
+    """Process-wide blob store, or None when MCP_BLOB_STORE_BYTES is 0."""
+    if cfg.blob_store_bytes <= 0:
+        return None
+    return BlobStore(cfg.blob_dir, cfg.blob_store_bytes)
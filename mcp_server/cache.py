@@ -0,0 +1,236 @@
+from __future__ import annotations
+
+import json
+import re
+import threading
+import time
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from .config import ServerConfig
+
+Rows = List[Dict[str, Any]]
+
+# Mutating VQL functions and the read plugins whose cached results they make stale.
+INVALIDATES: Dict[str, Tuple[str, ...]] = {
+    "hunt": ("hunts", "hunt_results", "flows"),
+    "hunt_delete": ("hunts", "hunt_results"),
+    "collect_client": ("flows", "source", "clients"),
+    "artifact_set": ("artifact_definitions",),
+}
+
+_MUTATING = re.compile(r"\b(" + "|".join(INVALIDATES) + r")\s*\(")
+# Event queries stream until cancelled rather than returning a finite result.
+_EVENT_QUERY = re.compile(r"\bwatch_monitoring\s*\(")
+_WHITESPACE = re.compile(r"\s+")
+# Triple-quoted, single-quoted ('' escapes) and double-quoted strings, then numbers.
+_LITERALS = re.compile(
+    r"'''.*?'''" r"|'(?:[^']|'')*'" r'|"(?:[^"\\]|\\.)*"' r"|\b\d+(?:\.\d+)?\b",
+    re.S,
+)
+
+
+# Callbacks told which mutating functions a finished statement called, for local
+# indexes kept outside the query cache (e.g. the artifact catalog).
+_MUTATION_LISTENERS: List[Callable[[List[str]], None]] = []
+
+
+def on_mutation(listener: Callable[[List[str]], None]) -> None:
+    _MUTATION_LISTENERS.append(listener)
+
+
+def notify_mutation(functions: List[str]) -> None:
+    for listener in list(_MUTATION_LISTENERS):
+        listener(functions)
+
+
+def normalize_vql(vql: str) -> str:
+    """Collapse whitespace so formatting differences share one cache entry."""
+    return _WHITESPACE.sub(" ", vql).strip()
+
+
+def statement_shape(vql: str) -> str:
+    """Normalized VQL with string and numeric literals replaced by `?`."""
+    return normalize_vql(_LITERALS.sub("?", vql))
+
+
+def mutating_functions(vql: str) -> List[str]:
+    """Names of mutating functions (hunt(, collect_client(, ...) called by `vql`."""
+    return sorted(set(_MUTATING.findall(vql)))
+
+
+def is_event_query(vql: str) -> bool:
+    """True for watch_monitoring() streams, which run for the life of the watcher."""
+    return _EVENT_QUERY.search(vql) is not None
+
+
+class _InFlight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.rows: Optional[Rows] = None
+        self.error: Optional[BaseException] = None
+        # Wake-ups of coalesced callers, also set when their own call is cancelled.
+        self.waiters: List[threading.Event] = []
+        # Bumped by every invalidation that hits this key while the load runs; a
+        # load that started at generation 0 and ends above it must not be cached.
+        self.generation = 0
+
+    def finish(self) -> None:
+        self.done.set()
+        for event in list(self.waiters):
+            event.set()
+
+    def wait(self, call: Any = None) -> None:
+        """
+        Block until the load finishes, or until `call` (the waiting tool call's
+        scheduler CallContext) is cancelled or reaches its deadline.
+        """
+        if call is None:
+            self.done.wait()
+            return
+        event = threading.Event()
+        self.waiters.append(event)
+        unregister = call.on_cancel(event.set)
+        try:
+            if not self.done.is_set():
+                event.wait(call.remaining())
+        finally:
+            unregister()
+            self.waiters.remove(event)
+        if not self.done.is_set():
+            from .scheduler import QueryCancelled, QueryDeadlineExceeded
+
+            if call.cancelled:
+                raise QueryCancelled(f"{call.tool or 'query'} was cancelled")
+            raise QueryDeadlineExceeded(f"{call.tool or 'query'} ran out of time")
+
+
+class QueryCache:
+    """
+    Memory-bounded LRU of read-only query results keyed on (org_id, normalized VQL).
+
+    Identical concurrent loads are coalesced: the first caller runs the query and the
+    others wait for its rows instead of opening their own gRPC stream, each within
+    its own tool call's deadline and cancellation. A load invalidated while in
+    flight still answers its callers but is not cached.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[float, int, Rows]]" = (
+            OrderedDict()
+        )
+        self._inflight: Dict[Tuple[str, str], _InFlight] = {}
+        self._bytes = 0
+        self._stats = {
+            "hits": 0,
+            "misses": 0,
+            "coalesced": 0,
+            "evictions": 0,
+            "invalidations": 0,
+            "stale_loads": 0,
+        }
+
+    def _evict_locked(self) -> None:
+        while self._bytes > self.max_bytes and self._entries:
+            _, (_, size, _) = self._entries.popitem(last=False)
+            self._bytes -= size
+            self._stats["evictions"] += 1
+
+    def _store(
+        self, key: Tuple[str, str], ttl: float, rows: Rows, flight: _InFlight
+    ) -> None:
+        size = len(json.dumps(rows, default=str))
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if flight.generation:
+                # Invalidated while loading: the rows may predate the mutation.
+                self._stats["stale_loads"] += 1
+                return
+            old = self._entries.pop(key, None)
+            if old:
+                self._bytes -= old[1]
+            self._entries[key] = (time.monotonic() + ttl, size, rows)
+            self._bytes += size
+            self._evict_locked()
+
+    def get_or_load(
+        self,
+        org_id: str,
+        vql: str,
+        ttl: float,
+        loader: Callable[[], Iterable[Any]],
+        call: Any = None,
+    ) -> Rows:
+        key = (org_id, normalize_vql(vql))
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[0] > time.monotonic():
+                self._entries.move_to_end(key)
+                self._stats["hits"] += 1
+                return entry[2]
+            flight = self._inflight.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._inflight[key] = _InFlight()
+                self._stats["misses"] += 1
+            else:
+                self._stats["coalesced"] += 1
+        if not leader:
+            flight.wait(call)
+            if flight.error is not None:
+                raise flight.error
+            return flight.rows or []
+        try:
+            flight.rows = list(loader())
+            self._store(key, ttl, flight.rows, flight)
+            return flight.rows
+        except BaseException as exc:
+            flight.error = exc
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+            flight.finish()
+
+    def invalidate(self, plugins: Iterable[str]) -> int:
+        """Drop cached entries whose VQL reads any of `plugins`."""
+        patterns = [re.compile(r"\b" + re.escape(p) + r"\s*\(") for p in plugins]
+        with self._lock:
+            stale = [
+                key for key in self._entries if any(p.search(key[1]) for p in patterns)
+            ]
+            for key in stale:
+                self._bytes -= self._entries.pop(key)[1]
+            self._stats["invalidations"] += len(stale)
+            for key, flight in self._inflight.items():
+                if any(p.search(key[1]) for p in patterns):
+                    flight.generation += 1
+        return len(stale)
+
+    def invalidate_for(self, vql: str) -> int:
+        """Invalidate whatever the mutating functions in `vql` affect."""
+        plugins = [p for fn in mutating_functions(vql) for p in INVALIDATES[fn]]
+        return self.invalidate(plugins) if plugins else 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self._stats["hits"] + self._stats["misses"]
+            return {
+                **self._stats,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hit_rate": self._stats["hits"] / lookups if lookups else None,
+            }
+
+
+@lru_cache(maxsize=1)
+def get_query_cache(cfg: ServerConfig) -> Optional[QueryCache]:
+    """Process-wide query cache, or None when MCP_QUERY_CACHE_BYTES is 0."""
+    if cfg.query_cache_bytes <= 0:
+        return None
+    return QueryCache(cfg.query_cache_bytes)
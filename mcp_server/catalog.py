@@ -0,0 +1,201 @@
+from __future__ import annotations
+
+import bisect
+import heapq
+import math
+import re
+import threading
+import time
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
+
+from .cache import on_mutation
+from .client import VelociraptorClient, get_client
+from .config import ServerConfig
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+# Splits camelCase / PascalCase words so "PrefetchFiles" also matches "prefetch".
+_CAMEL = re.compile(r"(?<=[a-z0-9])(?=[A-Z])")
+
+# Score weight of a token by the field it was found in.
+FIELD_WEIGHTS: Tuple[Tuple[str, float], ...] = (
+    ("name", 8.0),
+    ("parameters", 3.0),
+    ("description", 2.0),
+    ("sources", 1.0),
+)
+SUMMARY_FIELDS = ("name", "description", "type")
+
+
+def tokenize(text: str) -> List[str]:
+    return _TOKEN.findall(_CAMEL.sub(" ", text).lower())
+
+
+def _source_text(source: Dict[str, Any]) -> str:
+    queries = source.get("queries") or []
+    return " ".join([str(source.get("query") or ""), *map(str, queries)])
+
+
+def artifact_fields(row: Dict[str, Any]) -> Dict[str, str]:
+    """Searchable text of one artifact_definitions() row, per field."""
+    params = row.get("parameters") or []
+    sources = row.get("sources") or []
+    return {
+        "name": str(row.get("name") or ""),
+        "description": str(row.get("description") or ""),
+        "parameters": " ".join(
+            str(p.get("name") or "") for p in params if isinstance(p, dict)
+        ),
+        "sources": " ".join(_source_text(s) for s in sources if isinstance(s, dict)),
+    }
+
+
+class ArtifactCatalog:
+    """
+    Local index of artifact_definitions(), searched without a server round trip.
+
+    The whole table is pulled by one query on first use and again once it is older
+    than `ttl` seconds or after any statement calling artifact_set(). An inverted
+    index over names, descriptions, parameter names and source VQL answers ranked
+    keyword searches: every query term must match a token (as a prefix), and matches
+    are scored by field weight and inverse document frequency.
+    """
+
+    def __init__(self, client: VelociraptorClient, ttl: float):
+        self.client = client
+        self.ttl = ttl
+        self._lock = threading.RLock()
+        self._summaries: List[Dict[str, Any]] = []
+        # token -> {artifact index: best field weight}
+        self._postings: Dict[str, Dict[int, float]] = {}
+        self._tokens: List[str] = []
+        self._by_name: Dict[str, int] = {}
+        self._loaded_at: Optional[float] = None
+        self._stale = True
+        self._stats: Dict[str, Any] = {
+            "searches": 0,
+            "refreshes": 0,
+            "invalidations": 0,
+            "last_refresh_seconds": None,
+        }
+        on_mutation(self._on_mutation)
+
+    def _on_mutation(self, functions: List[str]) -> None:
+        if "artifact_set" in functions:
+            self.invalidate()
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._stale = True
+            self._stats["invalidations"] += 1
+
+    def refresh(self) -> int:
+        """Reload every artifact definition and rebuild the index."""
+        started = time.monotonic()
+        rows = list(self.client.query("SELECT * FROM artifact_definitions()"))
+        summaries: List[Dict[str, Any]] = []
+        postings: Dict[str, Dict[int, float]] = {}
+        for row in sorted(rows, key=lambda r: str(r.get("name") or "")):
+            doc = len(summaries)
+            summaries.append({k: row.get(k) for k in SUMMARY_FIELDS})
+            fields = artifact_fields(row)
+            for field, weight in FIELD_WEIGHTS:
+                for token in set(tokenize(fields[field])):
+                    docs = postings.setdefault(token, {})
+                    docs[doc] = max(docs.get(doc, 0.0), weight)
+        with self._lock:
+            self._summaries = summaries
+            self._postings = postings
+            self._tokens = sorted(postings)
+            self._by_name = {
+                str(row["name"] or "").lower(): doc for doc, row in enumerate(summaries)
+            }
+            self._loaded_at = time.monotonic()
+            self._stale = False
+            self._stats["refreshes"] += 1
+            self._stats["last_refresh_seconds"] = round(time.monotonic() - started, 6)
+        return len(summaries)
+
+    def _ensure_fresh(self) -> None:
+        with self._lock:
+            expired = self._loaded_at is None or (
+                self.ttl > 0 and time.monotonic() - self._loaded_at >= self.ttl
+            )
+            if not (self._stale or expired):
+                return
+            self.refresh()
+
+    def _term_scores(self, term: str) -> Dict[int, float]:
+        """Best weighted idf per artifact over the tokens starting with `term`."""
+        scores: Dict[int, float] = {}
+        total = len(self._summaries)
+        start = bisect.bisect_left(self._tokens, term)
+        for token in self._tokens[start:]:
+            if not token.startswith(term):
+                break
+            docs = self._postings[token]
+            idf = math.log(1 + total / len(docs))
+            # Whole-token matches rank above prefix matches.
+            exact = 1.0 if token == term else 0.5
+            for doc, weight in docs.items():
+                scores[doc] = max(scores.get(doc, 0.0), weight * idf * exact)
+        return scores
+
+    def search(
+        self, query: Optional[str] = None, limit: int = 200
+    ) -> List[Dict[str, Any]]:
+        """Artifacts matching every term of `query`, best first (all, by name, if empty)."""
+        self._ensure_fresh()
+        with self._lock:
+            self._stats["searches"] += 1
+            terms = list(dict.fromkeys(tokenize(query or "")))
+            if not terms:
+                return [dict(s) for s in self._summaries[:limit]]
+            ranked: Optional[Dict[int, float]] = None
+            for term in terms:
+                scores = self._term_scores(term)
+                if ranked is None:
+                    ranked = scores
+                else:
+                    ranked = {
+                        d: s + scores[d] for d, s in ranked.items() if d in scores
+                    }
+                if not ranked:
+                    return []
+            exact = self._by_name.get((query or "").strip().lower())
+            if exact in ranked:
+                ranked[exact] += 100.0
+            best = heapq.nsmallest(limit, ranked.items(), key=lambda i: (-i[1], i[0]))
+            return [
+                {**self._summaries[doc], "score": round(score, 3)}
+                for doc, score in best
+            ]
+
+    def all(self) -> List[Dict[str, Any]]:
+        """Name, description and type of every artifact, ordered by name."""
+        self._ensure_fresh()
+        with self._lock:
+            return [dict(s) for s in self._summaries]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                **self._stats,
+                "artifacts": len(self._summaries),
+                "tokens": len(self._tokens),
+                "stale": self._stale,
+                "age_seconds": (
+                    round(time.monotonic() - self._loaded_at, 3)
+                    if self._loaded_at is not None
+                    else None
+                ),
+                "ttl_seconds": self.ttl,
+            }
+
+
+@lru_cache(maxsize=1)
+def get_artifact_catalog(cfg: ServerConfig) -> Optional[ArtifactCatalog]:
+    """Process-wide artifact index, or None when MCP_ARTIFACT_CATALOG_TTL is 0."""
+    if cfg.artifact_catalog_ttl <= 0:
+        return None
+    return ArtifactCatalog(get_client(cfg), ttl=cfg.artifact_catalog_ttl)
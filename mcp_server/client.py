@@ -1,94 +1,752 @@
 from __future__ import annotations
 
+import asyncio
+import itertools
 import json
+import math
+import random
 import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
 from functools import lru_cache
-from typing import Any, Dict, Iterable, Optional
+from pathlib import Path
+from typing import (
+    Any,
+    AsyncIterator,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Union,
+)
 
 import grpc
 
-from .config import ServerConfig
+from .cache import (
+    get_query_cache,
+    mutating_functions,
+    notify_mutation,
+    statement_shape,
+)
+from .config import QueryOptions, ServerConfig
+from .decoding import Decoder, get_decoder
+from .metrics import get_metrics
+from .profiling import get_profiler
+from .scheduler import current_call, get_scheduler, rpc_kwargs, track
+
+
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024
+# Status codes worth retrying a download on; others (NOT_FOUND, PERMISSION_DENIED,
+# INVALID_ARGUMENT, ...) fail the same way again.
+TRANSIENT_CODES = frozenset(
+    {
+        grpc.StatusCode.UNAVAILABLE,
+        grpc.StatusCode.RESOURCE_EXHAUSTED,
+        grpc.StatusCode.ABORTED,
+    }
+)
+# Upper bound for adaptively grown max_row; larger frames risk gRPC message limits.
+ADAPTIVE_MAX_ROW_CAP = 10000
 
 
 class VelociraptorUnavailable(RuntimeError):
     """Raised when the Velociraptor API cannot be reached or initialized."""
 
 
-class VelociraptorClient:
-    """Thin wrapper over Velociraptor gRPC API using pyvelociraptor protos."""
+def _import_protos():
+    try:
+        from pyvelociraptor import api_pb2, api_pb2_grpc  # type: ignore
+    except Exception as exc:  # pragma: no cover
+        raise VelociraptorUnavailable(
+            "pyvelociraptor is not installed or missing protos. Run `pip install -r requirements.txt`."
+        ) from exc
+    return api_pb2, api_pb2_grpc
+
+
+def _channel_args(cfg: ServerConfig):
+    """Load the mTLS api.config.yaml and return (api_cfg, target, credentials, options)."""
+    from pyvelociraptor import LoadConfigFile  # type: ignore
+
+    api_cfg = LoadConfigFile(str(cfg.api_config_path))
+    creds = grpc.ssl_channel_credentials(
+        root_certificates=api_cfg["ca_certificate"].encode("utf-8"),
+        private_key=api_cfg["client_private_key"].encode("utf-8"),
+        certificate_chain=api_cfg["client_cert"].encode("utf-8"),
+    )
+    return api_cfg, api_cfg["api_connection_string"], creds, _transport_options(cfg)
+
+
+def _transport_options(cfg: ServerConfig):
+    """Channel arguments for message limits, keepalive and independent connections."""
+    options = [
+        ("grpc.ssl_target_name_override", "VelociraptorServer"),
+        ("grpc.max_send_message_length", cfg.grpc_max_message_bytes),
+        ("grpc.max_receive_message_length", cfg.grpc_max_message_bytes),
+        # Without a local subchannel pool, channels with identical arguments share
+        # one HTTP/2 connection and a pool would not spread load at all.
+        ("grpc.use_local_subchannel_pool", 1),
+    ]
+    if cfg.grpc_keepalive_seconds > 0:
+        # Go gRPC servers reject pings more frequent than every 5 minutes by default,
+        # so the interval is configurable rather than aggressive.
+        options += [
+            ("grpc.keepalive_time_ms", cfg.grpc_keepalive_seconds * 1000),
+            ("grpc.keepalive_timeout_ms", 20000),
+            ("grpc.keepalive_permit_without_calls", 0),
+            ("grpc.http2.max_pings_without_data", 0),
+        ]
+    return tuple(options)
+
+
+def _compression(cfg: ServerConfig):
+    return grpc.Compression.Gzip if cfg.grpc_compression == "gzip" else None
+
+
+def _backoff_delay(attempt: int, base: float = 0.2, cap: float = 5.0) -> float:
+    """Exponential backoff with full jitter."""
+    return random.uniform(0, min(cap, base * (2**attempt)))
+
+
+def _close_channel(channel) -> None:
+    close = channel.close()
+    if asyncio.iscoroutine(close):
+        asyncio.ensure_future(close)
+
+
+def _status_code(exc: BaseException):
+    code = getattr(exc, "code", None)
+    return code() if callable(code) else None
+
+
+def _vfs_components(path: str) -> list[str]:
+    """Split a VFS path such as /file/C:/Windows/notepad.exe into its components."""
+    return [part for part in path.replace("\\", "/").split("/") if part]
+
+
+def _invalidate_cache(cfg: ServerConfig, vql: str) -> None:
+    functions = mutating_functions(vql)
+    if not functions:
+        return
+    cache = get_query_cache(cfg)
+    if cache is not None:
+        cache.invalidate_for(vql)
+    notify_mutation(functions)
+
+
+def _collector_args(
+    api_pb2,
+    api_cfg: Optional[Dict[str, Any]],
+    vql: Union[str, Dict[str, str]],
+    options: QueryOptions,
+):
+    """Build VQLCollectorArgs for one statement or a {name: vql} batch."""
+    statements = {"MCP": vql} if isinstance(vql, str) else vql
+    return api_pb2.VQLCollectorArgs(
+        org_id=api_cfg.get("org_id", "") if api_cfg else "",
+        max_wait=options.max_wait or 0,
+        max_row=options.max_row or 0,
+        timeout=options.timeout or 0,
+        ops_per_second=options.ops_per_second or 0,
+        Query=[
+            api_pb2.VQLRequest(
+                Name=name,
+                VQL=statement,
+            )
+            for name, statement in statements.items()
+        ],
+    )
+
+
+def _demux(resp, results: Dict[str, List[Dict[str, Any]]], decode: Decoder) -> int:
+    """Route one streamed frame of a batch to its statement by resp.Query.Name."""
+    if not resp.Response:
+        return 0
+    frame = decode(resp.Response)
+    results.setdefault(resp.Query.Name, []).extend(frame)
+    return len(frame)
+
+
+class AdaptiveQueryTuner:
+    """
+    Sizes collector args from the row counts previously seen for a statement shape.
+
+    Shapes that return a handful of rows are point lookups and get max_wait=1 (0 would
+    mean "server default", not "immediately"). Shapes that span many frames get
+    max_row grown so a result arrives in a few large frames, capped at
+    ADAPTIVE_MAX_ROW_CAP.
+    """
+
+    POINT_LOOKUP_ROWS = 10
+    MAX_SHAPES = 1024
+
+    def __init__(self, max_row_cap: int = ADAPTIVE_MAX_ROW_CAP):
+        self.max_row_cap = max_row_cap
+        self._lock = threading.Lock()
+        self._rows: "OrderedDict[str, float]" = OrderedDict()
+
+    def tune(self, shape: str, options: QueryOptions) -> QueryOptions:
+        with self._lock:
+            seen = self._rows.get(shape)
+        if seen is None:
+            return options
+        if seen <= self.POINT_LOOKUP_ROWS:
+            return options.merged(QueryOptions(max_wait=1))
+        max_row = options.max_row or 1000
+        if seen > 2 * max_row:
+            target = 1 << math.ceil(math.log2(seen / 4))
+            return options.merged(
+                QueryOptions(max_row=min(self.max_row_cap, max(max_row, target)))
+            )
+        return options
+
+    def observe(self, shape: str, rows: int) -> None:
+        with self._lock:
+            seen = self._rows.pop(shape, None)
+            self._rows[shape] = rows if seen is None else (seen + rows) / 2
+            while len(self._rows) > self.MAX_SHAPES:
+                self._rows.popitem(last=False)
+
+
+class _BaseClient:
+    """Channel setup and query option resolution shared by the sync and aio clients."""
 
     def __init__(self, cfg: ServerConfig):
         self.cfg = cfg
         self._lock = threading.Lock()
         self._stub = None
+        self._stubs: list = []
+        self._channels: list = []
+        # In-flight calls per stub (by id) and replaced channels awaiting them.
+        self._leases: Dict[int, int] = {}
+        self._retired: Dict[int, Any] = {}
+        self._round_robin = itertools.count()
         self._cfg = None
+        self.tuner = AdaptiveQueryTuner() if cfg.adaptive_query_options else None
+        self.reconnects = 0
+        self._decode = get_decoder(cfg.json_decoder)
+        self.metrics = get_metrics(cfg)
+        self.profiler = get_profiler(cfg)
+        self.scheduler = get_scheduler(cfg)
+
+    def _open_channel(self):  # pragma: no cover - implemented by subclasses
+        raise NotImplementedError
 
     def _ensure_stub(self):
         if self._stub:
             return
-        try:
-            from pyvelociraptor import api_pb2, api_pb2_grpc, LoadConfigFile  # type: ignore
-        except Exception as exc:  # pragma: no cover
-            raise VelociraptorUnavailable(
-                "pyvelociraptor is not installed or missing protos. Run `pip install -r requirements.txt`."
-            ) from exc
+        api_pb2, api_pb2_grpc = _import_protos()
 
         with self._lock:
             if self._stub:
                 return
             try:
-                cfg = LoadConfigFile(str(self.cfg.api_config_path))
-                creds = grpc.ssl_channel_credentials(
-                    root_certificates=cfg["ca_certificate"].encode("utf-8"),
-                    private_key=cfg["client_private_key"].encode("utf-8"),
-                    certificate_chain=cfg["client_cert"].encode("utf-8"),
-                )
-                options = (("grpc.ssl_target_name_override", "VelociraptorServer"),)
-                channel = grpc.secure_channel(cfg["api_connection_string"], creds, options)
-                self._stub = api_pb2_grpc.APIStub(channel)
-                self._cfg = cfg
+                channels = [
+                    self._open_channel() for _ in range(max(1, self.cfg.grpc_pool_size))
+                ]
             except Exception as exc:  # pragma: no cover
-                raise VelociraptorUnavailable(f"Failed to connect to Velociraptor: {exc}") from exc
+                raise VelociraptorUnavailable(
+                    f"Failed to connect to Velociraptor: {exc}"
+                ) from exc
+            self._channels = channels
+            self._stubs = [api_pb2_grpc.APIStub(channel) for channel in channels]
+            self._stub = self._stubs[0]
 
         self._api_pb2 = api_pb2
 
-    def query(self, vql: str, params: Optional[Dict[str, Any]] = None) -> Iterable[Dict[str, Any]]:
-        """Execute VQL and yield rows. Parameters should be interpolated into the VQL by caller."""
+    @contextmanager
+    def _lease(self) -> Iterator[Any]:
+        """
+        A stub for one call, round-robin over the channel pool so heavy streams
+        spread across connections.
+
+        A channel replaced while calls still run on it is closed when the last of
+        them ends.
+        """
         self._ensure_stub()
-        assert self._stub is not None
-        req = self._api_pb2.VQLCollectorArgs(
-            org_id=self._cfg.get("org_id", "") if self._cfg else "",
-            max_wait=1,
-            max_row=1000,
-            Query=[
-                self._api_pb2.VQLRequest(
-                    Name="MCP",
-                    VQL=vql,
-                )
-            ],
+        with self._lock:
+            stubs = self._stubs or [self._stub]
+            stub = stubs[next(self._round_robin) % len(stubs)]
+            self._leases[id(stub)] = self._leases.get(id(stub), 0) + 1
+        try:
+            yield stub
+        finally:
+            with self._lock:
+                left = self._leases.pop(id(stub)) - 1
+                if left:
+                    self._leases[id(stub)] = left
+                    channel = None
+                else:
+                    channel = self._retired.pop(id(stub), None)
+            if channel is not None:
+                _close_channel(channel)
+
+    def _replace_channel(self, stub) -> None:
+        """
+        Reconnect the pool slot `stub` came from; the other channels stay as they are.
+
+        Several calls failing on the same channel reconnect it once: later callers
+        find their stub already replaced and do nothing.
+        """
+        api_pb2, api_pb2_grpc = _import_protos()
+        with self._lock:
+            index = next((i for i, s in enumerate(self._stubs) if s is stub), None)
+            if index is None:
+                # Already replaced, or a stub injected without a pool (tests).
+                return
+            try:
+                channel = self._open_channel()
+            except Exception:  # pragma: no cover - the retry reports the failure
+                return
+            old, self._channels[index] = self._channels[index], channel
+            self._stubs[index] = api_pb2_grpc.APIStub(channel)
+            self._stub = self._stubs[0]
+            self.reconnects += 1
+            if self._leases.get(id(stub)):
+                self._retired[id(stub)] = old
+                return
+        _close_channel(old)
+
+    def _retry_delay(
+        self, exc: BaseException, attempt: int, safe: bool, stub=None
+    ) -> Optional[float]:
+        """
+        On UNAVAILABLE, reconnect the channel of `stub` and return the backoff before
+        retrying, or None when the error should propagate (other codes, unsafe to
+        repeat, out of retries).
+        """
+        if _status_code(exc) != grpc.StatusCode.UNAVAILABLE:
+            return None
+        self._replace_channel(stub)
+        if not safe or attempt >= self.cfg.grpc_retries:
+            return None
+        return _backoff_delay(attempt)
+
+    def _request(self, vql: str, options: Optional[QueryOptions]):
+        """Build VQLCollectorArgs: config defaults, then per-call options, then tuning."""
+        resolved = self.cfg.query_options.merged(options)
+        if self.tuner is not None:
+            resolved = self.tuner.tune(statement_shape(vql), resolved)
+        return _collector_args(self._api_pb2, self._cfg, vql, resolved)
+
+    def _batch_request(self, queries: Dict[str, str], options: Optional[QueryOptions]):
+        if not queries:
+            raise ValueError("query_many needs at least one named statement")
+        resolved = self.cfg.query_options.merged(options)
+        return _collector_args(self._api_pb2, self._cfg, dict(queries), resolved)
+
+    def _observe(self, vql: str, rows: int) -> None:
+        if self.tuner is not None:
+            self.tuner.observe(statement_shape(vql), rows)
+
+
+class VelociraptorClient(_BaseClient):
+    """Thin wrapper over Velociraptor gRPC API using pyvelociraptor protos."""
+
+    _flow_waiter = None
+
+    def _open_channel(self) -> grpc.Channel:
+        api_cfg, target, creds, options = _channel_args(self.cfg)
+        self._cfg = api_cfg
+        return grpc.secure_channel(
+            target, creds, options, compression=_compression(self.cfg)
         )
-        for resp in self._stub.Query(req):
-            if resp.Response:
-                for row in json.loads(resp.Response):
-                    yield row
 
-    def download(self, client_id: str, path: str, offset: int = 0, length: int = 0) -> bytes:
-        """Download VFS buffer."""
+    def query(
+        self,
+        vql: str,
+        params: Optional[Dict[str, Any]] = None,
+        cache_ttl: Optional[float] = None,
+        options: Optional[QueryOptions] = None,
+    ) -> Iterable[Dict[str, Any]]:
+        """
+        Execute VQL and yield rows. Parameters should be interpolated into the VQL by caller.
+
+        With `cache_ttl` (and the result cache enabled) read-only statements are served
+        from the shared cache and return a list; identical in-flight queries share one
+        stream. Mutating statements always run and invalidate related cache entries.
+        `options` overrides the configured VQLCollectorArgs (max_row, max_wait, ...).
+        """
+        cache = get_query_cache(self.cfg)
+        if cache is not None and cache_ttl and not mutating_functions(vql):
+            self._ensure_stub()
+            org_id = self._cfg.get("org_id", "") if self._cfg else ""
+            return cache.get_or_load(
+                org_id,
+                vql,
+                cache_ttl,
+                lambda: self._stream(vql, options),
+                call=current_call(),
+            )
+        return self._stream(vql, options)
+
+    def _stream(
+        self, vql: str, options: Optional[QueryOptions] = None
+    ) -> Iterator[Dict[str, Any]]:
+        self._ensure_stub()
+        req = self._request(vql, options)
+        # Only statements that have not produced anything and change nothing are retried.
+        retryable = not mutating_functions(vql)
+        rows = 0
+        attempt = 0
+        mcp_call = current_call()
+        try:
+            with (
+                self.metrics.timed("grpc:Query") as counts,
+                self.profiler.profile(vql) as profile,
+                self.scheduler.slot(vql, mcp_call),
+            ):
+                while True:
+                    with self._lease() as stub:
+                        call = stub.Query(req, **rpc_kwargs(mcp_call))
+                        untrack = track(mcp_call, call)
+                        try:
+                            for resp in call:
+                                if resp.Response:
+                                    frame = self._decode(resp.Response)
+                                    rows += len(frame)
+                                    counts["rows"] = rows
+                                    counts["bytes"] += len(resp.Response)
+                                    profile.frame(len(frame), len(resp.Response))
+                                    yield from frame
+                            break
+                        except grpc.RpcError as exc:
+                            delay = self._retry_delay(
+                                exc, attempt, retryable and rows == 0, stub
+                            )
+                            if delay is None:
+                                raise
+                            attempt += 1
+                        finally:
+                            # Closing the generator early (e.g. a LIMIT reached locally) stops the stream.
+                            untrack()
+                            call.cancel()
+                    time.sleep(delay)
+            self._observe(vql, rows)
+        finally:
+            _invalidate_cache(self.cfg, vql)
+
+    def query_many(
+        self, queries: Dict[str, str], options: Optional[QueryOptions] = None
+    ) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        Run several named statements in one Query RPC and return rows per name.
+
+        Velociraptor runs the statements in order on one stream and tags every frame
+        with its VQLRequest, so a triage pass costs a single round-trip.
+        """
+        self._ensure_stub()
+        results: Dict[str, List[Dict[str, Any]]] = {name: [] for name in queries}
+        mcp_call = current_call()
+        try:
+            statements = "\n;\n".join(queries.values())
+            with (
+                self.metrics.timed("grpc:QueryMany") as counts,
+                self.profiler.profile(statements) as profile,
+                self.scheduler.slot(statements, mcp_call),
+                self._lease() as stub,
+            ):
+                call = stub.Query(
+                    self._batch_request(queries, options), **rpc_kwargs(mcp_call)
+                )
+                untrack = track(mcp_call, call)
+                try:
+                    for resp in call:
+                        rows = _demux(resp, results, self._decode)
+                        counts["bytes"] += len(resp.Response)
+                        if rows:
+                            profile.frame(rows, len(resp.Response))
+                except grpc.RpcError as exc:
+                    self._retry_delay(exc, 0, False, stub)
+                    raise
+                finally:
+                    untrack()
+                counts["rows"] = sum(map(len, results.values()))
+        finally:
+            for statement in queries.values():
+                _invalidate_cache(self.cfg, statement)
+        return results
+
+    def wait_for_flow(
+        self, client_id: str, flow_id: str, timeout: float = 300.0
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Block until a flow finishes and return its completion row (None on timeout).
+
+        Every caller shares one System.Flow.Completion stream; see flows.FlowWaiter.
+        """
+        return self._completions().wait(client_id, flow_id, timeout)
+
+    def on_flow_completion(self, listener) -> None:
+        """Call `listener` with every flow completion row seen on the shared stream."""
+        self._completions().subscribe(listener)
+
+    def _completions(self):
+        with self._lock:
+            if self._flow_waiter is None:
+                from .flows import FlowWaiter
+
+                self._flow_waiter = FlowWaiter(self)
+        return self._flow_waiter
+
+    def iter_download(
+        self,
+        client_id: str,
+        path: str,
+        offset: int = 0,
+        length: int = 0,
+        chunk_size: int = DOWNLOAD_CHUNK_SIZE,
+    ) -> Iterator[bytes]:
+        """
+        Yield a VFS file in `chunk_size` ranges starting at `offset`.
+
+        `length=0` reads to the end of the file. Only one chunk is held in memory.
+        """
         self._ensure_stub()
         assert self._stub is not None
-        req = self._api_pb2.VFSDownloadRequest(
-            client_id=client_id,
-            path=path,
-            offset=offset,
-            length=length,
+        components = _vfs_components(path)
+        remaining = length
+        while True:
+            want = min(chunk_size, remaining) if length else chunk_size
+            req = self._api_pb2.VFSFileBuffer(
+                org_id=self._cfg.get("org_id", "") if self._cfg else "",
+                client_id=client_id,
+                components=components,
+                offset=offset,
+                length=want,
+            )
+            data = self._get_buffer(req).data
+            if data:
+                yield data
+            offset += len(data)
+            remaining -= len(data)
+            if len(data) < want or (length and remaining <= 0):
+                return
+
+    def _get_buffer(self, req):
+        """VFSGetBuffer is a read, so UNAVAILABLE is retried on a fresh channel."""
+        attempt = 0
+        while True:
+            with self._lease() as stub:
+                try:
+                    with self.metrics.timed("grpc:VFSGetBuffer") as counts:
+                        buffer = stub.VFSGetBuffer(req, **rpc_kwargs(current_call()))
+                        counts["bytes"] = len(buffer.data)
+                    return buffer
+                except grpc.RpcError as exc:
+                    delay = self._retry_delay(exc, attempt, True, stub)
+                    if delay is None:
+                        raise
+                    attempt += 1
+            time.sleep(delay)
+
+    def download(
+        self, client_id: str, path: str, offset: int = 0, length: int = 0
+    ) -> bytes:
+        """Download VFS buffer."""
+        return b"".join(
+            self.iter_download(client_id, path, offset=offset, length=length)
         )
-        chunks: list[bytes] = []
-        for chunk in self._stub.VFSGetBuffer(req):
-            chunks.append(chunk.data)
-        return b"".join(chunks)
+
+    def download_to_file(
+        self,
+        client_id: str,
+        path: str,
+        dest: Union[str, Path],
+        offset: int = 0,
+        length: int = 0,
+        resume: bool = True,
+        retries: int = 3,
+        chunk_size: int = DOWNLOAD_CHUNK_SIZE,
+    ) -> Dict[str, Any]:
+        """
+        Stream a VFS file into `dest` with bounded memory.
+
+        Bytes go to `dest + ".part"`, which replaces `dest` once complete. With
+        `resume=True` a partial file left by an earlier call for the same range is
+        continued if its size and mtime still match what that call recorded;
+        anything else starts over. Transient gRPC failures are retried with backoff
+        from the last written byte.
+        """
+        dest = Path(dest)
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        part = dest.with_name(dest.name + ".part")
+        marker = dest.with_name(dest.name + ".part.json")
+        source = {
+            "client_id": client_id,
+            "path": path,
+            "offset": offset,
+            "length": length,
+        }
+        done = _resumable_size(part, marker, source) if resume else 0
+        resumed_from = done
+        attempt = 0
+        with part.open("r+b" if done else "wb") as fh:
+            fh.seek(done)
+            while True:
+                if length and done >= length:
+                    break
+                try:
+                    for chunk in self.iter_download(
+                        client_id,
+                        path,
+                        offset=offset + done,
+                        length=length - done if length else 0,
+                        chunk_size=chunk_size,
+                    ):
+                        fh.write(chunk)
+                        fh.flush()
+                        done += len(chunk)
+                        _record_part(part, marker, source, done)
+                    break
+                except grpc.RpcError as exc:
+                    if _status_code(exc) not in TRANSIENT_CODES or attempt >= retries:
+                        raise
+                    time.sleep(_backoff_delay(attempt))
+                    attempt += 1
+        part.replace(dest)
+        marker.unlink(missing_ok=True)
+        return {"dest": str(dest), "bytes": done, "resumed_from": resumed_from}
+
+
+def _record_part(part: Path, marker: Path, source: Dict[str, Any], size: int) -> None:
+    """Note which download `part` belongs to and the size and mtime it was left at."""
+    mtime_ns = part.stat().st_mtime_ns
+    marker.write_text(json.dumps({**source, "size": size, "mtime_ns": mtime_ns}))
+
+
+def _resumable_size(part: Path, marker: Path, source: Dict[str, Any]) -> int:
+    """Bytes of `part` to keep: 0 unless its marker matches `source` and the file."""
+    try:
+        recorded = json.loads(marker.read_text())
+        stat = part.stat()
+    except (OSError, ValueError):
+        return 0
+    if not isinstance(recorded, dict):
+        return 0
+    if any(recorded.get(k) != v for k, v in source.items()):
+        return 0
+    if (recorded.get("size"), recorded.get("mtime_ns")) != (
+        stat.st_size,
+        stat.st_mtime_ns,
+    ):
+        return 0
+    return stat.st_size
+
+
+class AsyncVelociraptorClient(_BaseClient):
+    """
+    grpc.aio counterpart of VelociraptorClient.
+
+    All coroutines share one channel, so many MCP calls can have Query streams in
+    flight at once without blocking the event loop.
+    """
+
+    def _open_channel(self) -> grpc.aio.Channel:
+        api_cfg, target, creds, options = _channel_args(self.cfg)
+        self._cfg = api_cfg
+        return grpc.aio.secure_channel(
+            target, creds, options, compression=_compression(self.cfg)
+        )
+
+    async def query(
+        self,
+        vql: str,
+        params: Optional[Dict[str, Any]] = None,
+        options: Optional[QueryOptions] = None,
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Execute VQL and asynchronously yield rows."""
+        self._ensure_stub()
+        req = self._request(vql, options)
+        retryable = not mutating_functions(vql)
+        rows = 0
+        attempt = 0
+        mcp_call = current_call()
+        try:
+            with (
+                self.metrics.timed("grpc:Query") as counts,
+                self.profiler.profile(vql) as profile,
+            ):
+                async with self.scheduler.slot_async(vql, mcp_call):
+                    while True:
+                        with self._lease() as stub:
+                            call = stub.Query(req, **rpc_kwargs(mcp_call))
+                            try:
+                                async for resp in call:
+                                    if resp.Response:
+                                        frame = self._decode(resp.Response)
+                                        rows += len(frame)
+                                        counts["rows"] = rows
+                                        counts["bytes"] += len(resp.Response)
+                                        profile.frame(len(frame), len(resp.Response))
+                                        for row in frame:
+                                            yield row
+                                break
+                            except grpc.RpcError as exc:
+                                delay = self._retry_delay(
+                                    exc, attempt, retryable and rows == 0, stub
+                                )
+                                if delay is None:
+                                    raise
+                                attempt += 1
+                            finally:
+                                call.cancel()
+                        await asyncio.sleep(delay)
+            self._observe(vql, rows)
+        finally:
+            _invalidate_cache(self.cfg, vql)
+
+    async def query_rows(
+        self,
+        vql: str,
+        params: Optional[Dict[str, Any]] = None,
+        options: Optional[QueryOptions] = None,
+    ) -> list[Dict[str, Any]]:
+        """Execute VQL and collect every row."""
+        return [row async for row in self.query(vql, params, options=options)]
+
+    async def query_many(
+        self, queries: Dict[str, str], options: Optional[QueryOptions] = None
+    ) -> Dict[str, List[Dict[str, Any]]]:
+        """Run several named statements in one Query RPC; see VelociraptorClient.query_many."""
+        self._ensure_stub()
+        results: Dict[str, List[Dict[str, Any]]] = {name: [] for name in queries}
+        mcp_call = current_call()
+        try:
+            statements = "\n;\n".join(queries.values())
+            with (
+                self.metrics.timed("grpc:QueryMany") as counts,
+                self.profiler.profile(statements) as profile,
+            ):
+                async with self.scheduler.slot_async(statements, mcp_call):
+                    with self._lease() as stub:
+                        try:
+                            async for resp in stub.Query(
+                                self._batch_request(queries, options),
+                                **rpc_kwargs(mcp_call),
+                            ):
+                                rows = _demux(resp, results, self._decode)
+                                counts["bytes"] += len(resp.Response)
+                                if rows:
+                                    profile.frame(rows, len(resp.Response))
+                        except grpc.RpcError as exc:
+                            self._retry_delay(exc, 0, False, stub)
+                            raise
+                counts["rows"] = sum(map(len, results.values()))
+        finally:
+            for statement in queries.values():
+                _invalidate_cache(self.cfg, statement)
+        return results
 
 
 @lru_cache(maxsize=1)
 def get_client(cfg: ServerConfig) -> VelociraptorClient:
     """Singleton Velociraptor client per process."""
     return VelociraptorClient(cfg)
+
+
+@lru_cache(maxsize=1)
+def get_async_client(cfg: ServerConfig) -> AsyncVelociraptorClient:
+    """Singleton asyncio Velociraptor client per process."""
+    return AsyncVelociraptorClient(cfg)
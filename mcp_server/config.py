@@ -1,22 +1,252 @@
 from __future__ import annotations
 
 import os
-from dataclasses import dataclass
+from dataclasses import dataclass, fields, replace
 from pathlib import Path
-from typing import Optional
+from typing import Optional, Tuple
+
+from .decoding import get_decoder
 
 DEFAULT_API_CONFIG = Path("volumes/api/api.config.yaml")
 
+# Per-tool result cache TTLs (seconds) for read-only queries that repeat a lot.
+DEFAULT_QUERY_CACHE_TTLS: Tuple[Tuple[str, float], ...] = (
+    ("list_artifacts", 300.0),
+    ("get_artifact_definition", 300.0),
+    ("list_hunts", 15.0),
+    ("get_hunt_details", 15.0),
+)
+
+# Scheduler priority class per tool; unlisted tools run as "normal".
+DEFAULT_TOOL_PRIORITIES: Tuple[Tuple[str, str], ...] = (
+    ("get_client_info", "interactive"),
+    ("get_file_info", "interactive"),
+    ("get_hunt_details", "interactive"),
+    ("get_artifact_definition", "interactive"),
+    ("list_directory", "interactive"),
+    ("list_clients", "bulk"),
+    ("get_hunt_results", "bulk"),
+    ("summarize_hunt_results", "bulk"),
+    ("export_results", "bulk"),
+    ("store_query_results", "bulk"),
+    ("collect_artifact_bulk", "bulk"),
+    ("download_files", "bulk"),
+)
+PRIORITY_CLASSES = ("interactive", "normal", "bulk")
+# Tools that stream unbounded results to disk or a cursor spill; like bulk tools
+# they run under bulk_query_deadline_seconds instead of query_deadline_seconds.
+STREAMING_TOOLS = ("query_vql", "download_file")
+
 
 class ConfigError(RuntimeError):
     """Raised when configuration is invalid or missing."""
 
 
+@dataclass(frozen=True)
+class QueryOptions:
+    """
+    VQLCollectorArgs batching knobs. None means "inherit"; see QueryOptions.merged.
+
+    - max_row: rows per response frame
+    - max_wait: seconds the server buffers rows before flushing a partial frame
+    - timeout: server-side query timeout in seconds (0 = server default)
+    - ops_per_second: server-side rate limit (0 = unlimited)
+    """
+
+    max_row: Optional[int] = None
+    max_wait: Optional[int] = None
+    timeout: Optional[int] = None
+    ops_per_second: Optional[int] = None
+
+    def merged(self, override: Optional["QueryOptions"]) -> "QueryOptions":
+        """Return self with every non-None field of `override` applied on top."""
+        if override is None:
+            return self
+        changes = {
+            f.name: getattr(override, f.name)
+            for f in fields(override)
+            if getattr(override, f.name) is not None
+        }
+        return replace(self, **changes)
+
+
+DEFAULT_QUERY_OPTIONS = QueryOptions(
+    max_row=1000, max_wait=1, timeout=0, ops_per_second=0
+)
+
+# Point lookups flush as soon as possible; bulk exports use bigger frames.
+DEFAULT_TOOL_QUERY_OPTIONS: Tuple[Tuple[str, QueryOptions], ...] = (
+    ("get_client_info", QueryOptions(max_row=100, max_wait=1)),
+    ("get_hunt_details", QueryOptions(max_row=100, max_wait=1)),
+    ("get_file_info", QueryOptions(max_row=100, max_wait=1)),
+    ("get_hunt_results", QueryOptions(max_row=5000, max_wait=2)),
+)
+
+
 @dataclass(frozen=True)
 class ServerConfig:
     api_config_path: Path
     log_level: str = "INFO"
     server_name: str = "velociraptor-mcp"
+    # Seconds between client inventory refreshes; 0 disables the local inventory.
+    client_inventory_ttl: float = 0.0
+    # Seconds before the local artifact index is reloaded; 0 disables it.
+    artifact_catalog_ttl: float = 0.0
+    # Byte budget of the read-only query result cache; 0 disables caching.
+    query_cache_bytes: int = 0
+    query_cache_ttls: Tuple[Tuple[str, float], ...] = DEFAULT_QUERY_CACHE_TTLS
+    # Collector args for every query, per-tool overrides, and adaptive tuning.
+    query_options: QueryOptions = DEFAULT_QUERY_OPTIONS
+    tool_query_options: Tuple[Tuple[str, QueryOptions], ...] = (
+        DEFAULT_TOOL_QUERY_OPTIONS
+    )
+    adaptive_query_options: bool = False
+    # gRPC transport: channel pool size, message limits, keepalive, compression and
+    # how often an UNAVAILABLE call is retried on a fresh channel.
+    grpc_pool_size: int = 2
+    grpc_max_message_bytes: int = 64 * 1024 * 1024
+    grpc_keepalive_seconds: int = 300
+    grpc_compression: str = ""
+    grpc_retries: int = 3
+    # Memory budget and handle cap of the per-session DataFrame result store.
+    result_store_bytes: int = 256 * 1024 * 1024
+    result_store_handles: int = 64
+    # JSON decoder for streamed frames: "auto" (orjson if installed), "orjson", "json".
+    json_decoder: str = "auto"
+    # Disk-spilled result cursors: spill directory ("" = temp dir), byte budget, TTL.
+    cursor_dir: str = ""
+    cursor_disk_bytes: int = 1024 * 1024 * 1024
+    cursor_ttl: float = 900.0
+    # Query profiling ring buffer size and the slow-query log threshold (0 disables).
+    query_profile_size: int = 1000
+    slow_query_seconds: float = 5.0
+    # Query scheduler: concurrent Query streams overall, per MCP session and for bulk
+    # tools, the priority class of each tool, and the deadline of a tool call's
+    # queries in seconds (0 = none); bulk and streaming tools have their own.
+    query_concurrency: int = 8
+    session_query_concurrency: int = 4
+    bulk_query_concurrency: int = 6
+    tool_priorities: Tuple[Tuple[str, str], ...] = DEFAULT_TOOL_PRIORITIES
+    query_deadline_seconds: float = 600.0
+    bulk_query_deadline_seconds: float = 0.0
+    # VFS listing cache TTL (0 disables) and size, and walk_directory parallelism.
+    vfs_cache_ttl: float = 0.0
+    vfs_cache_entries: int = 10000
+    vfs_walk_concurrency: int = 4
+    # Content-addressed store for downloaded files: directory ("" = temp dir) and
+    # byte budget (0 disables).
+    blob_dir: str = ""
+    blob_store_bytes: int = 0
+    # Parallel file downloads per download_files call.
+    download_concurrency: int = 4
+    # Directories that download_file/download_files and export_results may write
+    # into; "" refuses local destinations.
+    download_dir: str = ""
+    export_dir: str = ""
+
+    def query_options_for(self, tool: Optional[str] = None) -> QueryOptions:
+        """Global query options with the per-tool overrides for `tool` applied."""
+        return self.query_options.merged(dict(self.tool_query_options).get(tool or ""))
+
+    def tool_priority(self, tool: str) -> str:
+        """Scheduler priority class of `tool`: interactive, normal or bulk."""
+        return dict(self.tool_priorities).get(tool, "normal")
+
+    def query_deadline(self, tool: str) -> float:
+        """Deadline in seconds for a call of `tool` (0 = none)."""
+        if self.tool_priority(tool) == "bulk" or tool in STREAMING_TOOLS:
+            return self.bulk_query_deadline_seconds
+        return self.query_deadline_seconds
+
+    def cache_ttl(self, tool: str) -> Optional[float]:
+        """Result cache TTL for `tool`, or None when its queries should not be cached."""
+        if self.query_cache_bytes <= 0:
+            return None
+        ttl = dict(self.query_cache_ttls).get(tool)
+        return ttl if ttl and ttl > 0 else None
+
+
+def _env_float(name: str, default: float) -> float:
+    value = os.getenv(name)
+    if value is None or value == "":
+        return default
+    try:
+        return float(value)
+    except ValueError as exc:
+        raise ConfigError(f"{name} must be a number, got {value!r}") from exc
+
+
+def _env_decoder(name: str) -> str:
+    value = os.getenv(name, "").strip().lower() or "auto"
+    try:
+        get_decoder(value)
+    except ValueError as exc:
+        raise ConfigError(f"{name}: {exc}") from exc
+    return value
+
+
+def _env_ttls(
+    name: str, defaults: Tuple[Tuple[str, float], ...]
+) -> Tuple[Tuple[str, float], ...]:
+    """Parse `tool=seconds,tool=seconds` overrides on top of `defaults`."""
+    ttls = dict(defaults)
+    for item in filter(None, (part.strip() for part in os.getenv(name, "").split(","))):
+        tool, sep, seconds = item.partition("=")
+        try:
+            ttls[tool.strip()] = float(seconds)
+        except ValueError as exc:
+            raise ConfigError(
+                f"{name} entries must look like tool=seconds, got {item!r}"
+            ) from exc
+        if not sep:
+            raise ConfigError(
+                f"{name} entries must look like tool=seconds, got {item!r}"
+            )
+    return tuple(sorted(ttls.items()))
+
+
+def _env_priorities(
+    name: str, defaults: Tuple[Tuple[str, str], ...]
+) -> Tuple[Tuple[str, str], ...]:
+    """Parse `tool=interactive|normal|bulk,...` overrides on top of `defaults`."""
+    priorities = dict(defaults)
+    for item in filter(None, (part.strip() for part in os.getenv(name, "").split(","))):
+        tool, _, value = item.partition("=")
+        value = value.strip().lower()
+        if not tool.strip() or value not in PRIORITY_CLASSES:
+            raise ConfigError(
+                f"{name} entries must look like tool=interactive|normal|bulk, got {item!r}"
+            )
+        priorities[tool.strip()] = value
+    return tuple(sorted(priorities.items()))
+
+
+def _env_query_options(prefix: str, base: QueryOptions) -> QueryOptions:
+    """Read `<prefix>MAX_ROW`, `<prefix>MAX_WAIT`, ... over `base`."""
+    values = {}
+    for f in fields(QueryOptions):
+        env_name = prefix + f.name.upper()
+        if os.getenv(env_name):
+            values[f.name] = int(_env_float(env_name, 0))
+    return base.merged(QueryOptions(**values))
+
+
+def _env_tool_query_options(
+    name: str, defaults: Tuple[Tuple[str, QueryOptions], ...]
+) -> Tuple[Tuple[str, QueryOptions], ...]:
+    """Parse `tool.field=value,...` (e.g. `get_hunt_results.max_row=10000`) overrides."""
+    per_tool = dict(defaults)
+    valid = {f.name for f in fields(QueryOptions)}
+    for item in filter(None, (part.strip() for part in os.getenv(name, "").split(","))):
+        key, _, value = item.partition("=")
+        tool, _, field_name = key.strip().rpartition(".")
+        if not tool or field_name not in valid or not value.strip().isdigit():
+            raise ConfigError(
+                f"{name} entries must look like tool.max_row=5000, got {item!r}"
+            )
+        override = QueryOptions(**{field_name: int(value)})
+        per_tool[tool] = per_tool.get(tool, QueryOptions()).merged(override)
+    return tuple(sorted(per_tool.items()))
 
 
 def load_config(
@@ -31,6 +261,42 @@ def load_config(
     - api_config_path: env `VELOCIRAPTOR_API_CONFIG` or `volumes/api/api.config.yaml`
     - log_level: env `MCP_LOG_LEVEL` or INFO
     - server_name: env `MCP_SERVER_NAME` or velociraptor-mcp
+    - client_inventory_ttl: env `MCP_CLIENT_INVENTORY_TTL` seconds or 0 (disabled)
+    - artifact_catalog_ttl: env `MCP_ARTIFACT_CATALOG_TTL` seconds or 0 (disabled)
+    - query_cache_bytes: env `MCP_QUERY_CACHE_BYTES` or 0 (disabled)
+    - query_cache_ttls: env `MCP_QUERY_CACHE_TTLS` as `tool=seconds,...` over the defaults
+    - query_options: env `MCP_QUERY_MAX_ROW`, `MCP_QUERY_MAX_WAIT`, `MCP_QUERY_TIMEOUT`,
+      `MCP_QUERY_OPS_PER_SECOND` (defaults max_row=1000, max_wait=1)
+    - tool_query_options: env `MCP_TOOL_QUERY_OPTIONS` as `tool.field=value,...`
+    - adaptive_query_options: env `MCP_QUERY_ADAPTIVE` (1/true) or off
+    - grpc_pool_size: env `MCP_GRPC_POOL_SIZE` or 2
+    - grpc_max_message_bytes: env `MCP_GRPC_MAX_MESSAGE_BYTES` or 64 MiB
+    - grpc_keepalive_seconds: env `MCP_GRPC_KEEPALIVE_SECONDS` or 300 (0 disables)
+    - grpc_compression: env `MCP_GRPC_COMPRESSION` (`gzip`) or none
+    - grpc_retries: env `MCP_GRPC_RETRIES` or 3
+    - result_store_bytes: env `MCP_RESULT_STORE_BYTES` or 256 MiB
+    - result_store_handles: env `MCP_RESULT_STORE_HANDLES` or 64
+    - json_decoder: env `MCP_JSON_DECODER` (`orjson`/`json`) or auto
+    - cursor_dir: env `MCP_CURSOR_DIR` or a temporary directory
+    - cursor_disk_bytes: env `MCP_CURSOR_DISK_BYTES` or 1 GiB
+    - cursor_ttl: env `MCP_CURSOR_TTL` seconds since last fetch or 900
+    - query_profile_size: env `MCP_QUERY_PROFILE_SIZE` or 1000 profiled queries
+    - slow_query_seconds: env `MCP_SLOW_QUERY_SECONDS` or 5 (0 disables the slow log)
+    - query_concurrency: env `MCP_QUERY_CONCURRENCY` or 8 concurrent Query streams
+    - session_query_concurrency: env `MCP_SESSION_QUERY_CONCURRENCY` or 4
+    - bulk_query_concurrency: env `MCP_BULK_QUERY_CONCURRENCY` or 6
+    - tool_priorities: env `MCP_TOOL_PRIORITIES` as `tool=interactive|normal|bulk,...`
+    - query_deadline_seconds: env `MCP_QUERY_DEADLINE_SECONDS` or 600 (0 disables)
+    - bulk_query_deadline_seconds: env `MCP_BULK_QUERY_DEADLINE_SECONDS` or 0 (none)
+      for bulk-class and streaming tools (query_vql, download_file)
+    - vfs_cache_ttl: env `MCP_VFS_CACHE_TTL` seconds or 0 (disabled)
+    - vfs_cache_entries: env `MCP_VFS_CACHE_ENTRIES` or 10000 cached directories
+    - vfs_walk_concurrency: env `MCP_VFS_WALK_CONCURRENCY` or 4 parallel listings
+    - blob_dir: env `MCP_BLOB_DIR` or a temporary directory
+    - blob_store_bytes: env `MCP_BLOB_STORE_BYTES` or 0 (disabled)
+    - download_concurrency: env `MCP_DOWNLOAD_CONCURRENCY` or 4 parallel downloads
+    - download_dir: env `MCP_DOWNLOAD_DIR` or none (dest_path/dest_dir refused)
+    - export_dir: env `MCP_EXPORT_DIR` or none (export_results refused)
     """
     api_path_str: Optional[str] = os.getenv(api_config_env)
     if api_path_str:
@@ -49,4 +315,49 @@ def load_config(
     log_level = os.getenv(log_level_env, "INFO").upper()
     server_name = os.getenv(server_name_env, "velociraptor-mcp")
 
-    return ServerConfig(api_config_path=api_path, log_level=log_level, server_name=server_name)
+    return ServerConfig(
+        api_config_path=api_path,
+        log_level=log_level,
+        server_name=server_name,
+        client_inventory_ttl=_env_float("MCP_CLIENT_INVENTORY_TTL", 0.0),
+        artifact_catalog_ttl=_env_float("MCP_ARTIFACT_CATALOG_TTL", 0.0),
+        query_cache_bytes=int(_env_float("MCP_QUERY_CACHE_BYTES", 0)),
+        query_cache_ttls=_env_ttls("MCP_QUERY_CACHE_TTLS", DEFAULT_QUERY_CACHE_TTLS),
+        query_options=_env_query_options("MCP_QUERY_", DEFAULT_QUERY_OPTIONS),
+        tool_query_options=_env_tool_query_options(
+            "MCP_TOOL_QUERY_OPTIONS", DEFAULT_TOOL_QUERY_OPTIONS
+        ),
+        adaptive_query_options=os.getenv("MCP_QUERY_ADAPTIVE", "").lower()
+        in ("1", "true", "yes", "on"),
+        grpc_pool_size=max(1, int(_env_float("MCP_GRPC_POOL_SIZE", 2))),
+        grpc_max_message_bytes=int(
+            _env_float("MCP_GRPC_MAX_MESSAGE_BYTES", 64 * 1024 * 1024)
+        ),
+        grpc_keepalive_seconds=int(_env_float("MCP_GRPC_KEEPALIVE_SECONDS", 300)),
+        grpc_compression=os.getenv("MCP_GRPC_COMPRESSION", "").lower(),
+        grpc_retries=int(_env_float("MCP_GRPC_RETRIES", 3)),
+        result_store_bytes=int(_env_float("MCP_RESULT_STORE_BYTES", 256 * 1024 * 1024)),
+        result_store_handles=max(1, int(_env_float("MCP_RESULT_STORE_HANDLES", 64))),
+        json_decoder=_env_decoder("MCP_JSON_DECODER"),
+        cursor_dir=os.getenv("MCP_CURSOR_DIR", ""),
+        cursor_disk_bytes=int(_env_float("MCP_CURSOR_DISK_BYTES", 1024 * 1024 * 1024)),
+        cursor_ttl=_env_float("MCP_CURSOR_TTL", 900.0),
+        query_profile_size=max(1, int(_env_float("MCP_QUERY_PROFILE_SIZE", 1000))),
+        slow_query_seconds=_env_float("MCP_SLOW_QUERY_SECONDS", 5.0),
+        query_concurrency=max(1, int(_env_float("MCP_QUERY_CONCURRENCY", 8))),
+        session_query_concurrency=max(
+            1, int(_env_float("MCP_SESSION_QUERY_CONCURRENCY", 4))
+        ),
+        bulk_query_concurrency=max(1, int(_env_float("MCP_BULK_QUERY_CONCURRENCY", 6))),
+        tool_priorities=_env_priorities("MCP_TOOL_PRIORITIES", DEFAULT_TOOL_PRIORITIES),
+        query_deadline_seconds=_env_float("MCP_QUERY_DEADLINE_SECONDS", 600.0),
+        bulk_query_deadline_seconds=_env_float("MCP_BULK_QUERY_DEADLINE_SECONDS", 0.0),
+        vfs_cache_ttl=_env_float("MCP_VFS_CACHE_TTL", 0.0),
+        vfs_cache_entries=max(1, int(_env_float("MCP_VFS_CACHE_ENTRIES", 10000))),
+        vfs_walk_concurrency=max(1, int(_env_float("MCP_VFS_WALK_CONCURRENCY", 4))),
+        blob_dir=os.getenv("MCP_BLOB_DIR", ""),
+        blob_store_bytes=int(_env_float("MCP_BLOB_STORE_BYTES", 0)),
+        download_concurrency=max(1, int(_env_float("MCP_DOWNLOAD_CONCURRENCY", 4))),
+        download_dir=os.getenv("MCP_DOWNLOAD_DIR", ""),
+        export_dir=os.getenv("MCP_EXPORT_DIR", ""),
+    )
@@ -0,0 +1,192 @@
+from __future__ import annotations
+
+import atexit
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict, Iterable
+
+from .config import ServerConfig
+from .decoding import encode_line, get_decoder
+
+
+@dataclass
+class SpilledCursor:
+    session: str
+    path: Path
+    source: str
+    expires: float
+    rows: int = 0
+    bytes: int = 0
+    # Byte offset and row number of the next unread line.
+    position: int = 0
+    fetched: int = 0
+    complete: bool = False
+    truncated: bool = False
+
+
+class CursorStore:
+    """
+    Query results streamed to JSONL spill files and paged back with fetch().
+
+    Rows go to disk as they arrive, so a result of any size costs one line of memory.
+    All spill files share one byte budget: a spill that would exceed it first evicts
+    the least recently used cursors, and when nothing is left to evict it stops
+    reading (cancelling the query) and marks the cursor truncated. Cursors expire
+    `ttl` seconds after their last use.
+    """
+
+    def __init__(self, directory: str, max_bytes: int, ttl: float):
+        if directory:
+            self.directory = Path(directory)
+            self.directory.mkdir(parents=True, exist_ok=True)
+        else:
+            self.directory = Path(tempfile.mkdtemp(prefix="mcp-cursors-"))
+            atexit.register(shutil.rmtree, self.directory, True)
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._decode = get_decoder()
+        self._lock = threading.Lock()
+        self._cursors: "OrderedDict[str, SpilledCursor]" = OrderedDict()
+        self._bytes = 0
+        self._evictions = 0
+
+    def _remove_locked(self, cursor_id: str) -> None:
+        cursor = self._cursors.pop(cursor_id)
+        self._bytes -= cursor.bytes
+        cursor.path.unlink(missing_ok=True)
+
+    def _expire_locked(self, now: float) -> None:
+        for cursor_id in [
+            cid for cid, c in self._cursors.items() if c.complete and c.expires <= now
+        ]:
+            self._remove_locked(cursor_id)
+
+    def _reserve_locked(self, cursor: SpilledCursor, size: int) -> bool:
+        while self._bytes + size > self.max_bytes:
+            victim = next((cid for cid, c in self._cursors.items() if c.complete), None)
+            if victim is None:
+                return False
+            self._remove_locked(victim)
+            self._evictions += 1
+        self._bytes += size
+        cursor.bytes += size
+        return True
+
+    def _get_locked(self, session: str, cursor_id: str) -> SpilledCursor:
+        self._expire_locked(time.monotonic())
+        cursor = self._cursors.get(cursor_id)
+        if cursor is None or cursor.session != session:
+            raise ValueError(f"Unknown or expired cursor: {cursor_id!r}")
+        self._cursors.move_to_end(cursor_id)
+        cursor.expires = time.monotonic() + self.ttl
+        return cursor
+
+    def spill(
+        self, session: str, rows: Iterable[Dict[str, Any]], source: str
+    ) -> Dict[str, Any]:
+        """Stream `rows` to a new spill file and return the cursor's description."""
+        cursor_id = uuid.uuid4().hex
+        cursor = SpilledCursor(
+            session=session,
+            path=self.directory / f"{cursor_id}.jsonl",
+            source=source,
+            expires=time.monotonic() + self.ttl,
+        )
+        with self._lock:
+            self._expire_locked(time.monotonic())
+            self._cursors[cursor_id] = cursor
+        try:
+            with open(cursor.path, "wb") as fh:
+                for row in rows:
+                    line = encode_line(row)
+                    with self._lock:
+                        if not self._reserve_locked(cursor, len(line)):
+                            cursor.truncated = True
+                            break
+                    fh.write(line)
+                    cursor.rows += 1
+        except BaseException:
+            with self._lock:
+                self._remove_locked(cursor_id)
+            raise
+        finally:
+            close = getattr(rows, "close", None)
+            if close:
+                close()
+        with self._lock:
+            cursor.complete = True
+            cursor.expires = time.monotonic() + self.ttl
+        return self._describe(cursor_id, cursor)
+
+    def fetch(self, session: str, cursor_id: str, n: int = 100) -> Dict[str, Any]:
+        """Return the next `n` rows of a cursor; `done` once every row was read."""
+        with self._lock:
+            cursor = self._get_locked(session, cursor_id)
+            with open(cursor.path, "rb") as fh:
+                fh.seek(cursor.position)
+                lines = [
+                    fh.readline() for _ in range(min(n, cursor.rows - cursor.fetched))
+                ]
+                cursor.position = fh.tell()
+            start = cursor.fetched
+            cursor.fetched += len(lines)
+            out = self._describe(cursor_id, cursor)
+        return {**out, "offset": start, "rows": [self._decode(line) for line in lines]}
+
+    def close(self, session: str, cursor_id: str) -> bool:
+        with self._lock:
+            try:
+                self._get_locked(session, cursor_id)
+            except ValueError:
+                return False
+            self._remove_locked(cursor_id)
+            return True
+
+    def _describe(self, cursor_id: str, cursor: SpilledCursor) -> Dict[str, Any]:
+        return {
+            "cursor_id": cursor_id,
+            "total_rows": cursor.rows,
+            "remaining": cursor.rows - cursor.fetched,
+            "done": cursor.fetched >= cursor.rows,
+            "truncated": cursor.truncated,
+            "bytes": cursor.bytes,
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            self._expire_locked(time.monotonic())
+            return {
+                "cursors": len(self._cursors),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "ttl": self.ttl,
+                "evictions": self._evictions,
+                "directory": str(self.directory),
+            }
+
+
+@lru_cache(maxsize=1)
+def get_cursor_store(cfg: ServerConfig) -> CursorStore:
+    return CursorStore(cfg.cursor_dir, cfg.cursor_disk_bytes, cfg.cursor_ttl)
+
+
+def spill_query(
+    cfg: ServerConfig,
+    session: str,
+    rows: Iterable[Dict[str, Any]],
+    source: str,
+    first_page: int = 0,
+) -> Dict[str, Any]:
+    """Spill `rows` to a new cursor and return its first page (if requested)."""
+    store = get_cursor_store(cfg)
+    described = store.spill(session, rows, source)
+    if not first_page:
+        return {**described, "rows": []}
+    return store.fetch(session, described["cursor_id"], first_page)
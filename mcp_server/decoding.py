@@ -0,0 +1,39 @@
+from __future__ import annotations
+
+import json
+from typing import Any, Callable, Dict, Union
+
+try:  # optional, several times faster than the stdlib decoder on large frames
+    import orjson
+except ImportError:  # pragma: no cover - exercised when orjson is not installed
+    orjson = None
+
+Decoder = Callable[[Union[str, bytes]], Any]
+
+DECODERS: Dict[str, Decoder] = {"json": json.loads}
+if orjson is not None:
+    DECODERS["orjson"] = orjson.loads
+
+
+def get_decoder(name: str = "auto") -> Decoder:
+    """
+    Return the JSON decoder for streamed VQLResponse frames.
+
+    "auto" picks orjson when it is installed and falls back to the stdlib; an
+    explicit name must be one of DECODERS.
+    """
+    if name in ("", "auto"):
+        return DECODERS.get("orjson", json.loads)
+    try:
+        return DECODERS[name]
+    except KeyError:
+        raise ValueError(
+            f"Unknown JSON decoder {name!r}; available: {', '.join(DECODERS)}"
+        ) from None
+
+
+def encode_line(row: Any) -> bytes:
+    """One JSONL line for `row` (orjson when installed, stdlib otherwise)."""
+    if orjson is not None:
+        return orjson.dumps(row, default=str) + b"\n"
+    return json.dumps(row, default=str, separators=(",", ":")).encode("utf-8") + b"\n"
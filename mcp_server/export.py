@@ -0,0 +1,293 @@
+from __future__ import annotations
+
+import gzip
+import itertools
+import json
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set
+
+from .decoding import encode_line
+
+FORMATS = ("jsonl", "parquet")
+PARQUET_BATCH_ROWS = 10000
+# Row groups held before the first write so their schemas can be unified up front,
+# and how often a wider schema found later may copy the file written so far.
+PARQUET_SAMPLE_BATCHES = 4
+MAX_SCHEMA_REWRITES = 2
+
+_JSON_TYPES = {
+    bool: "boolean",
+    int: "integer",
+    float: "number",
+    str: "string",
+    dict: "object",
+    list: "array",
+    type(None): "null",
+}
+
+
+def export_format(dest: Path, format: Optional[str] = None) -> str:
+    """Explicit `format`, else parquet for *.parquet destinations and jsonl otherwise."""
+    name = format or ("parquet" if dest.suffix == ".parquet" else "jsonl")
+    if name not in FORMATS:
+        raise ValueError(f"Unknown export format {name!r}; expected one of {FORMATS}")
+    return name
+
+
+def _observe(schema: Dict[str, str], row: Dict[str, Any]) -> None:
+    for key, value in row.items():
+        kind = _JSON_TYPES.get(type(value), "string")
+        seen = schema.get(key)
+        if seen is None or seen == "null":
+            schema[key] = kind
+        elif kind not in (seen, "null"):
+            schema[key] = "mixed"
+
+
+def _write_jsonl(rows: Iterable[Dict[str, Any]], dest: Path) -> Dict[str, Any]:
+    schema: Dict[str, str] = {}
+    count = 0
+    with gzip.open(dest, "wb", compresslevel=6) as fh:
+        for row in rows:
+            _observe(schema, row)
+            fh.write(encode_line(row))
+            count += 1
+    return {"rows": count, "schema": schema}
+
+
+def _flatten(row: Dict[str, Any]) -> Dict[str, Any]:
+    # Nested VQL values change shape from row to row; storing them as JSON text keeps
+    # one stable Parquet schema for the whole file.
+    return {
+        k: json.dumps(v, default=str) if isinstance(v, (dict, list)) else v
+        for k, v in row.items()
+    }
+
+
+def _batches(
+    rows: Iterable[Dict[str, Any]], size: int
+) -> Iterator[List[Dict[str, Any]]]:
+    it = iter(rows)
+    while True:
+        batch = [_flatten(r) for r in itertools.islice(it, size)]
+        if not batch:
+            return
+        yield batch
+
+
+def _text(value: Any) -> Any:
+    return value if value is None or isinstance(value, str) else json.dumps(value)
+
+
+def _as_text(
+    batch: List[Dict[str, Any]], text_columns: Set[str]
+) -> List[Dict[str, Any]]:
+    """
+    Store columns whose values mix types within `batch` (beyond int/float) as text.
+
+    Columns once made text stay text for later batches.
+    """
+    kinds: Dict[str, Set[type]] = {}
+    for row in batch:
+        for key, value in row.items():
+            if value is not None:
+                kinds.setdefault(key, set()).add(type(value))
+    text_columns.update(
+        key
+        for key, types in kinds.items()
+        if len(types) > 1 and not types <= {int, float}
+    )
+    if not text_columns:
+        return batch
+    return [
+        {k: _text(v) if k in text_columns else v for k, v in row.items()}
+        for row in batch
+    ]
+
+
+def _common_type(pa, current, incoming):
+    """Type both can be cast to: Arrow's permissive promotion, else string."""
+    if current.equals(incoming):
+        return current
+    try:
+        merged = pa.unify_schemas(
+            [pa.schema([("v", current)]), pa.schema([("v", incoming)])],
+            promote_options="permissive",
+        )
+    except (pa.ArrowInvalid, pa.ArrowTypeError, NotImplementedError):
+        return pa.string()
+    return merged.field("v").type
+
+
+def _widen(pa, current, incoming):
+    """`current` with types widened for `incoming` and its new columns appended."""
+    fields = [
+        (
+            pa.field(f.name, _common_type(pa, f.type, incoming.field(f.name).type))
+            if f.name in incoming.names
+            else f
+        )
+        for f in current
+    ]
+    fields += [f for f in incoming if f.name not in current.names]
+    return pa.schema(fields)
+
+
+def _conform(pa, table, schema):
+    """`table` laid out as `schema`: columns cast, missing ones null."""
+    columns = [
+        (
+            table.column(f.name).cast(f.type)
+            if f.name in table.column_names
+            else pa.nulls(len(table), f.type)
+        )
+        for f in schema
+    ]
+    return pa.Table.from_arrays(columns, schema=schema)
+
+
+def _rewrite_parquet(pa, pq, dest: Path, schema, batch_rows: int):
+    """Re-open `dest` with the wider `schema`, copying its row groups over."""
+    old = dest.with_name(dest.name + ".old")
+    dest.replace(old)
+    writer = pq.ParquetWriter(str(dest), schema, compression="zstd")
+    try:
+        for batch in pq.ParquetFile(str(old)).iter_batches(batch_size=batch_rows):
+            writer.write_table(_conform(pa, pa.Table.from_batches([batch]), schema))
+    except BaseException:
+        writer.close()
+        raise
+    finally:
+        old.unlink()
+    return writer
+
+
+def _write_parquet(
+    rows: Iterable[Dict[str, Any]], dest: Path, batch_rows: int
+) -> Dict[str, Any]:
+    """
+    Write rows in row groups of `batch_rows`.
+
+    A Parquet file has one schema. The first PARQUET_SAMPLE_BATCHES row groups are
+    held in memory and written with their unified schema (permissive Arrow
+    promotion such as int to double, else string). A later batch that still needs
+    a wider schema makes the file written so far be copied under it; that copy is
+    allowed MAX_SCHEMA_REWRITES times, after which the export fails and jsonl is
+    the format to use. Memory is thus a few row groups, and throughput stays near
+    the stream rate unless the schema keeps drifting.
+    """
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError as exc:
+        raise RuntimeError(
+            "Parquet export needs pyarrow (`pip install .[parquet]`); "
+            "use format='jsonl' instead"
+        ) from exc
+
+    writer = None
+    schema = None
+    sample: List[Any] = []
+    rewrites = 0
+    count = 0
+    text_columns: Set[str] = set()
+    try:
+        for batch in _batches(rows, batch_rows):
+            try:
+                table = pa.Table.from_pylist(_as_text(batch, text_columns))
+                schema = (
+                    table.schema if schema is None else _widen(pa, schema, table.schema)
+                )
+                if writer is None:
+                    sample.append(table)
+                    if len(sample) >= PARQUET_SAMPLE_BATCHES:
+                        writer = _write_sample(pa, pq, dest, schema, sample)
+                        sample = []
+                elif not schema.equals(writer.schema):
+                    rewrites += 1
+                    if rewrites > MAX_SCHEMA_REWRITES:
+                        raise ValueError(
+                            f"Rows {count}+ changed the Parquet schema more than "
+                            f"{MAX_SCHEMA_REWRITES} times after the first "
+                            f"{PARQUET_SAMPLE_BATCHES} row groups; "
+                            "export as jsonl instead"
+                        )
+                    writer.close()
+                    writer = None
+                    writer = _rewrite_parquet(pa, pq, dest, schema, batch_rows)
+                    writer.write_table(_conform(pa, table, schema))
+                else:
+                    writer.write_table(_conform(pa, table, schema))
+            except (
+                pa.ArrowInvalid,
+                pa.ArrowTypeError,
+                pa.ArrowNotImplementedError,
+            ) as exc:
+                raise ValueError(
+                    f"Rows {count}+ do not fit a Parquet schema ({exc}); "
+                    "export as jsonl instead"
+                ) from exc
+            count += len(batch)
+        if writer is None and sample:
+            writer = _write_sample(pa, pq, dest, schema, sample)
+    finally:
+        if writer is not None:
+            writer.close()
+    if writer is None:
+        pq.write_table(pa.table({}), str(dest))
+        return {"rows": 0, "schema": {}}
+    return {
+        "rows": count,
+        "schema": {f.name: str(f.type) for f in writer.schema},
+    }
+
+
+def _write_sample(pa, pq, dest: Path, schema, tables: List[Any]):
+    """Open the writer with the sampled `schema` and write the held row groups."""
+    writer = pq.ParquetWriter(str(dest), schema, compression="zstd")
+    try:
+        for table in tables:
+            writer.write_table(_conform(pa, table, schema))
+    except BaseException:
+        writer.close()
+        raise
+    return writer
+
+
+def export_rows(
+    rows: Iterable[Dict[str, Any]],
+    dest: Path,
+    format: Optional[str] = None,
+    batch_rows: int = PARQUET_BATCH_ROWS,
+) -> Dict[str, Any]:
+    """
+    Stream rows into a gzip JSONL or Parquet file with bounded memory.
+
+    JSONL holds one row at a time; Parquet holds up to PARQUET_SAMPLE_BATCHES row
+    groups of `batch_rows` while it settles the schema, then one.
+    Returns the path, format, row count, file size and column schema.
+    """
+    dest = Path(dest)
+    name = export_format(dest, format)
+    dest.parent.mkdir(parents=True, exist_ok=True)
+    tmp = dest.with_name(dest.name + ".partial")
+    try:
+        if name == "parquet":
+            out = _write_parquet(rows, tmp, batch_rows)
+        else:
+            out = _write_jsonl(rows, tmp)
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
+    finally:
+        close = getattr(rows, "close", None)
+        if close:
+            close()
+    tmp.replace(dest)
+    return {
+        "path": str(dest),
+        "format": name,
+        "rows": out["rows"],
+        "bytes": dest.stat().st_size,
+        "schema": out["schema"],
+    }
@@ -0,0 +1,188 @@
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from .config import QueryOptions
+from .scheduler import QueryCancelled, current_call
+
+log = logging.getLogger(__name__)
+
+# The first row marks the stream as open; watch_monitoring() subscribes right after.
+READY_COLUMN = "_FlowWaiterReady"
+COMPLETION_VQL = (
+    f"SELECT * FROM chain(a={{SELECT TRUE AS {READY_COLUMN} FROM scope()}}, "
+    "b={SELECT * FROM watch_monitoring(artifact='System.Flow.Completion')})"
+)
+FINAL_STATES = ("FINISHED", "ERROR")
+
+FlowKey = Tuple[str, str]
+
+
+def _completion_key(row: Dict[str, Any]) -> Optional[FlowKey]:
+    flow = row.get("Flow") or {}
+    client_id = row.get("ClientId") or flow.get("client_id")
+    flow_id = row.get("FlowId") or flow.get("session_id")
+    return (client_id, flow_id) if client_id and flow_id else None
+
+
+class FlowWaiter:
+    """
+    Learns about finished flows from one shared System.Flow.Completion stream.
+
+    The stream is opened on the first wait() and kept for the life of the process, so
+    any number of pending collections cost one server-side watcher instead of one poll
+    loop each. Recent completions are remembered so a flow that finishes between
+    scheduling and wait() is not missed; flows that finished before the stream was
+    listening are caught by a single flows() lookup, and every (re)connect looks up
+    each pending flow once more so completions during an outage are not lost. Other
+    components can subscribe() to every completion row (e.g. to invalidate caches a
+    finished flow made stale).
+    """
+
+    RECENT_COMPLETIONS = 4096
+
+    def __init__(self, client, reconnect_delay: float = 2.0):
+        self.client = client
+        self.reconnect_delay = reconnect_delay
+        self._lock = threading.Lock()
+        self._waiters: Dict[FlowKey, threading.Event] = {}
+        self._completed: "OrderedDict[FlowKey, Dict[str, Any]]" = OrderedDict()
+        self._thread: Optional[threading.Thread] = None
+        self._listening = threading.Event()
+        self._stop = threading.Event()
+        self._listeners: List[Callable[[Dict[str, Any]], None]] = []
+
+    def _complete(self, key: FlowKey, row: Dict[str, Any]) -> None:
+        with self._lock:
+            self._completed[key] = row
+            while len(self._completed) > self.RECENT_COMPLETIONS:
+                self._completed.popitem(last=False)
+            event = self._waiters.get(key)
+        if event:
+            event.set()
+
+    def _record(self, row: Dict[str, Any]) -> None:
+        for listener in list(self._listeners):
+            try:
+                listener(row)
+            except Exception as exc:  # pragma: no cover
+                # A listener must not kill the stream.
+                log.warning("flow completion listener failed: %s", exc)
+        key = _completion_key(row)
+        if key is not None:
+            self._complete(key, row)
+
+    def _recheck_pending(self) -> None:
+        """Look up every pending flow once; those that finished meanwhile complete."""
+        with self._lock:
+            pending = [key for key in self._waiters if key not in self._completed]
+        for client_id, flow_id in pending:
+            try:
+                row = self._flow_state(client_id, flow_id)
+            except Exception as exc:  # pragma: no cover - the waiter keeps waiting
+                log.warning("flow state lookup failed: %s", exc)
+                continue
+            if row is not None:
+                self._complete((client_id, flow_id), row)
+
+    def _run(self) -> None:
+        # Completions should be delivered as they happen, not batched.
+        options = QueryOptions(max_row=100, max_wait=1, timeout=0)
+        while not self._stop.is_set():
+            try:
+                for row in self.client.query(COMPLETION_VQL, options=options):
+                    if READY_COLUMN in row:
+                        self._listening.set()
+                        self._recheck_pending()
+                    else:
+                        self._record(row)
+                    if self._stop.is_set():
+                        return
+            except Exception as exc:  # pragma: no cover - reconnects below
+                log.warning("flow completion stream failed: %s", exc)
+            # New waiters wait for the reconnect instead of trusting a dead stream.
+            self._listening.clear()
+            self._stop.wait(self.reconnect_delay)
+
+    def _ensure_listening(self, timeout: float = 5.0) -> None:
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="flow-completion", daemon=True
+                )
+                self._thread.start()
+        self._listening.wait(timeout)
+
+    def _flow_state(self, client_id: str, flow_id: str) -> Optional[Dict[str, Any]]:
+        safe_client_id = client_id.replace("'", "''")
+        safe_flow_id = flow_id.replace("'", "''")
+        rows = list(
+            self.client.query(
+                f"SELECT * FROM flows(client_id='{safe_client_id}', "
+                f"flow_id='{safe_flow_id}')"
+            )
+        )
+        if rows and str(rows[0].get("state", "")).upper() in FINAL_STATES:
+            return rows[0]
+        return None
+
+    def wait(
+        self, client_id: str, flow_id: str, timeout: float
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Block until the flow completes; return its completion row or None on timeout.
+
+        `timeout` counts from the call, including the wait for the stream to open, and
+        is capped by the bound tool call's deadline. Cancelling that call stops the
+        wait with QueryCancelled.
+        """
+        key = (client_id, flow_id)
+        deadline = time.monotonic() + timeout
+        call = current_call()
+        if call is not None and call.deadline is not None:
+            deadline = min(deadline, call.deadline)
+        event = threading.Event()
+        with self._lock:
+            if key in self._completed:
+                return self._completed[key]
+            self._waiters[key] = event
+        unregister = call.on_cancel(event.set) if call is not None else None
+        try:
+            self._ensure_listening(min(5.0, max(0.0, deadline - time.monotonic())))
+            self._check_cancelled(call)
+            already_done = self._flow_state(client_id, flow_id)
+            if already_done is not None:
+                return already_done
+            event.wait(max(0.0, deadline - time.monotonic()))
+            with self._lock:
+                completion = self._completed.get(key)
+            if completion is None:
+                self._check_cancelled(call)
+            return completion
+        finally:
+            if unregister is not None:
+                unregister()
+            with self._lock:
+                self._waiters.pop(key, None)
+
+    @staticmethod
+    def _check_cancelled(call) -> None:
+        if call is not None and call.cancelled:
+            raise QueryCancelled(f"{call.tool or 'wait'} was cancelled")
+
+    def subscribe(self, listener: Callable[[Dict[str, Any]], None]) -> None:
+        """Call `listener` with every completion row from now on."""
+        with self._lock:
+            self._listeners.append(listener)
+        self._ensure_listening()
+
+    def pending(self) -> int:
+        with self._lock:
+            return len(self._waiters)
+
+    def stop(self) -> None:
+        self._stop.set()
@@ -0,0 +1,198 @@
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+from .client import VelociraptorClient, get_client
+from .config import ServerConfig
+
+log = logging.getLogger(__name__)
+
+
+def client_hostname(row: Dict[str, Any]) -> str:
+    os_info = row.get("os_info") or {}
+    return str(
+        row.get("Hostname") or os_info.get("hostname") or os_info.get("fqdn") or ""
+    )
+
+
+def client_labels(row: Dict[str, Any]) -> List[str]:
+    return list(row.get("labels") or row.get("Labels") or [])
+
+
+class ClientInventory:
+    """
+    Process-wide copy of clients() indexed by client_id, hostname and label.
+
+    The first lookup loads the full table; after that a background thread pulls only
+    clients whose last_seen_at moved past the watermark every `ttl` seconds, with a
+    full reload every `full_refresh_every` refreshes to pick up label changes and
+    removed clients. Hostname and label keys are case-insensitive.
+    """
+
+    def __init__(
+        self, client: VelociraptorClient, ttl: float, full_refresh_every: int = 10
+    ):
+        self.client = client
+        self.ttl = ttl
+        self.full_refresh_every = max(1, full_refresh_every)
+        self._lock = threading.RLock()
+        self._by_id: Dict[str, Dict[str, Any]] = {}
+        self._by_hostname: Dict[str, Set[str]] = {}
+        self._by_label: Dict[str, Set[str]] = {}
+        self._watermark = 0
+        self._loaded_at: Optional[float] = None
+        self._refreshes = 0
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._stats: Dict[str, Any] = {
+            "hits": 0,
+            "misses": 0,
+            "full_refreshes": 0,
+            "incremental_refreshes": 0,
+            "refresh_errors": 0,
+            "last_refresh_seconds": None,
+            "last_refresh_rows": 0,
+        }
+
+    #
+    # Index maintenance
+    #
+    def _unindex(self, client_id: str) -> None:
+        old = self._by_id.pop(client_id, None)
+        if not old:
+            return
+        self._by_hostname.get(client_hostname(old).lower(), set()).discard(client_id)
+        for label in client_labels(old):
+            self._by_label.get(str(label).lower(), set()).discard(client_id)
+
+    def _index(self, row: Dict[str, Any]) -> None:
+        client_id = row.get("client_id")
+        if not client_id:
+            return
+        self._unindex(client_id)
+        self._by_id[client_id] = row
+        self._by_hostname.setdefault(client_hostname(row).lower(), set()).add(client_id)
+        for label in client_labels(row):
+            self._by_label.setdefault(str(label).lower(), set()).add(client_id)
+        try:
+            self._watermark = max(self._watermark, int(row.get("last_seen_at") or 0))
+        except (TypeError, ValueError):
+            pass
+
+    def refresh(self, full: bool = False) -> int:
+        """Reload from the server; incremental unless `full` or nothing is loaded yet."""
+        full = full or self._loaded_at is None
+        vql = "SELECT * FROM clients()"
+        if not full:
+            vql += f" WHERE last_seen_at > {self._watermark}"
+        started = time.monotonic()
+        rows = list(self.client.query(vql))
+        with self._lock:
+            if full:
+                self._by_id.clear()
+                self._by_hostname.clear()
+                self._by_label.clear()
+                self._watermark = 0
+            for row in rows:
+                self._index(row)
+            self._loaded_at = time.time()
+            self._refreshes += 1
+            self._stats["full_refreshes" if full else "incremental_refreshes"] += 1
+            self._stats["last_refresh_seconds"] = round(time.monotonic() - started, 6)
+            self._stats["last_refresh_rows"] = len(rows)
+        return len(rows)
+
+    def _refresh_loop(self) -> None:
+        while not self._stop.wait(self.ttl):
+            try:
+                self.refresh(full=self._refreshes % self.full_refresh_every == 0)
+            except Exception as exc:  # pragma: no cover - logged and retried next tick
+                self._stats["refresh_errors"] += 1
+                log.warning("client inventory refresh failed: %s", exc)
+
+    def _ensure_loaded(self) -> None:
+        if self._loaded_at is None:
+            with self._lock:
+                if self._loaded_at is None:
+                    self.refresh(full=True)
+        if self._thread is None and self.ttl > 0:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(
+                        target=self._refresh_loop, name="client-inventory", daemon=True
+                    )
+                    self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    #
+    # Lookups
+    #
+    def get(self, client_id: str) -> Optional[Dict[str, Any]]:
+        """Return one client, falling back to the server for clients not yet indexed."""
+        self._ensure_loaded()
+        with self._lock:
+            row = self._by_id.get(client_id)
+            self._stats["hits" if row else "misses"] += 1
+        if row is None:
+            safe_client_id = client_id.replace("'", "''")
+            fetched = list(
+                self.client.query(
+                    f"SELECT * FROM clients() WHERE client_id='{safe_client_id}'"
+                )
+            )
+            with self._lock:
+                for fetched_row in fetched:
+                    self._index(fetched_row)
+                row = self._by_id.get(client_id)
+        return row
+
+    def _rows(self, ids: Iterable[str]) -> List[Dict[str, Any]]:
+        return [self._by_id[i] for i in sorted(ids) if i in self._by_id]
+
+    def by_hostname(self, hostname: str) -> List[Dict[str, Any]]:
+        self._ensure_loaded()
+        with self._lock:
+            rows = self._rows(self._by_hostname.get(hostname.lower(), ()))
+            self._stats["hits"] += 1
+        return rows
+
+    def by_label(self, label: str) -> List[Dict[str, Any]]:
+        self._ensure_loaded()
+        with self._lock:
+            rows = self._rows(self._by_label.get(label.lower(), ()))
+            self._stats["hits"] += 1
+        return rows
+
+    def all(self) -> List[Dict[str, Any]]:
+        """Every client, ordered by client_id."""
+        self._ensure_loaded()
+        with self._lock:
+            rows = self._rows(self._by_id)
+            self._stats["hits"] += 1
+        return rows
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self._stats["hits"] + self._stats["misses"]
+            return {
+                **self._stats,
+                "clients": len(self._by_id),
+                "hit_rate": self._stats["hits"] / lookups if lookups else None,
+                "staleness_seconds": (
+                    round(time.time() - self._loaded_at, 3) if self._loaded_at else None
+                ),
+                "ttl_seconds": self.ttl,
+                "last_seen_watermark": self._watermark,
+            }
+
+
+@lru_cache(maxsize=1)
+def get_inventory(cfg: ServerConfig) -> ClientInventory:
+    """Singleton client inventory per process."""
+    return ClientInventory(get_client(cfg), ttl=cfg.client_inventory_ttl)
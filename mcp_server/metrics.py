@@ -0,0 +1,272 @@
+from __future__ import annotations
+
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from functools import lru_cache
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from .config import ServerConfig
+
+# Latency bucket upper bounds in seconds, roughly 2.5x apart from 1 ms to 5 min.
+LATENCY_BUCKETS: Tuple[float, ...] = (
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    25.0,
+    60.0,
+    120.0,
+    300.0,
+)
+QUANTILES = (0.5, 0.95, 0.99)
+# Keys that hold the row list of a tool response dict, in order of preference.
+ROW_KEYS = ("rows", "results", "items")
+# List items measured per list when sizing a tool result; longer lists are
+# extrapolated from these.
+SIZE_SAMPLE = 32
+
+
+def _quantile(buckets: List[int], calls: int, q: float) -> float:
+    """Linear interpolation inside the bucket holding rank q, like histogram_quantile."""
+    rank = q * calls
+    seen = 0
+    for i, count in enumerate(buckets):
+        if count and seen + count >= rank:
+            if i == len(LATENCY_BUCKETS):
+                return LATENCY_BUCKETS[-1]
+            lower = LATENCY_BUCKETS[i - 1] if i else 0.0
+            return lower + (LATENCY_BUCKETS[i] - lower) * (rank - seen) / count
+        seen += count
+    return 0.0
+
+
+class _Series:
+    __slots__ = ("calls", "errors", "rows", "bytes", "seconds", "buckets")
+
+    def __init__(self):
+        self.calls = 0
+        self.errors: Dict[str, int] = {}
+        self.rows = 0
+        self.bytes = 0
+        self.seconds = 0.0
+        # One slot per bucket plus the +Inf overflow.
+        self.buckets = [0] * (len(LATENCY_BUCKETS) + 1)
+
+
+class Metrics:
+    """
+    Call counts, latency histograms, rows, bytes and error codes per operation.
+
+    Operations are named `<kind>:<name>`, e.g. `tool:list_clients` or `grpc:Query`.
+    Recording is a bucket lookup and a few increments under one lock; quantiles are
+    only computed when a snapshot is taken.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._series: Dict[str, _Series] = {}
+        self.started = time.time()
+
+    def observe(
+        self,
+        name: str,
+        seconds: float,
+        rows: int = 0,
+        bytes: int = 0,
+        error: Optional[str] = None,
+    ) -> None:
+        bucket = bisect.bisect_left(LATENCY_BUCKETS, seconds)
+        with self._lock:
+            series = self._series.get(name)
+            if series is None:
+                series = self._series[name] = _Series()
+            series.calls += 1
+            series.rows += rows
+            series.bytes += bytes
+            series.seconds += seconds
+            series.buckets[bucket] += 1
+            if error is not None:
+                series.errors[error] = series.errors.get(error, 0) + 1
+
+    @contextmanager
+    def timed(self, name: str) -> Iterator[Dict[str, Any]]:
+        """
+        Time a block; the yielded dict takes `rows`/`bytes` counts. An exception is
+        recorded under its gRPC status code name, or its class name.
+        """
+        counts: Dict[str, Any] = {"rows": 0, "bytes": 0}
+        started = time.perf_counter()
+        error = None
+        try:
+            yield counts
+        except GeneratorExit:
+            # A consumer closing a row stream early is not a failure.
+            raise
+        except BaseException as exc:
+            error = error_code(exc)
+            raise
+        finally:
+            self.observe(
+                name,
+                time.perf_counter() - started,
+                counts["rows"],
+                counts["bytes"],
+                error,
+            )
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            series = {
+                name: (
+                    s.calls,
+                    dict(s.errors),
+                    s.rows,
+                    s.bytes,
+                    s.seconds,
+                    list(s.buckets),
+                )
+                for name, s in self._series.items()
+            }
+        out: Dict[str, Any] = {}
+        for name, (calls, errors, rows, nbytes, seconds, buckets) in sorted(
+            series.items()
+        ):
+            out[name] = {
+                "calls": calls,
+                "errors": errors,
+                "rows": rows,
+                "bytes": nbytes,
+                "seconds_total": round(seconds, 6),
+                **{
+                    f"p{int(q * 100)}_ms": round(_quantile(buckets, calls, q) * 1000, 3)
+                    for q in QUANTILES
+                },
+            }
+        return {
+            "uptime_seconds": round(time.time() - self.started, 1),
+            "operations": out,
+        }
+
+    def prometheus(self, prefix: str = "velociraptor_mcp") -> str:
+        """Render every series in the Prometheus text exposition format."""
+        with self._lock:
+            series = sorted(
+                (
+                    name,
+                    s.calls,
+                    dict(s.errors),
+                    s.rows,
+                    s.bytes,
+                    s.seconds,
+                    list(s.buckets),
+                )
+                for name, s in self._series.items()
+            )
+        families: Dict[str, List[str]] = {
+            "calls_total": [],
+            "errors_total": [],
+            "rows_total": [],
+            "bytes_total": [],
+        }
+        histogram: List[str] = []
+        for name, calls, errors, rows, nbytes, seconds, buckets in series:
+            kind, _, op = name.partition(":")
+            labels = f'kind="{kind}",op="{op}"'
+            families["calls_total"].append(f"{{{labels}}} {calls}")
+            for code, count in sorted(errors.items()):
+                families["errors_total"].append(f'{{{labels},code="{code}"}} {count}')
+            families["rows_total"].append(f"{{{labels}}} {rows}")
+            families["bytes_total"].append(f"{{{labels}}} {nbytes}")
+            cumulative = 0
+            for bound, count in zip(LATENCY_BUCKETS + (float("inf"),), buckets):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                histogram.append(f'_bucket{{{labels},le="{le}"}} {cumulative}')
+            histogram.append(f"_sum{{{labels}}} {seconds:.6f}")
+            histogram.append(f"_count{{{labels}}} {calls}")
+        lines: List[str] = []
+        for family, samples in families.items():
+            lines.append(f"# TYPE {prefix}_{family} counter")
+            lines.extend(f"{prefix}_{family}{sample}" for sample in samples)
+        lines.append(f"# TYPE {prefix}_latency_seconds histogram")
+        lines.extend(f"{prefix}_latency_seconds{sample}" for sample in histogram)
+        return "\n".join(lines) + "\n"
+
+
+def error_code(exc: BaseException) -> str:
+    """gRPC status code name (e.g. UNAVAILABLE) of an RpcError, else the class name."""
+    code = getattr(exc, "code", None)
+    if callable(code):
+        try:
+            return code().name
+        except Exception:
+            pass
+    return type(exc).__name__
+
+
+def result_rows(result: Any) -> int:
+    """
+    Row count of a tool result: a list, or the rows inside a response dict.
+
+    A dict is counted by its `rows`, `results` or `items` entry, else by its only
+    list value (e.g. {"hunts": [...], "next_cursor": ...}); a columnar layout nested
+    under one of those keys is followed.
+    """
+    if isinstance(result, list):
+        return len(result)
+    if not isinstance(result, dict):
+        return 0
+    for key in ROW_KEYS:
+        if key in result:
+            return result_rows(result[key])
+    lists = [value for value in result.values() if isinstance(value, list)]
+    return len(lists[0]) if len(lists) == 1 else 0
+
+
+def result_bytes(result: Any) -> int:
+    """
+    Estimated size of a tool result as compact JSON, the payload sent to the model.
+
+    Nothing is serialized: strings count their length, and a list longer than
+    SIZE_SAMPLE is extrapolated from its first SIZE_SAMPLE items, so a large page
+    or base64 payload costs about as much as a small one. ASCII results without
+    escapes and without long lists are measured exactly.
+    """
+    if isinstance(result, str):
+        return len(result) + 2
+    if result is None or isinstance(result, bool):
+        return 5 if result is False else 4
+    if isinstance(result, (int, float)):
+        return len(repr(result))
+    if isinstance(result, dict):
+        return (
+            1
+            + sum(
+                len(str(key)) + 4 + result_bytes(value) for key, value in result.items()
+            )
+            + (0 if result else 1)
+        )
+    if isinstance(result, (list, tuple)):
+        if not result:
+            return 2
+        head = result[:SIZE_SAMPLE]
+        sampled = sum(result_bytes(item) + 1 for item in head)
+        return 1 + sampled * len(result) // len(head)
+    return len(str(result)) + 2
+
+
+@lru_cache(maxsize=1)
+def get_metrics(cfg: ServerConfig) -> Metrics:
+    """Process-wide metrics registry."""
+    return Metrics()
@@ -0,0 +1,92 @@
+from __future__ import annotations
+
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Dict, Optional, Tuple
+
+from .config import ServerConfig
+
+# flow_id -> (rows of the flow already returned, total_collected_rows when the flow
+# was last read to its end, 0 while rows are left).
+FlowMarks = Dict[str, Tuple[int, int]]
+# Reserved FlowMarks key: (newest Flow.active_time seen, 0). Flows last active
+# before it and fully read need not be listed again.
+ACTIVE_TIME_MARK = ""
+# (session, hunt_id, client_id or "")
+WatermarkKey = Tuple[str, str, str]
+
+# Polling states kept (LRU) and cursors kept per state for retried polls.
+MAX_WATERMARKS = 1024
+CURSOR_HISTORY = 8
+
+
+class WatermarkStore:
+    """
+    Per-(session, hunt, client filter) positions of incremental hunt result polls.
+
+    Every poll that returns rows commits new per-flow marks under a larger cursor.
+    The last CURSOR_HISTORY cursors of a key stay valid, so a poll whose response
+    was lost can be repeated with the previous cursor and returns the same rows.
+    """
+
+    def __init__(
+        self, max_entries: int = MAX_WATERMARKS, history: int = CURSOR_HISTORY
+    ):
+        self.max_entries = max_entries
+        self.history = max(1, history)
+        self._lock = threading.Lock()
+        self._states: "OrderedDict[WatermarkKey, OrderedDict[int, FlowMarks]]" = (
+            OrderedDict()
+        )
+
+    def begin(self, key: WatermarkKey, cursor: Optional[int]) -> Tuple[int, FlowMarks]:
+        """
+        Marks to continue from: the latest for `cursor=None`, none for 0.
+
+        Raises ValueError for a cursor that was never issued or has expired.
+        """
+        with self._lock:
+            snapshots = self._states.get(key)
+            if snapshots is not None:
+                self._states.move_to_end(key)
+            if cursor == 0 or (cursor is None and not snapshots):
+                return 0, {}
+            if cursor is None:
+                cursor = next(reversed(snapshots))
+            if not snapshots or cursor not in snapshots:
+                raise ValueError(
+                    f"Unknown or expired cursor {cursor}; poll with cursor=0"
+                )
+            return cursor, dict(snapshots[cursor])
+
+    def commit(self, key: WatermarkKey, base: int, marks: FlowMarks, rows: int) -> int:
+        """
+        Record `marks` reached from cursor `base` after returning `rows` rows.
+
+        The new cursor is above every cursor issued for `key`; a poll that changed
+        nothing keeps `base`.
+        """
+        with self._lock:
+            snapshots = self._states.setdefault(key, OrderedDict())
+            self._states.move_to_end(key)
+            if snapshots.get(base, {} if base == 0 else None) == marks:
+                return base
+            cursor = max(next(reversed(snapshots), 0), base) + max(rows, 1)
+            snapshots[cursor] = dict(marks)
+            snapshots.move_to_end(cursor)
+            while len(snapshots) > self.history:
+                snapshots.popitem(last=False)
+            while len(self._states) > self.max_entries:
+                self._states.popitem(last=False)
+            return cursor
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"watermarks": len(self._states), "max_watermarks": self.max_entries}
+
+
+@lru_cache(maxsize=1)
+def get_watermarks(cfg: ServerConfig) -> WatermarkStore:
+    """Process-wide store of hunt polling watermarks."""
+    return WatermarkStore()
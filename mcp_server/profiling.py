@@ -0,0 +1,151 @@
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Any, Deque, Dict, Iterator, List, Optional
+
+from .cache import is_event_query, normalize_vql, statement_shape
+from .config import ServerConfig
+from .metrics import error_code
+
+log = logging.getLogger(__name__)
+MAX_STATEMENT_CHARS = 2000
+
+
+@dataclass
+class QueryProfile:
+    """Timing and volume of one Query RPC, filled in frame by frame."""
+
+    vql: str
+    started: float
+    seconds: float = 0.0
+    first_row_seconds: Optional[float] = None
+    frames: int = 0
+    rows: int = 0
+    bytes: int = 0
+    error: Optional[str] = None
+    _t0: float = field(default_factory=time.perf_counter, repr=False)
+
+    def frame(self, rows: int, nbytes: int) -> None:
+        if self.first_row_seconds is None and rows:
+            self.first_row_seconds = time.perf_counter() - self._t0
+        self.frames += 1
+        self.rows += rows
+        self.bytes += nbytes
+
+
+class QueryProfiler:
+    """
+    Ring buffer of the last `size` query profiles plus a slow-query log.
+
+    Recording keeps a reference to the VQL string; normalizing and stripping literals
+    happens only when a report is built. Statements slower than `slow_seconds` are
+    logged at WARNING on this module's logger (0 disables the slow log).
+    """
+
+    def __init__(self, size: int, slow_seconds: float):
+        self.slow_seconds = slow_seconds
+        self._lock = threading.Lock()
+        self._profiles: Deque[QueryProfile] = deque(maxlen=max(1, size))
+        self._slow = 0
+
+    @contextmanager
+    def profile(self, vql: str) -> Iterator[QueryProfile]:
+        profile = QueryProfile(vql=vql, started=time.time())
+        try:
+            yield profile
+        except GeneratorExit:
+            raise
+        except BaseException as exc:
+            profile.error = error_code(exc)
+            raise
+        finally:
+            profile.seconds = time.perf_counter() - profile._t0
+            # Event streams run for the life of the watcher; timing them is meaningless.
+            if not is_event_query(vql):
+                self.record(profile)
+
+    def record(self, profile: QueryProfile) -> None:
+        slow = 0 < self.slow_seconds <= profile.seconds
+        with self._lock:
+            self._profiles.append(profile)
+            self._slow += slow
+        if slow:
+            log.warning(
+                "slow query %.3fs (first row %s, %d frames, %d rows, %d bytes%s): %s",
+                profile.seconds,
+                (
+                    "-"
+                    if profile.first_row_seconds is None
+                    else f"{profile.first_row_seconds:.3f}s"
+                ),
+                profile.frames,
+                profile.rows,
+                profile.bytes,
+                f", error {profile.error}" if profile.error else "",
+                normalize_vql(profile.vql)[:MAX_STATEMENT_CHARS],
+            )
+
+    def top(self, n: int = 20) -> Dict[str, Any]:
+        """
+        Statement shapes (literals replaced by `?`) ranked by total wall time over
+        the buffered profiles.
+        """
+        with self._lock:
+            profiles = list(self._profiles)
+            slow_total = self._slow
+        shapes: Dict[str, Dict[str, Any]] = {}
+        for p in profiles:
+            shape = statement_shape(p.vql)[:MAX_STATEMENT_CHARS]
+            entry = shapes.get(shape)
+            if entry is None:
+                entry = shapes[shape] = {
+                    "shape": shape,
+                    "count": 0,
+                    "slow": 0,
+                    "errors": 0,
+                    "total_seconds": 0.0,
+                    "max_seconds": 0.0,
+                    "first_row_seconds": [],
+                    "frames": 0,
+                    "rows": 0,
+                    "bytes": 0,
+                }
+            entry["count"] += 1
+            entry["slow"] += 0 < self.slow_seconds <= p.seconds
+            entry["errors"] += p.error is not None
+            entry["total_seconds"] += p.seconds
+            entry["max_seconds"] = max(entry["max_seconds"], p.seconds)
+            if p.first_row_seconds is not None:
+                entry["first_row_seconds"].append(p.first_row_seconds)
+            entry["frames"] += p.frames
+            entry["rows"] += p.rows
+            entry["bytes"] += p.bytes
+        ranked: List[Dict[str, Any]] = sorted(
+            shapes.values(), key=lambda e: e["total_seconds"], reverse=True
+        )[:n]
+        for entry in ranked:
+            firsts = entry.pop("first_row_seconds")
+            entry["avg_seconds"] = round(entry["total_seconds"] / entry["count"], 4)
+            entry["avg_first_row_seconds"] = (
+                round(sum(firsts) / len(firsts), 4) if firsts else None
+            )
+            entry["total_seconds"] = round(entry["total_seconds"], 4)
+            entry["max_seconds"] = round(entry["max_seconds"], 4)
+        return {
+            "slow_seconds": self.slow_seconds,
+            "profiled": len(profiles),
+            "slow_total": slow_total,
+            "shapes": ranked,
+        }
+
+
+@lru_cache(maxsize=1)
+def get_profiler(cfg: ServerConfig) -> QueryProfiler:
+    """Process-wide query profiler."""
+    return QueryProfiler(cfg.query_profile_size, cfg.slow_query_seconds)
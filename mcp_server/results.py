@@ -0,0 +1,334 @@
+from __future__ import annotations
+
+import ast
+import itertools
+import json
+import operator
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+import pandas as pd
+from pandas.api.types import is_object_dtype
+
+from .config import ServerConfig
+
+# Rows normalized per DataFrame chunk while a result is read into the store.
+FRAME_CHUNK_ROWS = 5000
+
+
+@dataclass
+class StoredResult:
+    session: str
+    frame: pd.DataFrame
+    source: str
+    bytes: int
+    created: float = field(default_factory=time.time)
+
+
+def frame_bytes(frame: pd.DataFrame) -> int:
+    return int(frame.memory_usage(index=True, deep=True).sum())
+
+
+def frame_records(frame: pd.DataFrame, limit: int = 0) -> List[Dict[str, Any]]:
+    """JSON-safe rows (NaN -> None, timestamps as ISO strings) for a tool response."""
+    head = frame.head(limit) if limit else frame
+    return json.loads(head.to_json(orient="records", date_format="iso"))
+
+
+class ResultStore:
+    """
+    Materialized query results held as DataFrames under opaque handles.
+
+    Handles belong to the MCP session that created them; another session asking for
+    the same handle gets the same error as for an expired one. The least recently
+    used handles are evicted once the byte budget or the handle cap is exceeded.
+    """
+
+    def __init__(self, max_bytes: int, max_handles: int):
+        self.max_bytes = max_bytes
+        self.max_handles = max_handles
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, StoredResult]" = OrderedDict()
+        self._bytes = 0
+        self._evictions = 0
+
+    def _evict_locked(self) -> None:
+        while self._entries and (
+            self._bytes > self.max_bytes or len(self._entries) > self.max_handles
+        ):
+            _, entry = self._entries.popitem(last=False)
+            self._bytes -= entry.bytes
+            self._evictions += 1
+
+    def put(self, session: str, frame: pd.DataFrame, source: str) -> str:
+        size = frame_bytes(frame)
+        if size > self.max_bytes:
+            raise ValueError(
+                f"Result needs {size} bytes, over the {self.max_bytes} byte store "
+                "budget; narrow the query with columns or LIMIT"
+            )
+        handle = uuid.uuid4().hex[:16]
+        with self._lock:
+            self._entries[handle] = StoredResult(session, frame, source, size)
+            self._bytes += size
+            self._evict_locked()
+        return handle
+
+    def get(self, session: str, handle: str) -> pd.DataFrame:
+        with self._lock:
+            entry = self._entries.get(handle)
+            if entry is None or entry.session != session:
+                raise ValueError(f"Unknown or evicted result handle: {handle!r}")
+            self._entries.move_to_end(handle)
+            return entry.frame
+
+    def drop(self, session: str, handle: str) -> bool:
+        with self._lock:
+            entry = self._entries.get(handle)
+            if entry is None or entry.session != session:
+                return False
+            del self._entries[handle]
+            self._bytes -= entry.bytes
+            return True
+
+    def handles(self, session: str) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [
+                {
+                    "handle": handle,
+                    "source": entry.source,
+                    "rows": len(entry.frame),
+                    "bytes": entry.bytes,
+                    "created": entry.created,
+                }
+                for handle, entry in self._entries.items()
+                if entry.session == session
+            ]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "handles": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "max_handles": self.max_handles,
+                "evictions": self._evictions,
+            }
+
+
+def to_frame(rows: Iterable[Dict[str, Any]], max_bytes: int = 0) -> pd.DataFrame:
+    """
+    Build a DataFrame from query rows, flattening one level of nesting.
+
+    clients() keeps the hostname under os_info, so it becomes an `os_info.hostname`
+    column that can be filtered, sorted and joined on directly.
+
+    Rows are normalized FRAME_CHUNK_ROWS at a time. With `max_bytes` reading stops
+    (closing `rows`, which cancels a query stream) as soon as the chunks built so
+    far exceed it, and ValueError is raised instead of materializing the rest.
+    """
+    iterator = iter(rows)
+    chunks: List[pd.DataFrame] = []
+    size = 0
+    while True:
+        batch = list(itertools.islice(iterator, FRAME_CHUNK_ROWS))
+        if not batch:
+            break
+        chunk = pd.json_normalize(batch, max_level=1)
+        chunks.append(chunk)
+        size += frame_bytes(chunk)
+        if max_bytes and size > max_bytes:
+            close = getattr(iterator, "close", None)
+            if close is not None:
+                close()
+            raise ValueError(
+                f"Result exceeds the {max_bytes} byte store budget after "
+                f"{sum(map(len, chunks))} rows; narrow the query with columns or LIMIT"
+            )
+    if not chunks:
+        return pd.DataFrame()
+    return chunks[0] if len(chunks) == 1 else pd.concat(chunks, ignore_index=True)
+
+
+_COMPARE: Dict[type, Callable[[Any, Any], Any]] = {
+    ast.Eq: operator.eq,
+    ast.NotEq: operator.ne,
+    ast.Lt: operator.lt,
+    ast.LtE: operator.le,
+    ast.Gt: operator.gt,
+    ast.GtE: operator.ge,
+}
+_LITERAL_TYPES = (str, int, float, bool, type(None))
+
+
+def _quote_columns(expr: str) -> Tuple[str, Dict[str, str]]:
+    """Replace `backtick quoted` column names with placeholders outside strings."""
+    out: List[str] = []
+    names: Dict[str, str] = {}
+    quote = ""
+    i = 0
+    while i < len(expr):
+        ch = expr[i]
+        if quote:
+            out.append(ch)
+            if ch == "\\" and i + 1 < len(expr):
+                out.append(expr[i + 1])
+                i += 1
+            elif ch == quote:
+                quote = ""
+        elif ch in "'\"":
+            quote = ch
+            out.append(ch)
+        elif ch == "`":
+            end = expr.find("`", i + 1)
+            if end < 0:
+                raise ValueError("Unterminated `quoted` column name")
+            placeholder = f"__column_{len(names)}"
+            names[placeholder] = expr[i + 1 : end]
+            out.append(placeholder)
+            i = end
+        else:
+            out.append(ch)
+        i += 1
+    return "".join(out), names
+
+
+class _FilterEvaluator:
+    """
+    Evaluates a parsed filter expression against a DataFrame.
+
+    Only column names, literals, comparisons (==, !=, <, <=, >, >=, in, not in
+    against a literal list) and and/or/not are accepted; anything else, such as
+    attribute access, calls, subscripts or `@` variables, is rejected before any
+    evaluation.
+    """
+
+    def __init__(self, frame: pd.DataFrame, names: Dict[str, str]):
+        self.frame = frame
+        self.names = names
+
+    def column(self, node: ast.Name) -> pd.Series:
+        name = self.names.get(node.id, node.id)
+        if name not in self.frame.columns:
+            raise ValueError(f"Unknown column {name!r}")
+        return self.frame[name]
+
+    def literal(self, node: ast.AST) -> Any:
+        if isinstance(node, ast.Constant) and isinstance(node.value, _LITERAL_TYPES):
+            return node.value
+        if (
+            isinstance(node, ast.UnaryOp)
+            and isinstance(node.op, ast.USub)
+            and isinstance(node.operand, ast.Constant)
+            and isinstance(node.operand.value, (int, float))
+            and not isinstance(node.operand.value, bool)
+        ):
+            return -node.operand.value
+        raise ValueError(f"Unsupported filter syntax: {ast.dump(node)[:80]}")
+
+    def operand(self, node: ast.AST) -> Any:
+        if isinstance(node, ast.Name):
+            return self.column(node)
+        return self.literal(node)
+
+    def compare(self, op: ast.cmpop, left: Any, right_node: ast.AST) -> pd.Series:
+        if isinstance(op, (ast.In, ast.NotIn)):
+            if not isinstance(left, pd.Series) or not isinstance(
+                right_node, (ast.List, ast.Tuple, ast.Set)
+            ):
+                raise ValueError("`in` needs a column on the left and a literal list")
+            mask = left.isin([self.literal(e) for e in right_node.elts])
+            return ~mask if isinstance(op, ast.NotIn) else mask
+        fn = _COMPARE.get(type(op))
+        if fn is None:
+            raise ValueError(f"Unsupported comparison {type(op).__name__}")
+        right = self.operand(right_node)
+        for a, b in ((left, right), (right, left)):
+            if (
+                isinstance(a, pd.Series)
+                and b is None
+                and fn in (operator.eq, operator.ne)
+            ):
+                return a.isna() if fn is operator.eq else a.notna()
+        return fn(left, right)
+
+    def mask(self, node: ast.AST) -> Any:
+        if isinstance(node, ast.BoolOp):
+            parts = [self.mask(v) for v in node.values]
+            combine = operator.and_ if isinstance(node.op, ast.And) else operator.or_
+            out = parts[0]
+            for part in parts[1:]:
+                out = combine(out, part)
+            return out
+        if isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.Not):
+            return ~self.mask(node.operand)
+        if isinstance(node, ast.Compare):
+            # a < b < c means (a < b) and (b < c).
+            lefts = [node.left, *node.comparators[:-1]]
+            parts = [
+                self.compare(op, self.operand(left), right)
+                for op, left, right in zip(node.ops, lefts, node.comparators)
+            ]
+            out = parts[0]
+            for part in parts[1:]:
+                out = out & part
+            return out
+        if isinstance(node, ast.Name):
+            return self.column(node).astype(bool)
+        raise ValueError(f"Unsupported filter syntax: {ast.dump(node)[:80]}")
+
+
+def filter_frame(frame: pd.DataFrame, expr: str) -> pd.DataFrame:
+    """
+    Rows of `frame` matching a restricted boolean expression.
+
+    E.g. "Size > 1000 and Name in ['a.exe', 'b.exe']" or
+    "`os_info.hostname` == 'web01'". See _FilterEvaluator for the grammar.
+    """
+    source, names = _quote_columns(expr)
+    try:
+        tree = ast.parse(source.strip(), mode="eval")
+    except SyntaxError as exc:
+        raise ValueError(f"Invalid filter expression {expr!r}: {exc.msg}") from exc
+    try:
+        mask = _FilterEvaluator(frame, names).mask(tree.body)
+    except (TypeError, ValueError) as exc:
+        raise ValueError(f"Invalid filter expression {expr!r}: {exc}") from exc
+    if not isinstance(mask, pd.Series):
+        mask = pd.Series(bool(mask), index=frame.index)
+    return frame[mask.fillna(False).astype(bool)]
+
+
+def _hashable(frame: pd.DataFrame) -> pd.DataFrame:
+    # describe() counts unique values, which fails on dict/list cells.
+    out = frame.copy()
+    for column in [c for c, t in out.dtypes.items() if is_object_dtype(t)]:
+        out[column] = out[column].map(
+            lambda v: json.dumps(v, default=str) if isinstance(v, (dict, list)) else v
+        )
+    return out
+
+
+@lru_cache(maxsize=1)
+def get_result_store(cfg: ServerConfig) -> ResultStore:
+    return ResultStore(cfg.result_store_bytes, cfg.result_store_handles)
+
+
+def describe_frame(frame: pd.DataFrame) -> Dict[str, Any]:
+    """Row count, dtypes, null counts and describe() statistics per column."""
+    summary: Optional[List[Dict[str, Any]]] = None
+    if len(frame.columns):
+        stats = _hashable(frame).describe(include="all").transpose()
+        stats.insert(0, "column", stats.index.astype(str))
+        summary = frame_records(stats)
+    return {
+        "rows": len(frame),
+        "dtypes": {str(c): str(t) for c, t in frame.dtypes.items()},
+        "nulls": {str(c): int(n) for c, n in frame.isna().sum().items()},
+        "summary": summary or [],
+    }
@@ -0,0 +1,310 @@
+from __future__ import annotations
+
+import asyncio
+import itertools
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, List, Optional
+
+from .cache import is_event_query
+from .config import ServerConfig
+from .metrics import get_metrics
+
+# Lower runs first. Tools without a configured class run as "normal".
+PRIORITIES: Dict[str, int] = {"interactive": 0, "normal": 1, "bulk": 2}
+
+
+class QueryDeadlineExceeded(TimeoutError):
+    """Raised when a tool call's deadline passes while its query waits for a slot."""
+
+
+class QueryCancelled(RuntimeError):
+    """Raised when the MCP request behind a query was cancelled."""
+
+
+@dataclass
+class CallContext:
+    """
+    The MCP tool call a query runs for: its session, priority class and deadline.
+
+    build_server binds one per tool call; asyncio.to_thread copies context variables,
+    so queries made from worker threads see it too. cancel() cancels every gRPC call
+    and queue wait registered through on_cancel().
+    """
+
+    tool: str = ""
+    session: str = ""
+    priority: str = "normal"
+    deadline: Optional[float] = None
+    cancelled: bool = False
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+    _callbacks: Dict[int, Callable[[], Any]] = field(default_factory=dict, repr=False)
+    _ids: Iterator[int] = field(default_factory=itertools.count, repr=False)
+
+    def remaining(self) -> Optional[float]:
+        """Seconds left before the deadline, or None without one."""
+        if self.deadline is None:
+            return None
+        return max(0.0, self.deadline - time.monotonic())
+
+    def on_cancel(self, callback: Callable[[], Any]) -> Callable[[], None]:
+        """Run `callback` on cancel() (at once if already cancelled); returns an unregister."""
+        with self._lock:
+            if not self.cancelled:
+                key = next(self._ids)
+                self._callbacks[key] = callback
+                return lambda: self._callbacks.pop(key, None)
+        callback()
+        return lambda: None
+
+    def cancel(self) -> None:
+        with self._lock:
+            self.cancelled = True
+            callbacks, self._callbacks = list(self._callbacks.values()), {}
+        for callback in callbacks:
+            callback()
+
+
+_CURRENT: ContextVar[Optional[CallContext]] = ContextVar("mcp_call", default=None)
+
+
+def current_call() -> Optional[CallContext]:
+    return _CURRENT.get()
+
+
+@contextmanager
+def bind_call(call: CallContext) -> Iterator[CallContext]:
+    token = _CURRENT.set(call)
+    try:
+        yield call
+    finally:
+        _CURRENT.reset(token)
+
+
+def rpc_kwargs(call: Optional[CallContext]) -> Dict[str, Any]:
+    """gRPC call arguments for the current tool call: its remaining deadline."""
+    remaining = call.remaining() if call is not None else None
+    return {} if remaining is None else {"timeout": remaining}
+
+
+def track(call: Optional[CallContext], rpc) -> Callable[[], None]:
+    """Cancel `rpc` when the tool call is cancelled; returns an unregister."""
+    return call.on_cancel(rpc.cancel) if call is not None else (lambda: None)
+
+
+class _Waiter:
+    __slots__ = ("priority", "seq", "session", "granted", "wake")
+
+    def __init__(self, priority: int, seq: int, session: str, wake: Callable[[], Any]):
+        self.priority = priority
+        self.seq = seq
+        self.session = session
+        self.granted = False
+        self.wake = wake
+
+    def __lt__(self, other: "_Waiter") -> bool:
+        return (self.priority, self.seq) < (other.priority, other.seq)
+
+
+class QueryScheduler:
+    """
+    Admission control for Query streams: a global cap, a per-session cap and a
+    smaller cap for bulk work so interactive lookups always find a free slot.
+
+    Waiters are served by priority class, then arrival order. A waiter that cannot
+    run because its session is at its cap does not block other sessions. Queue wait
+    counts against the tool call's deadline, and cancelling the call leaves the
+    queue. Event streams (watch_monitoring) are not scheduled.
+    """
+
+    def __init__(
+        self, max_concurrent: int, per_session: int, max_bulk: int, metrics=None
+    ):
+        self.max_concurrent = max(1, max_concurrent)
+        self.per_session = max(1, per_session)
+        self.max_bulk = max(1, min(max_bulk, self.max_concurrent))
+        self.metrics = metrics
+        self._lock = threading.Lock()
+        self._waiters: List[_Waiter] = []
+        self._seq = itertools.count()
+        self._running = 0
+        self._bulk = 0
+        self._sessions: Dict[str, int] = {}
+        self._stats = {"admitted": 0, "queued": 0, "timeouts": 0, "cancelled": 0}
+
+    def _fits_locked(self, priority: int, session: str) -> bool:
+        return (
+            self._running < self.max_concurrent
+            and (priority < PRIORITIES["bulk"] or self._bulk < self.max_bulk)
+            and self._sessions.get(session, 0) < self.per_session
+        )
+
+    def _take_locked(self, priority: int, session: str) -> None:
+        self._running += 1
+        self._bulk += priority >= PRIORITIES["bulk"]
+        self._sessions[session] = self._sessions.get(session, 0) + 1
+        self._stats["admitted"] += 1
+
+    def _dispatch_locked(self) -> None:
+        for waiter in sorted(self._waiters):
+            if self._running >= self.max_concurrent:
+                break
+            if self._fits_locked(waiter.priority, waiter.session):
+                self._take_locked(waiter.priority, waiter.session)
+                self._waiters.remove(waiter)
+                waiter.granted = True
+                waiter.wake()
+
+    def _release(self, priority: int, session: str) -> None:
+        with self._lock:
+            self._running -= 1
+            self._bulk -= priority >= PRIORITIES["bulk"]
+            left = self._sessions[session] - 1
+            if left:
+                self._sessions[session] = left
+            else:
+                del self._sessions[session]
+            self._dispatch_locked()
+
+    def _admit(
+        self, priority: int, session: str, wake: Callable[[], Any]
+    ) -> Optional[_Waiter]:
+        """Take a slot now (None) or enqueue and return the waiter."""
+        with self._lock:
+            if not self._waiters and self._fits_locked(priority, session):
+                self._take_locked(priority, session)
+                return None
+            waiter = _Waiter(priority, next(self._seq), session, wake)
+            self._waiters.append(waiter)
+            self._stats["queued"] += 1
+            self._dispatch_locked()
+            return waiter
+
+    def _abandon(self, waiter: _Waiter, reason: str) -> bool:
+        """Leave the queue; False if the slot was granted meanwhile and is now held."""
+        with self._lock:
+            if waiter.granted:
+                return False
+            self._waiters.remove(waiter)
+            self._stats[reason] += 1
+            self._dispatch_locked()
+            return True
+
+    def _observe_wait(self, priority_name: str, started: float) -> None:
+        if self.metrics is not None:
+            self.metrics.observe(
+                f"queue:{priority_name}", time.perf_counter() - started
+            )
+
+    @staticmethod
+    def _classify(call: Optional[CallContext]):
+        name = call.priority if call is not None else "normal"
+        return (
+            name,
+            PRIORITIES.get(name, PRIORITIES["normal"]),
+            call.session if call else "",
+        )
+
+    def _check(self, call: Optional[CallContext]) -> None:
+        if call is None:
+            return
+        if call.cancelled:
+            raise QueryCancelled(f"{call.tool or 'query'} was cancelled")
+        if call.remaining() == 0:
+            raise QueryDeadlineExceeded(f"{call.tool or 'query'} ran out of time")
+
+    @contextmanager
+    def slot(self, vql: str, call: Optional[CallContext] = None) -> Iterator[None]:
+        """Hold a query slot for the duration of the block (blocking wait)."""
+        if is_event_query(vql):
+            yield
+            return
+        self._check(call)
+        name, priority, session = self._classify(call)
+        started = time.perf_counter()
+        event = threading.Event()
+        waiter = self._admit(priority, session, event.set)
+        if waiter is not None:
+            unregister = (
+                call.on_cancel(event.set) if call is not None else (lambda: None)
+            )
+            try:
+                event.wait(call.remaining() if call is not None else None)
+            finally:
+                unregister()
+            if not waiter.granted:
+                reason = (
+                    "cancelled" if call is not None and call.cancelled else "timeouts"
+                )
+                if self._abandon(waiter, reason):
+                    self._check(call)
+                    raise QueryDeadlineExceeded("query slot wait timed out")
+        self._observe_wait(name, started)
+        try:
+            yield
+        finally:
+            self._release(priority, session)
+
+    @asynccontextmanager
+    async def slot_async(
+        self, vql: str, call: Optional[CallContext] = None
+    ) -> AsyncIterator[None]:
+        """asyncio counterpart of slot(); task cancellation leaves the queue."""
+        if is_event_query(vql):
+            yield
+            return
+        self._check(call)
+        name, priority, session = self._classify(call)
+        started = time.perf_counter()
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+
+        def wake():
+            loop.call_soon_threadsafe(lambda: future.done() or future.set_result(None))
+
+        waiter = self._admit(priority, session, wake)
+        if waiter is not None:
+            try:
+                await asyncio.wait_for(
+                    future, call.remaining() if call is not None else None
+                )
+            except asyncio.TimeoutError:
+                if self._abandon(waiter, "timeouts"):
+                    raise QueryDeadlineExceeded("query slot wait timed out") from None
+            except asyncio.CancelledError:
+                if self._abandon(waiter, "cancelled"):
+                    raise
+                self._release(priority, session)
+                raise
+        self._observe_wait(name, started)
+        try:
+            yield
+        finally:
+            self._release(priority, session)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                **self._stats,
+                "running": self._running,
+                "running_bulk": self._bulk,
+                "waiting": len(self._waiters),
+                "max_concurrent": self.max_concurrent,
+                "per_session": self.per_session,
+                "max_bulk": self.max_bulk,
+            }
+
+
+@lru_cache(maxsize=1)
+def get_scheduler(cfg: ServerConfig) -> QueryScheduler:
+    """Process-wide query scheduler shared by the sync and aio clients."""
+    return QueryScheduler(
+        cfg.query_concurrency,
+        cfg.session_query_concurrency,
+        cfg.bulk_query_concurrency,
+        metrics=get_metrics(cfg),
+    )
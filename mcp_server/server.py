@@ -1,12 +1,115 @@
 from __future__ import annotations
 
+import asyncio
+import functools
 import logging
+import time
+import uuid
+import weakref
 from typing import Any
 
 from mcp_server import tools
+from mcp_server.cache import get_query_cache
+from mcp_server.catalog import get_artifact_catalog
 from mcp_server.config import ServerConfig
+from mcp_server.cursors import get_cursor_store
+from mcp_server.inventory import get_inventory
+from mcp_server.metrics import (
+    Metrics,
+    error_code,
+    get_metrics,
+    result_bytes,
+    result_rows,
+)
+from mcp_server.profiling import get_profiler
+from mcp_server.scheduler import CallContext, bind_call, get_scheduler
+from mcp_server.blobs import get_blob_store
+from mcp_server.vfs import get_vfs_cache
 from mcp_server.resources import ARTIFACT_CATALOG, VQL_TEMPLATES
 from mcp_server.prompts import INCIDENT_RESPONSE_PROMPTS
+from mcp_server.results import get_result_store
+
+try:
+    from mcp.server.fastmcp import Context  # type: ignore
+except Exception:  # pragma: no cover - build_server reports the missing package
+    Context = Any  # type: ignore
+
+_SESSION_IDS: "weakref.WeakKeyDictionary[Any, str]" = weakref.WeakKeyDictionary()
+
+
+def session_id(ctx: Any) -> str:
+    """
+    Stable id of the MCP session behind a tool call's Context.
+
+    Session-scoped state (stored results, polling watermarks) is keyed on it. Calls
+    made outside a request (tests, scripts) share the "" session.
+    """
+    try:
+        session = ctx.session
+    except Exception:
+        return ""
+    sid = _SESSION_IDS.get(session)
+    if sid is None:
+        sid = _SESSION_IDS.setdefault(session, uuid.uuid4().hex)
+    return sid
+
+
+def instrumented(metrics: Metrics, fn):
+    """
+    Wrap an async tool handler so every call records latency, rows, response bytes
+    and errors.
+
+    functools.wraps keeps the signature and annotations FastMCP builds the tool
+    schema from.
+    """
+    name = f"tool:{fn.__name__}"
+
+    @functools.wraps(fn)
+    async def wrapper(*args, **kwargs):
+        started = time.perf_counter()
+        try:
+            result = await fn(*args, **kwargs)
+        except BaseException as exc:
+            metrics.observe(name, time.perf_counter() - started, error=error_code(exc))
+            raise
+        metrics.observe(
+            name,
+            time.perf_counter() - started,
+            rows=result_rows(result),
+            bytes=result_bytes(result),
+        )
+        return result
+
+    return wrapper
+
+
+def scheduled(cfg: ServerConfig, mcp, fn):
+    """
+    Run a tool handler under a CallContext: the session, priority class and deadline
+    its queries are scheduled with. Cancelling the MCP request (or the client going
+    away) cancels the gRPC calls the handler's worker thread still has open.
+    """
+    tool = fn.__name__
+    priority = cfg.tool_priority(tool)
+    seconds = cfg.query_deadline(tool)
+
+    @functools.wraps(fn)
+    async def wrapper(*args, **kwargs):
+        deadline = time.monotonic() + seconds if seconds > 0 else None
+        call = CallContext(
+            tool=tool,
+            session=session_id(mcp.get_context()),
+            priority=priority,
+            deadline=deadline,
+        )
+        with bind_call(call):
+            try:
+                return await fn(*args, **kwargs)
+            except asyncio.CancelledError:
+                call.cancel()
+                raise
+
+    return wrapper
 
 
 def build_server(cfg: ServerConfig):
@@ -27,53 +130,150 @@ def build_server(cfg: ServerConfig):
         instructions="Velociraptor MCP server exposing VQL, hunts, artifacts, VFS, and monitoring tools.",
         log_level=cfg.log_level,
     )
+    metrics = get_metrics(cfg)
+
+    def tool():
+        register = mcp.tool()
+        return lambda fn: register(instrumented(metrics, scheduled(cfg, mcp, fn)))
 
     #
-    # Tool registrations (thin wrappers to inject cfg)
+    # Tool registrations (thin wrappers to inject cfg). Handlers are async so a slow
+    # query never blocks the event loop: query_vql streams over grpc.aio and the
+    # remaining sync tools run in worker threads. @tool() registers with metrics and
+    # the query scheduler.
     #
-    @mcp.tool()
-    def query_vql(vql: str):
-        """Execute an arbitrary VQL query and return rows."""
-        return tools.query_vql(cfg, vql=vql)
-
-    @mcp.tool()
-    def list_clients(limit: int = 200, offset: int = 0):
-        """List enrolled Velociraptor clients."""
-        return tools.list_clients(cfg, limit=limit, offset=offset)
-
-    @mcp.tool()
-    def get_client_info(client_id: str):
+    @tool()
+    async def query_vql(
+        vql: str,
+        max_row: int | None = None,
+        max_wait: int | None = None,
+        timeout: int | None = None,
+        columns: list[str] | None = None,
+        max_field_bytes: int = 0,
+        format: str = "records",
+        spill: bool = False,
+        page_size: int = 100,
+        ctx: Context | None = None,
+    ):
+        """
+        Execute an arbitrary VQL query and return rows.
+
+        Optional max_row/max_wait/timeout override the server batching settings.
+        `columns` keeps only those fields, `max_field_bytes` truncates large values and
+        format="columnar" returns {"columns": [...], "rows": [[...]]}.
+        With spill=true large results go to a disk cursor: the first page_size rows are
+        returned with a cursor_id for fetch_cursor.
+        """
+        if spill:
+            return await asyncio.to_thread(
+                tools.query_vql,
+                cfg,
+                vql=vql,
+                max_row=max_row,
+                max_wait=max_wait,
+                timeout=timeout,
+                spill=True,
+                page_size=page_size,
+                session=session_id(ctx),
+            )
+        return await tools.query_vql_async(
+            cfg,
+            vql=vql,
+            max_row=max_row,
+            max_wait=max_wait,
+            timeout=timeout,
+            columns=columns,
+            max_field_bytes=max_field_bytes,
+            format=format,
+        )
+
+    @tool()
+    async def batch_query_vql(queries: dict[str, str]):
+        """
+        Run several named VQL statements in one round-trip.
+
+        `queries` maps a name to a VQL statement; rows come back keyed by name.
+        """
+        return await tools.batch_query_vql_async(cfg, queries=queries)
+
+    @tool()
+    async def list_clients(
+        limit: int = 200,
+        offset: int = 0,
+        cursor: str | None = None,
+        columns: list[str] | None = None,
+        max_field_bytes: int = 0,
+        format: str = "records",
+    ):
+        """List enrolled Velociraptor clients; pass next_cursor back to page."""
+        return await asyncio.to_thread(
+            tools.list_clients,
+            cfg,
+            limit=limit,
+            offset=offset,
+            cursor=cursor,
+            columns=columns,
+            max_field_bytes=max_field_bytes,
+            format=format,
+        )
+
+    @tool()
+    async def get_client_info(
+        client_id: str, columns: list[str] | None = None, max_field_bytes: int = 0
+    ):
         """Get detailed information for a client."""
-        return tools.get_client_info(cfg, client_id=client_id)
+        return await asyncio.to_thread(
+            tools.get_client_info,
+            cfg,
+            client_id=client_id,
+            columns=columns,
+            max_field_bytes=max_field_bytes,
+        )
 
-    @mcp.tool()
-    def search_clients(
+    @tool()
+    async def search_clients(
         hostname: str | None = None,
         label: str | None = None,
         query: str | None = None,
         limit: int = 200,
+        offset: int = 0,
+        cursor: str | None = None,
+        columns: list[str] | None = None,
+        max_field_bytes: int = 0,
+        format: str = "records",
     ):
         """Search clients by hostname, label, or VQL filter."""
-        return tools.search_clients(
-            cfg, hostname=hostname, label=label, query=query, limit=limit
+        return await asyncio.to_thread(
+            tools.search_clients,
+            cfg,
+            hostname=hostname,
+            label=label,
+            query=query,
+            limit=limit,
+            offset=offset,
+            cursor=cursor,
+            columns=columns,
+            max_field_bytes=max_field_bytes,
+            format=format,
         )
 
-    @mcp.tool()
-    def list_hunts(state: str | None = None, limit: int = 100):
+    @tool()
+    async def list_hunts(state: str | None = None, limit: int = 100):
         """List hunts with optional state filter."""
-        return tools.list_hunts(cfg, state=state, limit=limit)
+        return await asyncio.to_thread(tools.list_hunts, cfg, state=state, limit=limit)
 
-    @mcp.tool()
-    def get_hunt_details(hunt_id: str):
+    @tool()
+    async def get_hunt_details(hunt_id: str):
         """Get detailed info for a hunt."""
-        return tools.get_hunt_details(cfg, hunt_id=hunt_id)
+        return await asyncio.to_thread(tools.get_hunt_details, cfg, hunt_id=hunt_id)
 
-    @mcp.tool()
-    def create_hunt(
+    @tool()
+    async def create_hunt(
         artifact: str, query: str, description: str = "", start_immediately: bool = True
     ):
         """Create and optionally start a hunt from a VQL query."""
-        return tools.create_hunt(
+        return await asyncio.to_thread(
+            tools.create_hunt,
             cfg,
             artifact=artifact,
             query=query,
@@ -81,85 +281,390 @@ def build_server(cfg: ServerConfig):
             start_immediately=start_immediately,
         )
 
-    @mcp.tool()
-    def stop_hunt(hunt_id: str):
+    @tool()
+    async def stop_hunt(hunt_id: str):
         """Stop a running hunt."""
-        return tools.stop_hunt(cfg, hunt_id=hunt_id)
+        return await asyncio.to_thread(tools.stop_hunt, cfg, hunt_id=hunt_id)
 
-    @mcp.tool()
-    def get_hunt_results(hunt_id: str, client_id: str | None = None, limit: int = 200):
-        """Retrieve hunt results, optionally scoped to a client."""
-        return tools.get_hunt_results(
-            cfg, hunt_id=hunt_id, client_id=client_id, limit=limit
+    @tool()
+    async def get_hunt_results(
+        hunt_id: str,
+        client_id: str | None = None,
+        limit: int = 200,
+        columns: list[str] | None = None,
+        max_field_bytes: int = 0,
+        format: str = "records",
+        spill: bool = False,
+        page_size: int = 100,
+        incremental: bool = False,
+        cursor: int | None = None,
+        ctx: Context | None = None,
+    ):
+        """
+        Retrieve hunt results, optionally scoped to a client.
+
+        spill=true streams the full result (ignoring limit) to a disk cursor and
+        returns the first page_size rows; continue with fetch_cursor.
+
+        incremental=true returns only rows not yet returned to this session (up to
+        limit), with a growing cursor, more and done flags; poll again while the hunt
+        runs. cursor=0 starts over; repeating the last cursor replays that poll.
+        """
+        return await asyncio.to_thread(
+            tools.get_hunt_results,
+            cfg,
+            hunt_id=hunt_id,
+            client_id=client_id,
+            limit=limit,
+            columns=columns,
+            max_field_bytes=max_field_bytes,
+            format=format,
+            spill=spill,
+            page_size=page_size,
+            session=session_id(ctx),
+            incremental=incremental,
+            cursor=cursor,
+        )
+
+    @tool()
+    async def summarize_hunt_results(
+        hunt_id: str,
+        group_by: list[str],
+        aggregates: list[str] | None = None,
+        artifact: str | None = None,
+        limit: int = 1000,
+    ):
+        """Aggregate hunt results server-side (count, count_distinct:<col>, min/max:<col>) per group."""
+        return await asyncio.to_thread(
+            tools.summarize_hunt_results,
+            cfg,
+            hunt_id=hunt_id,
+            group_by=group_by,
+            aggregates=aggregates,
+            artifact=artifact,
+            limit=limit,
         )
 
-    @mcp.tool()
-    def list_artifacts(search: str | None = None, limit: int = 200):
-        """List artifacts available on the server."""
-        return tools.list_artifacts(cfg, search=search, limit=limit)
+    @tool()
+    async def list_artifacts(search: str | None = None, limit: int = 200):
+        """List artifacts available on the server (ranked keyword search when indexed)."""
+        return await asyncio.to_thread(
+            tools.list_artifacts, cfg, search=search, limit=limit
+        )
 
-    @mcp.tool()
-    def collect_artifact(
+    @tool()
+    async def collect_artifact(
         client_id: str, artifact: str, params: dict[str, Any] | None = None
     ):
         """Collect an artifact from a client."""
-        return tools.collect_artifact(
-            cfg, client_id=client_id, artifact=artifact, params=params
+        return await asyncio.to_thread(
+            tools.collect_artifact,
+            cfg,
+            client_id=client_id,
+            artifact=artifact,
+            params=params,
+        )
+
+    @tool()
+    async def collect_and_wait(
+        client_id: str,
+        artifact: str,
+        params: dict[str, Any] | None = None,
+        timeout: float = 300.0,
+        limit: int = 1000,
+    ):
+        """Collect an artifact, wait for the flow to finish and return its results."""
+        return await asyncio.to_thread(
+            tools.collect_and_wait,
+            cfg,
+            client_id=client_id,
+            artifact=artifact,
+            params=params,
+            timeout=timeout,
+            limit=limit,
+        )
+
+    @tool()
+    async def collect_artifact_bulk(
+        artifact: str,
+        client_ids: list[str] | None = None,
+        label: str | None = None,
+        search: str | None = None,
+        params: dict[str, Any] | None = None,
+        max_clients: int = 1000,
+    ):
+        """Collect an artifact from many clients (ids, label or search) in one call; reports ids left unscheduled and truncated label/search targets."""
+        return await asyncio.to_thread(
+            tools.collect_artifact_bulk,
+            cfg,
+            artifact=artifact,
+            client_ids=client_ids,
+            label=label,
+            search=search,
+            params=params,
+            max_clients=max_clients,
         )
 
-    @mcp.tool()
-    def upload_artifact(
+    @tool()
+    async def upload_artifact(
         name: str, vql: str, description: str = "", type_: str = "CLIENT"
     ):
         """Upload a custom artifact definition."""
-        return tools.upload_artifact(
-            cfg, name=name, vql=vql, description=description, type_=type_
+        return await asyncio.to_thread(
+            tools.upload_artifact,
+            cfg,
+            name=name,
+            vql=vql,
+            description=description,
+            type_=type_,
         )
 
-    @mcp.tool()
-    def get_artifact_definition(name: str):
+    @tool()
+    async def get_artifact_definition(name: str):
         """Fetch a stored artifact definition."""
-        return tools.get_artifact_definition(cfg, name=name)
+        return await asyncio.to_thread(tools.get_artifact_definition, cfg, name=name)
 
-    @mcp.tool()
-    def list_directory(client_id: str, path: str):
+    @tool()
+    async def list_directory(client_id: str, path: str):
         """List a directory from the Velociraptor VFS."""
-        return tools.list_directory(cfg, client_id=client_id, path=path)
+        return await asyncio.to_thread(
+            tools.list_directory, cfg, client_id=client_id, path=path
+        )
 
-    @mcp.tool()
-    def get_file_info(client_id: str, path: str):
+    @tool()
+    async def get_file_info(client_id: str, path: str):
         """Get file metadata from the VFS."""
-        return tools.get_file_info(cfg, client_id=client_id, path=path)
+        return await asyncio.to_thread(
+            tools.get_file_info, cfg, client_id=client_id, path=path
+        )
 
-    @mcp.tool()
-    def download_file(client_id: str, path: str, offset: int = 0, length: int = 0):
-        """Download a file (base64) from the VFS."""
-        return tools.download_file(
-            cfg, client_id=client_id, path=path, offset=offset, length=length
+    @tool()
+    async def walk_directory(
+        client_id: str, path: str, max_depth: int = 3, max_nodes: int = 2000
+    ):
+        """Recursively list a VFS subtree (breadth-first, parallel) as one flat listing."""
+        return await asyncio.to_thread(
+            tools.walk_directory,
+            cfg,
+            client_id=client_id,
+            path=path,
+            max_depth=max_depth,
+            max_nodes=max_nodes,
+        )
+
+    @tool()
+    async def download_file(
+        client_id: str,
+        path: str,
+        offset: int = 0,
+        length: int = 0,
+        dest_path: str | None = None,
+        overwrite: bool = False,
+    ):
+        """
+        Download a file from the VFS (base64, or streamed to dest_path on disk).
+
+        dest_path is relative to MCP_DOWNLOAD_DIR; existing files need overwrite.
+
+        With the blob store enabled, whole files return sha256 and a preview; use
+        read_blob for ranges.
+        """
+        return await asyncio.to_thread(
+            tools.download_file,
+            cfg,
+            client_id=client_id,
+            path=path,
+            offset=offset,
+            length=length,
+            dest_path=dest_path,
+            overwrite=overwrite,
+        )
+
+    @tool()
+    async def download_files(
+        files: list[dict[str, str]],
+        concurrency: int = 0,
+        dest_dir: str | None = None,
+    ):
+        """
+        Download many files ([{client_id, path}, ...]) in parallel into the blob store.
+
+        Returns a manifest of sha256, size and errors per file; read bytes with read_blob.
+        dest_dir (optional copies) is relative to MCP_DOWNLOAD_DIR.
+        """
+        return await asyncio.to_thread(
+            tools.download_files,
+            cfg,
+            files=files,
+            concurrency=concurrency,
+            dest_dir=dest_dir,
         )
 
-    @mcp.tool()
-    def get_server_stats():
+    @tool()
+    async def read_blob(sha256: str, offset: int = 0, length: int = 65536):
+        """Read a byte range of a stored download by sha256 (base64), no server call."""
+        return await asyncio.to_thread(
+            tools.read_blob, cfg, sha256=sha256, offset=offset, length=length
+        )
+
+    @tool()
+    async def get_server_stats():
         """Retrieve Velociraptor server stats."""
-        return tools.get_server_stats(cfg)
+        return await asyncio.to_thread(tools.get_server_stats, cfg)
 
-    @mcp.tool()
-    def get_client_activity(limit: int = 200):
+    @tool()
+    async def get_client_activity(limit: int = 200):
         """Recent client activity."""
-        return tools.get_client_activity(cfg, limit=limit)
+        return await asyncio.to_thread(tools.get_client_activity, cfg, limit=limit)
 
-    @mcp.tool()
-    def list_alerts(limit: int = 200):
+    @tool()
+    async def list_alerts(limit: int = 200):
         """List recent alerts."""
-        return tools.list_alerts(cfg, limit=limit)
+        return await asyncio.to_thread(tools.list_alerts, cfg, limit=limit)
 
-    @mcp.tool()
-    def create_alert(
+    @tool()
+    async def create_alert(
         title: str, message: str, client_id: str | None = None, severity: str = "INFO"
     ):
         """Create a custom alert."""
-        return tools.create_alert(
-            cfg, title=title, message=message, client_id=client_id, severity=severity
+        return await asyncio.to_thread(
+            tools.create_alert,
+            cfg,
+            title=title,
+            message=message,
+            client_id=client_id,
+            severity=severity,
+        )
+
+    @tool()
+    async def fetch_cursor(cursor_id: str, ctx: Context, n: int = 100):
+        """Next n rows of a spilled query/hunt result; `done` when exhausted."""
+        return await asyncio.to_thread(
+            tools.fetch_cursor, cfg, cursor_id=cursor_id, n=n, session=session_id(ctx)
+        )
+
+    @tool()
+    async def close_cursor(cursor_id: str, ctx: Context):
+        """Delete a spilled result cursor."""
+        return await asyncio.to_thread(
+            tools.close_cursor, cfg, cursor_id=cursor_id, session=session_id(ctx)
+        )
+
+    @tool()
+    async def export_results(
+        dest_path: str,
+        vql: str | None = None,
+        hunt_id: str | None = None,
+        artifact: str | None = None,
+        format: str | None = None,
+        overwrite: bool = False,
+    ):
+        """
+        Stream full query or hunt results to a local Parquet or gzip JSONL file.
+
+        dest_path is relative to MCP_EXPORT_DIR; existing files need overwrite.
+        Returns only path, row count, byte size and schema, never the rows.
+        """
+        return await asyncio.to_thread(
+            tools.export_results,
+            cfg,
+            dest_path=dest_path,
+            vql=vql,
+            hunt_id=hunt_id,
+            artifact=artifact,
+            format=format,
+            overwrite=overwrite,
+        )
+
+    @tool()
+    async def store_query_results(vql: str, ctx: Context, limit: int = 20):
+        """
+        Run VQL once and keep the rows under a handle for local re-slicing.
+
+        Use filter_results/sort_results/join_results/describe_results on the handle
+        instead of re-querying the server.
+        """
+        return await asyncio.to_thread(
+            tools.store_query_results,
+            cfg,
+            vql=vql,
+            session=session_id(ctx),
+            limit=limit,
+        )
+
+    @tool()
+    async def filter_results(handle: str, expr: str, ctx: Context, limit: int = 100):
+        """
+        Filter a stored result into a new handle, e.g. "Size > 1000 and Name != 'x'".
+
+        Allowed: column names (`dotted.names` in backticks), literals, comparisons,
+        in [...], and/or/not.
+        """
+        return await asyncio.to_thread(
+            tools.filter_results,
+            cfg,
+            handle=handle,
+            expr=expr,
+            session=session_id(ctx),
+            limit=limit,
+        )
+
+    @tool()
+    async def sort_results(
+        handle: str,
+        by: list[str],
+        ctx: Context,
+        ascending: bool = True,
+        limit: int = 100,
+    ):
+        """Sort a stored result by columns into a new handle."""
+        return await asyncio.to_thread(
+            tools.sort_results,
+            cfg,
+            handle=handle,
+            by=by,
+            ascending=ascending,
+            session=session_id(ctx),
+            limit=limit,
+        )
+
+    @tool()
+    async def join_results(
+        left: str,
+        right: str,
+        ctx: Context,
+        on: list[str] | None = None,
+        left_on: list[str] | None = None,
+        right_on: list[str] | None = None,
+        how: str = "inner",
+        limit: int = 100,
+    ):
+        """Join two stored results (e.g. hunt results with clients() on client id)."""
+        return await asyncio.to_thread(
+            tools.join_results,
+            cfg,
+            left=left,
+            right=right,
+            on=on,
+            left_on=left_on,
+            right_on=right_on,
+            how=how,
+            session=session_id(ctx),
+            limit=limit,
+        )
+
+    @tool()
+    async def describe_results(handle: str, ctx: Context):
+        """Column types, null counts and summary statistics of a stored result."""
+        return await asyncio.to_thread(
+            tools.describe_results, cfg, handle=handle, session=session_id(ctx)
+        )
+
+    @tool()
+    async def drop_results(handle: str, ctx: Context):
+        """Release a stored result handle."""
+        return await asyncio.to_thread(
+            tools.drop_results, cfg, handle=handle, session=session_id(ctx)
         )
 
     #
@@ -167,8 +672,80 @@ def build_server(cfg: ServerConfig):
     #
     @mcp.resource("resource://artifact-catalog")
     def artifact_catalog() -> list[dict[str, str]]:
-        """Static catalog of common artifacts."""
-        return ARTIFACT_CATALOG
+        """Artifacts from the local index when enabled, else a static list of common ones."""
+        catalog = get_artifact_catalog(cfg)
+        return ARTIFACT_CATALOG if catalog is None else catalog.all()
+
+    @mcp.resource("resource://artifact-catalog/stats")
+    def artifact_catalog_stats() -> dict[str, Any]:
+        """Artifact index statistics: size, age, refreshes and invalidations."""
+        catalog = get_artifact_catalog(cfg)
+        return (
+            {"enabled": False}
+            if catalog is None
+            else {"enabled": True, **catalog.stats()}
+        )
+
+    @mcp.resource("resource://client-inventory")
+    def client_inventory() -> dict[str, Any]:
+        """Client inventory cache statistics: hit rate, staleness and refresh cost."""
+        if cfg.client_inventory_ttl <= 0:
+            return {"enabled": False}
+        return {"enabled": True, **get_inventory(cfg).stats()}
+
+    @mcp.resource("resource://query-cache")
+    def query_cache() -> dict[str, Any]:
+        """Read-only query result cache statistics."""
+        cache = get_query_cache(cfg)
+        return (
+            {"enabled": False} if cache is None else {"enabled": True, **cache.stats()}
+        )
+
+    @mcp.resource("resource://vfs-cache")
+    def vfs_cache() -> dict[str, Any]:
+        """VFS directory listing cache statistics."""
+        cache = get_vfs_cache(cfg)
+        return (
+            {"enabled": False} if cache is None else {"enabled": True, **cache.stats()}
+        )
+
+    @mcp.resource("resource://blob-store")
+    def blob_store() -> dict[str, Any]:
+        """Downloaded file store: blobs, index entries, bytes, hits and dedupes."""
+        store = get_blob_store(cfg)
+        return (
+            {"enabled": False} if store is None else {"enabled": True, **store.stats()}
+        )
+
+    @mcp.resource("resource://result-store")
+    def result_store() -> dict[str, Any]:
+        """Stored result handles and memory use across sessions."""
+        return get_result_store(cfg).stats()
+
+    @mcp.resource("resource://cursors")
+    def cursors() -> dict[str, Any]:
+        """Spilled result cursors: count, disk use against the budget, evictions."""
+        return get_cursor_store(cfg).stats()
+
+    @mcp.resource("resource://metrics")
+    def metrics_resource() -> dict[str, Any]:
+        """Per-tool and per-RPC call counts, p50/p95/p99 latency, rows, bytes, errors."""
+        return metrics.snapshot()
+
+    @mcp.resource("resource://metrics/prometheus", mime_type="text/plain")
+    def metrics_prometheus() -> str:
+        """The same metrics in Prometheus text exposition format."""
+        return metrics.prometheus()
+
+    @mcp.resource("resource://scheduler")
+    def scheduler() -> dict[str, Any]:
+        """Query scheduler: running and queued streams, caps, timeouts, cancellations."""
+        return get_scheduler(cfg).stats()
+
+    @mcp.resource("resource://slow-queries")
+    def slow_queries() -> dict[str, Any]:
+        """Top 20 VQL statement shapes by total wall time, with first-row latency."""
+        return get_profiler(cfg).top(20)
 
     @mcp.resource("vql-template://{name}")
     def vql_template(name: str) -> str:
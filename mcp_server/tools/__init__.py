@@ -1,19 +1,48 @@
 """Tool entrypoints to be registered with FastMCP."""
 
-from .vql import query_vql
+from .vql import query_vql, query_vql_async, batch_query_vql, batch_query_vql_async
 from .clients import list_clients, get_client_info, search_clients
-from .hunts import list_hunts, get_hunt_details, create_hunt, stop_hunt, get_hunt_results
+from .hunts import (
+    list_hunts,
+    get_hunt_details,
+    create_hunt,
+    stop_hunt,
+    get_hunt_results,
+    summarize_hunt_results,
+)
 from .artifacts import (
     list_artifacts,
     collect_artifact,
+    collect_and_wait,
+    collect_artifact_bulk,
     upload_artifact,
     get_artifact_definition,
 )
-from .files import download_file, list_directory, get_file_info
+from .files import (
+    download_file,
+    download_files,
+    list_directory,
+    get_file_info,
+    walk_directory,
+    read_blob,
+)
 from .monitoring import get_server_stats, get_client_activity, list_alerts, create_alert
+from .cursors import fetch_cursor, close_cursor
+from .export import export_results
+from .results import (
+    store_query_results,
+    filter_results,
+    sort_results,
+    join_results,
+    describe_results,
+    drop_results,
+)
 
 __all__ = [
     "query_vql",
+    "query_vql_async",
+    "batch_query_vql",
+    "batch_query_vql_async",
     "list_clients",
     "get_client_info",
     "search_clients",
@@ -22,15 +51,30 @@ __all__ = [
     "create_hunt",
     "stop_hunt",
     "get_hunt_results",
+    "summarize_hunt_results",
     "list_artifacts",
     "collect_artifact",
+    "collect_and_wait",
+    "collect_artifact_bulk",
     "upload_artifact",
     "get_artifact_definition",
     "download_file",
     "list_directory",
     "get_file_info",
+    "walk_directory",
+    "read_blob",
+    "download_files",
     "get_server_stats",
     "get_client_activity",
     "list_alerts",
     "create_alert",
+    "fetch_cursor",
+    "close_cursor",
+    "export_results",
+    "store_query_results",
+    "filter_results",
+    "sort_results",
+    "join_results",
+    "describe_results",
+    "drop_results",
 ]
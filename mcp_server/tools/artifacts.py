@@ -1,7 +1,9 @@
 from __future__ import annotations
 
-from typing import Any, Dict, Optional
+import re
+from typing import Any, Dict, List, Optional
 
+from mcp_server.catalog import get_artifact_catalog
 from mcp_server.client import get_client
 from mcp_server.config import ServerConfig
 from mcp_server.utils import normalize_records
@@ -10,44 +12,179 @@ from mcp_server.utils import normalize_records
 def list_artifacts(
     cfg: ServerConfig, search: Optional[str] = None, limit: int = 200
 ) -> Dict[str, Any]:
+    """
+    List artifacts whose name or description matches the `search` regex.
+
+    With the artifact index enabled (MCP_ARTIFACT_CATALOG_TTL) `search` is read as
+    keywords instead and answered locally, ranked by relevance (`score`), matching
+    parameter names and source VQL as well.
+    """
+    catalog = get_artifact_catalog(cfg)
+    if catalog is not None:
+        return {"artifacts": catalog.search(search, limit=limit)}
     predicate = ""
     if search:
         safe_search = search.replace("'", "''")
         predicate = f" WHERE name =~ '{safe_search}' OR description =~ '{safe_search}'"
     # artifact_definitions() returns both compiled-in and custom artifacts; field names are lowercase.
     vql = f"SELECT name, description, type FROM artifact_definitions(){predicate} LIMIT {limit}"
-    rows = get_client(cfg).query(vql)
+    rows = get_client(cfg).query(
+        vql,
+        cache_ttl=cfg.cache_ttl("list_artifacts"),
+        options=cfg.query_options_for("list_artifacts"),
+    )
     return {"artifacts": normalize_records(rows)}
 
 
-def collect_artifact(
-    cfg: ServerConfig,
+def _param_clause(params: Optional[Dict[str, Any]]) -> str:
+    # Build VQL dict syntax for parameters: dict(key1='val1', key2='val2')
+    if not params:
+        return ""
+    param_items = ", ".join(
+        f"{k}='{str(v).replace(chr(39), chr(39)+chr(39))}'" for k, v in params.items()
+    )
+    return f", parameters=dict({param_items})"
+
+
+def _collect_vql(
     client_id: str,
     artifact: str,
     params: Optional[Dict[str, Any]] = None,
-) -> Dict[str, Any]:
-    # Build VQL dict syntax for parameters: dict(key1='val1', key2='val2')
-    param_clause = ""
-    if params:
-        param_items = ", ".join(
-            f"{k}='{str(v).replace(chr(39), chr(39)+chr(39))}'"
-            for k, v in params.items()
-        )
-        param_clause = f", parameters=dict({param_items})"
+    field: str = "",
+) -> str:
+    param_clause = _param_clause(params)
     # Escape single quotes in inputs
     safe_client_id = client_id.replace("'", "''")
     safe_artifact = artifact.replace("'", "''")
     # collect_client must be executed with FROM scope()
-    vql = (
-        "SELECT collect_client(client_id='{client_id}', artifacts=['{artifact}']{param_clause}) "
+    return (
+        "SELECT collect_client(client_id='{client_id}', artifacts=['{artifact}']{param_clause}){field} "
         "AS FlowId FROM scope()"
     ).format(
-        client_id=safe_client_id, artifact=safe_artifact, param_clause=param_clause
+        client_id=safe_client_id,
+        artifact=safe_artifact,
+        param_clause=param_clause,
+        field=field,
     )
-    rows = get_client(cfg).query(vql)
+
+
+def collect_artifact(
+    cfg: ServerConfig,
+    client_id: str,
+    artifact: str,
+    params: Optional[Dict[str, Any]] = None,
+) -> Dict[str, Any]:
+    vql = _collect_vql(client_id, artifact, params)
+    rows = get_client(cfg).query(vql, options=cfg.query_options_for("collect_artifact"))
     return {"result": normalize_records(rows)}
 
 
+def collect_and_wait(
+    cfg: ServerConfig,
+    client_id: str,
+    artifact: str,
+    params: Optional[Dict[str, Any]] = None,
+    timeout: float = 300.0,
+    limit: int = 1000,
+) -> Dict[str, Any]:
+    """
+    Collect an artifact, wait for the flow to complete, then return its results.
+
+    Completion is signalled by the shared System.Flow.Completion stream instead of
+    polling. On timeout, or when the tool call's deadline comes first, the flow keeps
+    running and `state` is "TIMEOUT"; results can be fetched later with
+    source(client_id=..., flow_id=...). Cancelling the call stops the wait.
+    """
+    client = get_client(cfg)
+    vql = _collect_vql(client_id, artifact, params, field=".flow_id")
+    rows = list(client.query(vql, options=cfg.query_options_for("collect_artifact")))
+    flow_id = rows[0].get("FlowId") if rows else None
+    if not flow_id:
+        raise RuntimeError(f"collect_client did not return a flow id: {rows}")
+    completion = client.wait_for_flow(client_id, flow_id, timeout=timeout)
+    out: Dict[str, Any] = {"client_id": client_id, "flow_id": flow_id}
+    if completion is None:
+        return {**out, "state": "TIMEOUT", "results": []}
+    flow = completion.get("Flow") or completion
+    safe_client_id = client_id.replace("'", "''")
+    safe_artifact = artifact.replace("'", "''")
+    results_vql = (
+        f"SELECT * FROM source(client_id='{safe_client_id}', flow_id='{flow_id}', "
+        f"artifact='{safe_artifact}') LIMIT {limit}"
+    )
+    results = client.query(
+        results_vql, options=cfg.query_options_for("collect_and_wait")
+    )
+    return {
+        **out,
+        "state": str(flow.get("state", "FINISHED")),
+        "results": normalize_records(results),
+    }
+
+
+def collect_artifact_bulk(
+    cfg: ServerConfig,
+    artifact: str,
+    client_ids: Optional[List[str]] = None,
+    label: Optional[str] = None,
+    search: Optional[str] = None,
+    params: Optional[Dict[str, Any]] = None,
+    max_clients: int = 1000,
+) -> Dict[str, Any]:
+    """
+    Schedule one artifact on many clients with a single server-side statement.
+
+    Targets are given by exactly one of `client_ids`, `label` or a client index
+    `search` expression (e.g. 'host:web*'). At most `max_clients` clients are
+    targeted: more `client_ids` than that are refused, and a label or search that
+    reaches the limit is reported as `truncated`. Returns a compact
+    client_id -> flow_id map plus, for `client_ids`, the `unscheduled` ids that
+    matched no client or got no flow.
+    """
+    if sum(bool(t) for t in (client_ids, label, search)) != 1:
+        raise ValueError("Pass exactly one of client_ids, label or search")
+    if client_ids:
+        client_ids = list(dict.fromkeys(client_ids))
+        if len(client_ids) > max_clients:
+            raise ValueError(
+                f"{len(client_ids)} client_ids exceed max_clients={max_clients}"
+            )
+        id_regex = "|".join(re.escape(c) for c in client_ids).replace("'", "''")
+        targets = f"SELECT client_id FROM clients() WHERE client_id =~ '^({id_regex})$'"
+    else:
+        term = f"label:{label}" if label else str(search)
+        targets = "SELECT client_id FROM clients(search='{}')".format(
+            term.replace("'", "''")
+        )
+    safe_artifact = artifact.replace("'", "''")
+    vql = (
+        "SELECT * FROM foreach(row={{{targets} LIMIT {max_clients}}}, query={{"
+        "SELECT client_id AS ClientId, collect_client(client_id=client_id, "
+        "artifacts=['{artifact}']{param_clause}).flow_id AS FlowId FROM scope()}})"
+    ).format(
+        targets=targets,
+        max_clients=max_clients,
+        artifact=safe_artifact,
+        param_clause=_param_clause(params),
+    )
+    rows = get_client(cfg).query(
+        vql, options=cfg.query_options_for("collect_artifact_bulk")
+    )
+    flows = {
+        row.get("ClientId"): row.get("FlowId") for row in rows if row.get("FlowId")
+    }
+    out: Dict[str, Any] = {
+        "artifact": artifact,
+        "scheduled": len(flows),
+        "flows": flows,
+    }
+    if client_ids:
+        out["unscheduled"] = [c for c in client_ids if c not in flows]
+    else:
+        out["truncated"] = len(rows) >= max_clients
+    return out
+
+
 def upload_artifact(
     cfg: ServerConfig, name: str, vql: str, description: str = "", type_: str = "CLIENT"
 ) -> Dict[str, Any]:
@@ -59,12 +196,18 @@ def upload_artifact(
     artifact_doc = f"{{Name:'{safe_name}',Description:'{safe_desc}',Type:'{type_}',Sources:[{{Queries:[{{VQL:'''{safe_vql}'''}}]}}]}}"
     # upload_artifact() is not available in recent versions; artifact_set replaces it.
     vql_stmt = f"SELECT artifact_set(artifact={artifact_doc}) AS Uploaded FROM scope()"
-    rows = get_client(cfg).query(vql_stmt)
+    rows = get_client(cfg).query(
+        vql_stmt, options=cfg.query_options_for("upload_artifact")
+    )
     return {"result": normalize_records(rows)}
 
 
 def get_artifact_definition(cfg: ServerConfig, name: str) -> Dict[str, Any]:
     safe_name = name.replace("'", "''")
     vql = f"SELECT * FROM artifact_definitions(name='{safe_name}')"
-    rows = get_client(cfg).query(vql)
+    rows = get_client(cfg).query(
+        vql,
+        cache_ttl=cfg.cache_ttl("get_artifact_definition"),
+        options=cfg.query_options_for("get_artifact_definition"),
+    )
     return {"artifact": normalize_records(rows)}
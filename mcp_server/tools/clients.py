@@ -1,27 +1,258 @@
 from __future__ import annotations
 
-from typing import Any, Dict, Optional
+import re
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
 
 from mcp_server.client import get_client
 from mcp_server.config import ServerConfig
-from mcp_server.utils import normalize_records
+from mcp_server.inventory import client_hostname, client_labels, get_inventory
+from mcp_server.utils import (
+    decode_cursor,
+    encode_cursor,
+    select_list,
+    shape_records,
+    take_rows,
+)
+
+CURSOR_KEY = "client_id"
+# Where clients() rows carry the hostname and labels.
+HOSTNAME_COLUMN = "os_info.hostname"
+LABELS_COLUMN = "labels"
+
+# Regex syntax that makes a pattern more than a literal. A bare "." is tolerated
+# so FQDNs like "web01.corp.local" still count as literal hostnames.
+_REGEX_META = re.compile(r"[\^$*+?()\[\]{}|\\]|\.$")
+
+
+@dataclass
+class ClientSearchPlan:
+    """How search_clients will run: an index lookup, a WHERE scan, or both."""
+
+    search: Optional[str] = None
+    predicates: List[str] = field(default_factory=list)
+
+    @property
+    def source(self) -> str:
+        if self.search is None:
+            return "clients()"
+        return "clients(search='{}')".format(self.search.replace("'", "''"))
+
+
+def _index_term(pattern: str) -> Optional[Tuple[str, bool]]:
+    """
+    Classify a hostname/label pattern as (literal, is_prefix) when the client index can
+    serve it: `^name$` is exact, `name*`, `^name` or `^name.*` are prefixes. A bare
+    `name` is an unanchored regex, i.e. a substring match, which the index cannot
+    answer. Dots are read literally, which is what they almost always mean in
+    hostnames. Returns None for substring matches and real regular expressions.
+    """
+    if pattern.endswith("*") and not _REGEX_META.search(pattern[:-1]):
+        literal, prefix = pattern[:-1], True
+    elif pattern.startswith("^"):
+        body, prefix = pattern[1:], True
+        if body.endswith("$"):
+            body, prefix = body[:-1], False
+        elif body.endswith(".*"):
+            body = body[:-2]
+        if _REGEX_META.search(body):
+            return None
+        literal = body
+    else:
+        return None
+    return (literal, prefix) if literal else None
+
+
+def _anchored_regex(column: str, literal: str, prefix: bool) -> str:
+    regex = "(?i)^" + re.escape(literal) + ("" if prefix else "$")
+    return "{} =~ '{}'".format(column, regex.replace("'", "''"))
+
+
+def plan_client_search(
+    hostname: Optional[str] = None,
+    label: Optional[str] = None,
+    query: Optional[str] = None,
+) -> ClientSearchPlan:
+    """
+    Route exact and prefix hostname/label lookups to the client index.
+
+    clients(search=...) takes a single term, so the first indexable filter
+    (hostname, then label) becomes the index lookup and everything else is
+    applied as a WHERE clause over the (already narrowed) rows. Because the
+    index matches case-insensitively on prefixes, indexed terms are re-checked
+    with an anchored regex on the columns clients() rows actually carry
+    (os_info.hostname, labels).
+    """
+    plan = ClientSearchPlan()
+    for prefix_name, column, value in (
+        ("host", HOSTNAME_COLUMN, hostname),
+        ("label", LABELS_COLUMN, label),
+    ):
+        if not value:
+            continue
+        term = _index_term(value)
+        if term is None:
+            plan.predicates.append(
+                "{} =~ '{}'".format(column, value.replace("'", "''"))
+            )
+            continue
+        literal, prefix = term
+        if plan.search is None:
+            plan.search = f"{prefix_name}:{literal}" + ("*" if prefix else "")
+        plan.predicates.append(_anchored_regex(column, literal, prefix))
+    if query:
+        plan.predicates.append(f"({query})")
+    return plan
+
+
+def _page_clause(limit: int, offset: int) -> str:
+    # VQL has no OFFSET, so the server stops after offset + limit rows and the
+    # first `offset` are skipped locally. Cursors avoid the skipped rows entirely.
+    ordering = f" ORDER BY {CURSOR_KEY}"
+    return f"{ordering} LIMIT {offset + limit}" if limit else ordering
+
+
+def _cursor_predicate(cursor: Optional[str]) -> Optional[str]:
+    if not cursor:
+        return None
+    after = str(decode_cursor(cursor, CURSOR_KEY)).replace("'", "''")
+    return f"{CURSOR_KEY} > '{after}'"
+
+
+def _paged_columns(columns: Optional[Sequence[str]]) -> Optional[List[str]]:
+    # Paging orders by and resumes after client_id, so a projection must keep it.
+    if not columns:
+        return None
+    return list(columns) + ([] if CURSOR_KEY in columns else [CURSOR_KEY])
+
+
+def _shaped(
+    page: Dict[str, Any],
+    columns: Optional[Sequence[str]],
+    max_field_bytes: int,
+    format: str,
+) -> Dict[str, Any]:
+    page["clients"] = shape_records(page["clients"], columns, max_field_bytes, format)
+    return page
+
+
+def _paged_clients(
+    cfg: ServerConfig, tool: str, vql: str, limit: int, offset: int
+) -> Dict[str, Any]:
+    rows = get_client(cfg).query(vql, options=cfg.query_options_for(tool))
+    rows = take_rows(rows, limit=limit, offset=offset)
+    return _page_result(rows, limit)
+
+
+def _page_result(rows: List[Dict[str, Any]], limit: int) -> Dict[str, Any]:
+    next_cursor = None
+    if limit and len(rows) == limit and CURSOR_KEY in rows[-1]:
+        next_cursor = encode_cursor(CURSOR_KEY, rows[-1][CURSOR_KEY])
+    return {"clients": rows, "next_cursor": next_cursor}
+
+
+def _inventory_page(
+    rows: List[Dict[str, Any]], limit: int, offset: int, cursor: Optional[str]
+) -> Dict[str, Any]:
+    """Apply cursor/offset/limit to inventory rows, which are already in client_id order."""
+    if cursor:
+        after = str(decode_cursor(cursor, CURSOR_KEY))
+        rows = [r for r in rows if str(r.get(CURSOR_KEY, "")) > after]
+    return _page_result(rows[offset : offset + limit if limit else None], limit)
+
+
+def _pattern_matcher(pattern: str) -> Callable[[List[str]], bool]:
+    """
+    Match like VQL's `=~`: a case-insensitive regex search, true when any value
+    matches. Raises ValueError for an invalid regex.
+    """
+    term = _index_term(pattern)
+    if term is not None:
+        literal, prefix = term[0].lower(), term[1]
+        return lambda values: any(
+            v.lower().startswith(literal) if prefix else v.lower() == literal
+            for v in values
+        )
+    try:
+        regex = re.compile(pattern, re.IGNORECASE)
+    except re.error as exc:
+        raise ValueError(f"Invalid pattern {pattern!r}: {exc}") from exc
+    return lambda values: any(regex.search(v) for v in values)
+
+
+def _inventory_search(
+    cfg: ServerConfig, hostname: Optional[str], label: Optional[str]
+) -> List[Dict[str, Any]]:
+    """Evaluate hostname/label filters against the local inventory."""
+    host_matches = _pattern_matcher(hostname) if hostname else None
+    label_matches = _pattern_matcher(label) if label else None
+    inventory = get_inventory(cfg)
+    rows = None
+    for value, lookup in (
+        (hostname, inventory.by_hostname),
+        (label, inventory.by_label),
+    ):
+        term = _index_term(value) if value else None
+        if term and not term[1]:
+            rows = lookup(term[0])
+            break
+    if rows is None:
+        rows = inventory.all()
+    return [
+        r
+        for r in rows
+        if (not host_matches or host_matches([client_hostname(r)]))
+        and (not label_matches or label_matches([str(x) for x in client_labels(r)]))
+    ]
 
 
 def list_clients(
-    cfg: ServerConfig, limit: int = 200, offset: int = 0
+    cfg: ServerConfig,
+    limit: int = 200,
+    offset: int = 0,
+    cursor: Optional[str] = None,
+    columns: Optional[Sequence[str]] = None,
+    max_field_bytes: int = 0,
+    format: str = "records",
 ) -> Dict[str, Any]:
-    """List enrolled clients."""
-    vql = "SELECT * FROM clients()"
-    rows = normalize_records(get_client(cfg).query(vql))
-    return {"clients": rows[offset : offset + limit if limit else None]}
+    """
+    List enrolled clients ordered by client_id.
+
+    Pass the returned `next_cursor` back as `cursor` to fetch the following page.
+    `columns` narrows the SELECT (client_id is always kept for paging); see
+    shape_records for `max_field_bytes` and `format`.
+    """
+    columns = _paged_columns(columns)
+    if cfg.client_inventory_ttl > 0:
+        page = _inventory_page(get_inventory(cfg).all(), limit, offset, cursor)
+        return _shaped(page, columns, max_field_bytes, format)
+    predicate = _cursor_predicate(cursor)
+    where_clause = f" WHERE {predicate}" if predicate else ""
+    vql = (
+        f"SELECT {select_list(columns)} FROM clients()"
+        f"{where_clause}{_page_clause(limit, offset)}"
+    )
+    page = _paged_clients(cfg, "list_clients", vql, limit, offset)
+    return _shaped(page, columns, max_field_bytes, format)
 
 
-def get_client_info(cfg: ServerConfig, client_id: str) -> Dict[str, Any]:
+def get_client_info(
+    cfg: ServerConfig,
+    client_id: str,
+    columns: Optional[Sequence[str]] = None,
+    max_field_bytes: int = 0,
+) -> Dict[str, Any]:
     """Fetch detailed info for a client."""
+    if cfg.client_inventory_ttl > 0:
+        row = get_inventory(cfg).get(client_id)
+        return {"client": shape_records([row] if row else [], columns, max_field_bytes)}
     safe_client_id = client_id.replace("'", "''")
-    vql = f"SELECT * FROM clients() WHERE client_id='{safe_client_id}'"
-    rows = get_client(cfg).query(vql)
-    return {"client": normalize_records(rows)}
+    vql = (
+        f"SELECT {select_list(columns)} FROM clients() "
+        f"WHERE client_id='{safe_client_id}'"
+    )
+    rows = get_client(cfg).query(vql, options=cfg.query_options_for("get_client_info"))
+    return {"client": shape_records(rows, max_field_bytes=max_field_bytes)}
 
 
 def search_clients(
@@ -30,20 +261,35 @@ def search_clients(
     label: Optional[str] = None,
     query: Optional[str] = None,
     limit: int = 200,
+    offset: int = 0,
+    cursor: Optional[str] = None,
+    columns: Optional[Sequence[str]] = None,
+    max_field_bytes: int = 0,
+    format: str = "records",
 ) -> Dict[str, Any]:
     """
-    Search clients by hostname or labels using VQL filters.
+    Search clients by hostname or labels.
+
+    Patterns are case-insensitive regexes, so `web` matches any hostname containing
+    it. Exact (`^web01$`) and prefix (`web*`, `^web`) patterns use the server's
+    client index; other regular expressions and `query` predicates scan clients().
+    When the client inventory is enabled, searches without a `query` predicate are
+    answered locally.
     """
-    predicates: list[str] = []
-    if hostname:
-        safe_hostname = hostname.replace("'", "''")
-        predicates.append(f"Hostname =~ '{safe_hostname}'")
-    if label:
-        safe_label = label.replace("'", "''")
-        predicates.append(f"Labels =~ '{safe_label}'")
-    if query:
-        predicates.append(query)
+    columns = _paged_columns(columns)
+    if cfg.client_inventory_ttl > 0 and not query:
+        rows = _inventory_search(cfg, hostname, label)
+        page = _inventory_page(rows, limit, offset, cursor)
+        return _shaped(page, columns, max_field_bytes, format)
+    plan = plan_client_search(hostname=hostname, label=label, query=query)
+    predicates = list(plan.predicates)
+    cursor_predicate = _cursor_predicate(cursor)
+    if cursor_predicate:
+        predicates.append(cursor_predicate)
     where_clause = " WHERE " + " AND ".join(predicates) if predicates else ""
-    vql = f"SELECT * FROM clients(){where_clause}"
-    rows = normalize_records(get_client(cfg).query(vql))
-    return {"clients": rows[:limit] if limit else rows}
+    vql = (
+        f"SELECT {select_list(columns)} FROM {plan.source}"
+        f"{where_clause}{_page_clause(limit, offset)}"
+    )
+    page = _paged_clients(cfg, "search_clients", vql, limit, offset)
+    return _shaped(page, columns, max_field_bytes, format)
@@ -0,0 +1,25 @@
+from __future__ import annotations
+
+from typing import Any, Dict
+
+from mcp_server.config import ServerConfig
+from mcp_server.cursors import get_cursor_store
+
+
+def fetch_cursor(
+    cfg: ServerConfig, cursor_id: str, n: int = 100, session: str = ""
+) -> Dict[str, Any]:
+    """
+    Return the next `n` rows of a spilled result without re-running its query.
+
+    The response carries `remaining` and `done`; `truncated` means the spill hit the
+    disk budget and the cursor holds only the first `total_rows` rows.
+    """
+    return get_cursor_store(cfg).fetch(session, cursor_id, n)
+
+
+def close_cursor(
+    cfg: ServerConfig, cursor_id: str, session: str = ""
+) -> Dict[str, Any]:
+    """Delete a cursor's spill file before it expires."""
+    return {"closed": get_cursor_store(cfg).close(session, cursor_id)}
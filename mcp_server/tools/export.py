@@ -0,0 +1,40 @@
+from __future__ import annotations
+
+from typing import Any, Dict, Optional
+
+from mcp_server.client import get_client
+from mcp_server.config import ServerConfig
+from mcp_server.export import export_rows
+from mcp_server.utils import confined_path
+
+
+def export_results(
+    cfg: ServerConfig,
+    dest_path: str,
+    vql: Optional[str] = None,
+    hunt_id: Optional[str] = None,
+    artifact: Optional[str] = None,
+    format: Optional[str] = None,
+    overwrite: bool = False,
+) -> Dict[str, Any]:
+    """
+    Stream a query's or a hunt's full results into a local file.
+
+    Pass either `vql` or `hunt_id` (optionally narrowed to one `artifact`). The
+    format is `parquet` or gzip `jsonl`, inferred from the `.parquet` suffix when not
+    given. `dest_path` is taken relative to, and confined to, MCP_EXPORT_DIR; an
+    existing file is only replaced with `overwrite`. Only the path, row count,
+    byte size and schema are returned.
+    """
+    if bool(vql) == bool(hunt_id):
+        raise ValueError("export_results needs exactly one of vql or hunt_id")
+    dest = confined_path(cfg.export_dir, dest_path, "MCP_EXPORT_DIR", overwrite)
+    if hunt_id:
+        safe_hunt_id = hunt_id.replace("'", "''")
+        source = f"hunt_results(hunt_id='{safe_hunt_id}'"
+        if artifact:
+            safe_artifact = artifact.replace("'", "''")
+            source += f", artifact='{safe_artifact}'"
+        vql = f"SELECT * FROM {source})"
+    rows = get_client(cfg).query(vql, options=cfg.query_options_for("export_results"))
+    return export_rows(rows, dest, format=format)
@@ -1,43 +1,292 @@
 from __future__ import annotations
 
-from typing import Any, Dict
+import base64
+import shutil
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Union
 
+from mcp_server.blobs import (
+    BlobStore,
+    BlobTooLarge,
+    acquire_vfs_files,
+    get_blob_store,
+    indexed_metadata,
+    lookup_vfs_file,
+    store_vfs_file,
+)
 from mcp_server.client import get_client
 from mcp_server.config import ServerConfig
-from mcp_server.utils import normalize_records
+from mcp_server.utils import confined_path, normalize_records
+from mcp_server.vfs import file_metadata, get_vfs_cache, list_vfs, walk_vfs
 
 
 def list_directory(cfg: ServerConfig, client_id: str, path: str) -> Dict[str, Any]:
     """
     List directory contents from the VFS.
+
+    Listings are served from the VFS cache when it is enabled (MCP_VFS_CACHE_TTL).
     """
-    client = get_client(cfg)
-    # Query the VFS directly - this returns cached VFS data
-    vql = f"SELECT * FROM vfs_files(client_id='{client_id}', path='{path}')"
-    rows = list(client.query(vql))
+    rows = list_vfs(cfg, get_client(cfg), client_id, path)
     return {"entries": normalize_records(rows)}
 
 
 def get_file_info(cfg: ServerConfig, client_id: str, path: str) -> Dict[str, Any]:
+    """
+    VFS metadata for one file.
+
+    With the VFS cache enabled the entry is picked from the (cached) parent listing,
+    so inspecting several files of one directory costs a single query.
+    """
+    client = get_client(cfg)
+    if get_vfs_cache(cfg) is not None:
+        row = file_metadata(cfg, client, client_id, path)
+        if row is not None:
+            return {"info": normalize_records([row])}
     # Query the VFS for file info on the server side
-    vql = f"SELECT * FROM vfs_files(client_id='{client_id}', path='{path}')"
-    rows = get_client(cfg).query(vql)
+    safe_client_id = client_id.replace("'", "''")
+    safe_path = path.replace("'", "''")
+    vql = f"SELECT * FROM vfs_files(client_id='{safe_client_id}', path='{safe_path}')"
+    rows = client.query(vql, options=cfg.query_options_for("get_file_info"))
     return {"info": normalize_records(rows)}
 
 
+def walk_directory(
+    cfg: ServerConfig,
+    client_id: str,
+    path: str,
+    max_depth: int = 3,
+    max_nodes: int = 2000,
+) -> Dict[str, Any]:
+    """
+    Expand a VFS subtree breadth-first into one flattened listing.
+
+    Each level's directories are listed in parallel (MCP_VFS_WALK_CONCURRENCY) and
+    through the VFS cache. Entries carry `Path` and `Depth`; `truncated` means the
+    depth or node budget stopped the walk early.
+    """
+    return walk_vfs(
+        cfg,
+        get_client(cfg),
+        client_id,
+        path,
+        max_depth=max_depth,
+        max_nodes=max_nodes,
+        concurrency=cfg.vfs_walk_concurrency,
+    )
+
+
 def download_file(
-    cfg: ServerConfig, client_id: str, path: str, offset: int = 0, length: int = 0
+    cfg: ServerConfig,
+    client_id: str,
+    path: str,
+    offset: int = 0,
+    length: int = 0,
+    dest_path: Optional[str] = None,
+    overwrite: bool = False,
 ) -> Dict[str, Any]:
-    import base64
+    """
+    Download a VFS file.
 
+    Without `dest_path` the bytes are returned base64-encoded, which only suits small
+    files or ranges. With `dest_path` (relative to, and confined to, MCP_DOWNLOAD_DIR;
+    an existing file is replaced only with `overwrite`) the file is streamed to local
+    disk in fixed-size ranges, resuming the `.part` file an interrupted call left, and
+    only metadata is returned.
+
+    With the blob store enabled (MCP_BLOB_STORE_BYTES) a whole-file download lands
+    in the local content-addressed store and returns the sha256 and a short preview
+    instead of base64; with the VFS cache also enabled an unchanged file (same size
+    and mtime) is not fetched again, and ranges (`offset`/`length`) of it are read
+    from the stored copy. A file that turns out larger than the store continues on
+    the direct path from where the store stopped, so no byte is fetched twice.
+    """
+    if dest_path:
+        dest_path = str(
+            confined_path(cfg.download_dir, dest_path, "MCP_DOWNLOAD_DIR", overwrite)
+        )
     # Use the gRPC VFSGetBuffer method directly
     client = get_client(cfg)
+    store = get_blob_store(cfg)
+    if store is not None:
+        metadata = indexed_metadata(cfg, client, client_id, path, "download_file")
+        if offset or length:
+            sha256 = lookup_vfs_file(store, client_id, path, metadata)
+            if sha256 is not None:
+                return _range_from_store(
+                    store, sha256, client_id, path, offset, length, dest_path
+                )
+        elif int((metadata or {}).get("Size") or 0) <= store.max_bytes:
+            try:
+                return _download_via_store(
+                    store, client, client_id, path, metadata, dest_path
+                )
+            except BlobTooLarge as exc:
+                # The size was unknown; finish the transfer the store started.
+                return _finish_direct(exc, client_id, path, dest_path)
+    if dest_path:
+        result = client.download_to_file(
+            client_id=client_id, path=path, dest=dest_path, offset=offset, length=length
+        )
+        return {
+            "path": path,
+            "client_id": client_id,
+            "offset": offset,
+            "length": result["bytes"],
+            "dest_path": result["dest"],
+            "resumed_from": result["resumed_from"],
+        }
     data = client.download(client_id=client_id, path=path, offset=offset, length=length)
-    encoded = base64.b64encode(data).decode("ascii")
+    return _inline(client_id, path, offset, data)
+
+
+def _inline(client_id: str, path: str, offset: int, data: bytes) -> Dict[str, Any]:
     return {
         "path": path,
         "client_id": client_id,
         "offset": offset,
         "length": len(data),
-        "data_base64": encoded,
+        "data_base64": base64.b64encode(data).decode("ascii"),
+    }
+
+
+def _download_via_store(
+    store: BlobStore,
+    client,
+    client_id: str,
+    path: str,
+    metadata: Optional[Dict[str, Any]],
+    dest_path: Optional[str],
+) -> Dict[str, Any]:
+    sha256, cached = store_vfs_file(
+        store, client, client_id, path, metadata, handover=True
+    )
+    try:
+        out = {"path": path, "client_id": client_id, **store.describe(sha256, cached)}
+        if dest_path:
+            dest = Path(dest_path)
+            dest.parent.mkdir(parents=True, exist_ok=True)
+            written = store.copy_to(sha256, dest)
+            return {**out, "offset": 0, "length": written, "dest_path": str(dest)}
+        return out
+    finally:
+        store.unpin(sha256)
+
+
+def _range_from_store(
+    store: BlobStore,
+    sha256: str,
+    client_id: str,
+    path: str,
+    offset: int,
+    length: int,
+    dest_path: Optional[str],
+) -> Dict[str, Any]:
+    """Serve a range of an unchanged, already stored file (pinned by the caller)."""
+    try:
+        out = {"sha256": sha256, "cached": True}
+        if dest_path:
+            dest = Path(dest_path)
+            dest.parent.mkdir(parents=True, exist_ok=True)
+            written = store.copy_to(sha256, dest, offset, length)
+            return {
+                **out,
+                "path": path,
+                "client_id": client_id,
+                "offset": offset,
+                "length": written,
+                "dest_path": str(dest),
+            }
+        data = store.read(sha256, offset, length)
+        return {**out, **_inline(client_id, path, offset, data)}
+    finally:
+        store.unpin(sha256)
+
+
+def _finish_direct(
+    exc: BlobTooLarge, client_id: str, path: str, dest_path: Optional[str]
+) -> Dict[str, Any]:
+    """Complete a download the blob store gave up on, keeping the bytes it read."""
+    assert exc.partial is not None and exc.rest is not None
+    try:
+        if not dest_path:
+            data = exc.partial.read_bytes() + b"".join(exc.rest)
+            return _inline(client_id, path, 0, data)
+        with exc.partial.open("ab") as fh:
+            for chunk in exc.rest:
+                fh.write(chunk)
+            written = fh.tell()
+        dest = Path(dest_path)
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        shutil.move(str(exc.partial), dest)
+        return {
+            "path": path,
+            "client_id": client_id,
+            "offset": 0,
+            "length": written,
+            "dest_path": str(dest),
+            "resumed_from": 0,
+        }
+    finally:
+        close = getattr(exc.rest, "close", None)
+        if close:
+            close()
+        exc.partial.unlink(missing_ok=True)
+
+
+def download_files(
+    cfg: ServerConfig,
+    files: List[Union[Dict[str, str], Sequence[str]]],
+    concurrency: int = 0,
+    dest_dir: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    Download many VFS files in parallel into the blob store.
+
+    `files` holds {"client_id", "path"} objects or [client_id, path] pairs. Up to
+    `concurrency` files (0 or more than MCP_DOWNLOAD_CONCURRENCY means that limit)
+    stream at once over the shared gRPC channel; identical content is stored once.
+    With `dest_dir` (inside MCP_DOWNLOAD_DIR) each file is also copied to
+    <dest_dir>/<client_id>/<path>.
+    Returns a manifest of hashes, sizes and per-file errors instead of file bytes.
+    """
+    store = get_blob_store(cfg)
+    if store is None:
+        raise ValueError("The blob store is disabled; set MCP_BLOB_STORE_BYTES")
+    if dest_dir:
+        dest_dir = str(
+            confined_path(
+                cfg.download_dir, dest_dir, "MCP_DOWNLOAD_DIR", directory=True
+            )
+        )
+    targets = []
+    for item in files:
+        if isinstance(item, dict):
+            targets.append((item["client_id"], item["path"]))
+        else:
+            client_id, path = item
+            targets.append((client_id, path))
+    limit = cfg.download_concurrency
+    return acquire_vfs_files(
+        cfg,
+        store,
+        get_client(cfg),
+        targets,
+        concurrency=min(concurrency, limit) if concurrency > 0 else limit,
+        dest_dir=dest_dir,
+    )
+
+
+def read_blob(
+    cfg: ServerConfig, sha256: str, offset: int = 0, length: int = 65536
+) -> Dict[str, Any]:
+    """Read a byte range of a stored download by its sha256, without a server call."""
+    store = get_blob_store(cfg)
+    if store is None:
+        raise ValueError("The blob store is disabled; set MCP_BLOB_STORE_BYTES")
+    data = store.read(sha256, offset, length)
+    return {
+        "sha256": sha256,
+        "offset": offset,
+        "length": len(data),
+        "data_base64": base64.b64encode(data).decode("ascii"),
     }
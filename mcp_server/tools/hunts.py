@@ -1,10 +1,19 @@
 from __future__ import annotations
 
-from typing import Any, Dict, Optional
+from typing import Any, Dict, List, Optional, Sequence, Tuple
 
 from mcp_server.client import get_client
 from mcp_server.config import ServerConfig
-from mcp_server.utils import normalize_records
+from mcp_server.cursors import spill_query
+from mcp_server.polling import ACTIVE_TIME_MARK, get_watermarks
+from mcp_server.utils import check_column, normalize_records, select_list, shape_records
+
+AGGREGATES = ("count", "count_distinct", "min", "max")
+# Hunts in these states may still schedule clients; flows in the final states
+# will not produce more rows.
+HUNT_ACTIVE_STATES = ("RUNNING", "PAUSED")
+FLOW_FINAL_STATES = ("FINISHED", "ERROR")
+DEFAULT_AGGREGATES = ("count", "count_distinct:ClientId")
 
 
 def list_hunts(
@@ -15,13 +24,21 @@ def list_hunts(
         safe_state = state.replace("'", "''")
         predicate = f" WHERE State = '{safe_state}'"
     vql = f"SELECT * FROM hunts(){predicate} ORDER BY Created DESC LIMIT {limit}"
-    rows = get_client(cfg).query(vql)
+    rows = get_client(cfg).query(
+        vql,
+        cache_ttl=cfg.cache_ttl("list_hunts"),
+        options=cfg.query_options_for("list_hunts"),
+    )
     return {"hunts": normalize_records(rows)}
 
 
 def get_hunt_details(cfg: ServerConfig, hunt_id: str) -> Dict[str, Any]:
     vql = f"SELECT * FROM hunts() WHERE HuntId = '{hunt_id}'"
-    rows = get_client(cfg).query(vql)
+    rows = get_client(cfg).query(
+        vql,
+        cache_ttl=cfg.cache_ttl("get_hunt_details"),
+        options=cfg.query_options_for("get_hunt_details"),
+    )
     return {"hunt": normalize_records(rows)}
 
 
@@ -54,7 +71,7 @@ def create_hunt(
         query=safe_query,
         start_immediately=str(start_immediately).lower(),
     )
-    rows = get_client(cfg).query(vql)
+    rows = get_client(cfg).query(vql, options=cfg.query_options_for("create_hunt"))
     return {"result": normalize_records(rows)}
 
 
@@ -62,20 +79,331 @@ def stop_hunt(cfg: ServerConfig, hunt_id: str) -> Dict[str, Any]:
     # There is no stop_hunt plugin in v0.75; best-effort delete via hunt_delete() if available.
     safe_hunt_id = hunt_id.replace("'", "''")
     vql = f"SELECT hunt_delete(hunt_id='{safe_hunt_id}') AS Deleted FROM scope()"
-    rows = get_client(cfg).query(vql)
+    rows = get_client(cfg).query(vql, options=cfg.query_options_for("stop_hunt"))
     return {"result": normalize_records(rows)}
 
 
 def get_hunt_results(
-    cfg: ServerConfig, hunt_id: str, client_id: Optional[str] = None, limit: int = 200
+    cfg: ServerConfig,
+    hunt_id: str,
+    client_id: Optional[str] = None,
+    limit: int = 200,
+    columns: Optional[Sequence[str]] = None,
+    max_field_bytes: int = 0,
+    format: str = "records",
+    spill: bool = False,
+    page_size: int = 100,
+    session: str = "",
+    incremental: bool = False,
+    cursor: Optional[int] = None,
 ) -> Dict[str, Any]:
+    """
+    Fetch raw hunt result rows; see shape_records for columns/max_field_bytes/format.
+
+    With `spill` the full result (no LIMIT) is streamed to a disk cursor and the
+    first `page_size` rows are returned; continue with fetch_cursor.
+
+    With `incremental` only rows not yet returned to this session are sent, at most
+    `limit` per call; see poll_hunt_results.
+    """
+    if incremental:
+        return poll_hunt_results(
+            cfg,
+            hunt_id,
+            client_id=client_id,
+            limit=limit,
+            columns=columns,
+            max_field_bytes=max_field_bytes,
+            format=format,
+            session=session,
+            cursor=cursor,
+        )
     safe_hunt_id = hunt_id.replace("'", "''")
     predicate = ""
     if client_id:
         safe_client_id = client_id.replace("'", "''")
         predicate = f" WHERE ClientId = '{safe_client_id}'"
+    limit_clause = "" if spill else f" LIMIT {limit}"
     vql = (
-        f"SELECT * FROM hunt_results(hunt_id='{safe_hunt_id}'){predicate} LIMIT {limit}"
+        f"SELECT {select_list(columns)} FROM hunt_results(hunt_id='{safe_hunt_id}')"
+        f"{predicate}{limit_clause}"
+    )
+    rows = get_client(cfg).query(vql, options=cfg.query_options_for("get_hunt_results"))
+    if spill:
+        return spill_query(cfg, session, rows, vql, first_page=page_size)
+    return {
+        "results": shape_records(rows, max_field_bytes=max_field_bytes, format=format)
+    }
+
+
+def _hunt_state(row: Dict[str, Any]) -> Tuple[str, Dict[str, Any], List[str]]:
+    """(state, stats, artifact names) of a hunts() row."""
+    request = row.get("start_request") or {}
+    artifacts = row.get("artifacts") or request.get("artifacts") or []
+    state = str(row.get("state") or row.get("State") or "")
+    return state, row.get("stats") or {}, list(artifacts)
+
+
+def _source_vql(
+    client_id: str,
+    flow_id: str,
+    artifact: str,
+    start_row: int,
+    limit: int,
+    columns: Optional[Sequence[str]],
+) -> str:
+    safe = [v.replace("'", "''") for v in (client_id, flow_id, artifact)]
+    return (
+        f"SELECT {select_list(columns)} FROM source(client_id='{safe[0]}', "
+        f"flow_id='{safe[1]}', artifact='{safe[2]}', start_row={start_row}) "
+        f"LIMIT {limit}"
+    )
+
+
+def poll_hunt_results(
+    cfg: ServerConfig,
+    hunt_id: str,
+    client_id: Optional[str] = None,
+    limit: int = 200,
+    columns: Optional[Sequence[str]] = None,
+    max_field_bytes: int = 0,
+    format: str = "records",
+    session: str = "",
+    cursor: Optional[int] = None,
+) -> Dict[str, Any]:
+    """
+    Return hunt result rows that arrived since this session's previous poll.
+
+    A watermark per (session, hunt, client_id) records how many rows of each of the
+    hunt's flows were already returned, and the newest Flow.active_time seen. Each
+    poll costs one RPC for the hunt and its flows and one for the new rows, read
+    with source(start_row=...). hunt_flows() is filtered server-side to flows active
+    since that time plus those with rows left, so the query stays small however
+    many flows were already read; a summary row counts all and running flows.
+    `cursor` grows with every poll that returns rows; omit it to continue, pass 0 to
+    start over, or repeat the previous cursor to get a lost response again. `more`
+    means rows were left for the next poll by `limit`; `done` means the hunt has
+    stopped, no flow is still running and every row was returned. Rows come from the
+    hunt's first artifact, as with hunt_results().
+    """
+    store = get_watermarks(cfg)
+    key = (session, hunt_id, client_id or "")
+    base, marks = store.begin(key, cursor)
+    client = get_client(cfg)
+    safe_hunt_id = hunt_id.replace("'", "''")
+    source = f"FROM hunt_flows(hunt_id='{safe_hunt_id}')"
+    if client_id:
+        safe_client_id = client_id.replace("'", "''")
+        source += f" WHERE ClientId = '{safe_client_id}'"
+    queries = {"hunt": f"SELECT * FROM hunts(hunt_id='{safe_hunt_id}')"}
+    # A flow gaining rows moves its active_time past the mark; flows with rows left
+    # are listed by id. Fully read flows are not sent back at all.
+    active_since = marks.get(ACTIVE_TIME_MARK, (0, 0))[0]
+    moved = "TotalRows > 0"
+    if active_since:
+        unread = [
+            "'{}'".format(flow_id.replace("'", "''"))
+            for flow_id, (_, seen) in marks.items()
+            if flow_id != ACTIVE_TIME_MARK and not seen
+        ]
+        recent = f"ActiveTime >= {active_since}"
+        if unread:
+            recent = f"({recent} OR FlowId IN ({', '.join(unread)}))"
+        moved += f" AND {recent}"
+    queries["flows"] = (
+        "SELECT * FROM foreach(row={"
+        "SELECT ClientId, FlowId, Flow.state AS State, "
+        "Flow.total_collected_rows AS TotalRows, Flow.active_time AS ActiveTime "
+        f"{source}}}) WHERE {moved}"
+    )
+    final_states = "|".join(FLOW_FINAL_STATES)
+    queries["summary"] = (
+        "SELECT count() AS Flows, sum(item=if(condition=Flow.state =~ "
+        f"'^({final_states})$', then=0, else=1)) AS Running {source} GROUP BY 1"
+    )
+    status = client.query_many(
+        queries, options=cfg.query_options_for("get_hunt_results")
+    )
+    if not status["hunt"]:
+        raise ValueError(f"Unknown hunt {hunt_id}")
+    summary = status["summary"][0] if status["summary"] else {}
+    state, stats, artifacts = _hunt_state(status["hunt"][0])
+    artifact = artifacts[0] if artifacts else ""
+
+    # Read only flows whose row count moved, at most `limit` rows in total.
+    budget = limit
+    reads: Dict[str, Tuple[int, int, int]] = {}
+    statements: Dict[str, str] = {}
+    pending = False
+    for flow in status["flows"]:
+        flow_id = str(flow.get("FlowId") or "")
+        total = int(flow.get("TotalRows") or 0)
+        active_since = max(active_since, int(flow.get("ActiveTime") or 0))
+        offset, seen = marks.get(flow_id, (0, 0))
+        if total == 0 or (total <= seen and flow_id in marks):
+            continue
+        want = min(max(total - offset, 1), budget)
+        if want <= 0:
+            # Listed by id until read, whatever its active_time.
+            marks[flow_id] = (offset, 0)
+            pending = True
+            continue
+        budget -= want
+        reads[flow_id] = (offset, want, total)
+        statements[flow_id] = _source_vql(
+            str(flow.get("ClientId") or ""), flow_id, artifact, offset, want, columns
+        )
+    fetched = (
+        client.query_many(statements, options=cfg.query_options_for("get_hunt_results"))
+        if statements
+        else {}
+    )
+    rows: List[Dict[str, Any]] = []
+    for flow_id, (offset, want, total) in reads.items():
+        new_rows = fetched.get(flow_id, [])
+        rows.extend(new_rows)
+        offset += len(new_rows)
+        caught_up = len(new_rows) < want or offset >= total
+        pending = pending or not caught_up
+        marks[flow_id] = (offset, total if caught_up else 0)
+    if active_since:
+        marks[ACTIVE_TIME_MARK] = (active_since, 0)
+    running = int(summary.get("Running") or 0)
+    new_cursor = store.commit(key, base, marks, len(rows))
+    return {
+        "results": shape_records(rows, max_field_bytes=max_field_bytes, format=format),
+        "cursor": new_cursor,
+        "more": pending,
+        "done": not pending and not running and state not in HUNT_ACTIVE_STATES,
+        "hunt_state": state,
+        "flows": int(summary.get("Flows") or 0),
+        "flows_running": running,
+        "stats": stats,
+    }
+
+
+def _parse_aggregates(specs: Sequence[str]) -> List[Tuple[str, Optional[str]]]:
+    parsed = []
+    for spec in specs:
+        fn, _, column = spec.partition(":")
+        fn = fn.strip().lower()
+        if fn not in AGGREGATES:
+            raise ValueError(
+                f"Unknown aggregate {spec!r}; expected one of {', '.join(AGGREGATES)}"
+            )
+        if fn == "count":
+            parsed.append((fn, None))
+        elif not column:
+            raise ValueError(f"Aggregate {fn!r} needs a column, e.g. '{fn}:ClientId'")
+        else:
+            parsed.append((fn, check_column(column.strip())))
+    distinct = {c for fn, c in parsed if fn == "count_distinct"}
+    if len(distinct) > 1:
+        raise ValueError("Only one count_distinct column is supported per summary")
+    return parsed
+
+
+def _alias(fn: str, column: Optional[str]) -> str:
+    return fn if column is None else f"{fn}_{column.replace('.', '_')}"
+
+
+def summarize_hunt_vql(
+    hunt_id: str,
+    group_by: Sequence[str],
+    aggregates: Sequence[str] = DEFAULT_AGGREGATES,
+    artifact: Optional[str] = None,
+    limit: int = 1000,
+) -> str:
+    """
+    Build GROUP BY VQL over hunt_results() so only one row per group is returned.
+
+    count_distinct is computed with a nested GROUP BY: the inner query groups by the
+    requested columns plus the distinct column, the outer one counts those groups and
+    re-aggregates count/min/max from the partial results.
+    """
+    if not group_by:
+        raise ValueError("group_by needs at least one column")
+    keys = [check_column(c) for c in group_by]
+    parsed = _parse_aggregates(aggregates)
+    safe_hunt_id = hunt_id.replace("'", "''")
+    source = f"hunt_results(hunt_id='{safe_hunt_id}'"
+    if artifact:
+        safe_artifact = artifact.replace("'", "''")
+        source += f", artifact='{safe_artifact}'"
+    source += ")"
+    key_list = ", ".join(keys)
+    order = " ORDER BY count DESC" if ("count", None) in parsed else ""
+
+    distinct = next((c for fn, c in parsed if fn == "count_distinct"), None)
+    if distinct is None:
+        columns = [
+            "count()" if fn == "count" else f"{fn}(item={c})" for fn, c in parsed
+        ]
+        selects = [
+            f"{expr} AS {_alias(fn, c)}" for expr, (fn, c) in zip(columns, parsed)
+        ]
+        return (
+            f"SELECT {key_list}, {', '.join(selects)} FROM {source} "
+            f"GROUP BY {key_list}{order} LIMIT {limit}"
+        )
+
+    # The inner rows name a dotted key literally ("os_info.hostname"), which the
+    # outer query would read as a nested path, so dotted keys travel as _g<i>.
+    inner_cols, outer_cols, outer_keys = [], [], []
+    for i, key in enumerate(keys):
+        if "." in key:
+            inner_cols.append(f"{key} AS _g{i}")
+            outer_cols.append(f"_g{i} AS `{key}`")
+            outer_keys.append(f"_g{i}")
+        else:
+            inner_cols.append(key)
+            outer_cols.append(key)
+            outer_keys.append(key)
+    inner_group = list(outer_keys)
+    if distinct not in keys:
+        inner_cols.append(distinct)
+        inner_group.append(distinct)
+    inner = ["count() AS _n"]
+    outer = []
+    for fn, c in parsed:
+        alias = _alias(fn, c)
+        if fn == "count":
+            outer.append(f"sum(item=_n) AS {alias}")
+        elif fn == "count_distinct":
+            outer.append(f"count() AS {alias}")
+        else:
+            inner.append(f"{fn}(item={c}) AS _{alias}")
+            outer.append(f"{fn}(item=_{alias}) AS {alias}")
+    return (
+        f"SELECT {', '.join(outer_cols + outer)} FROM foreach(row={{"
+        f"SELECT {', '.join(inner_cols + inner)} FROM {source} "
+        f"GROUP BY {', '.join(inner_group)}"
+        f"}}) GROUP BY {', '.join(outer_keys)}{order} LIMIT {limit}"
+    )
+
+
+def summarize_hunt_results(
+    cfg: ServerConfig,
+    hunt_id: str,
+    group_by: Sequence[str],
+    aggregates: Optional[Sequence[str]] = None,
+    artifact: Optional[str] = None,
+    limit: int = 1000,
+) -> Dict[str, Any]:
+    """
+    Aggregate hunt results server-side; the response has one row per distinct group.
+
+    `aggregates` entries are "count", "count_distinct:<col>", "min:<col>" or
+    "max:<col>" (default: count and count_distinct:ClientId).
+    """
+    vql = summarize_hunt_vql(
+        hunt_id,
+        group_by,
+        aggregates=aggregates or DEFAULT_AGGREGATES,
+        artifact=artifact,
+        limit=limit,
+    )
+    rows = get_client(cfg).query(
+        vql, options=cfg.query_options_for("summarize_hunt_results")
     )
-    rows = get_client(cfg).query(vql)
-    return {"results": normalize_records(rows)}
+    return {"groups": normalize_records(rows)}
@@ -0,0 +1,125 @@
+from __future__ import annotations
+
+from typing import Any, Dict, List, Optional, Sequence
+
+import pandas as pd
+
+from mcp_server.client import get_client
+from mcp_server.config import ServerConfig
+from mcp_server.results import (
+    describe_frame,
+    filter_frame,
+    frame_records,
+    get_result_store,
+    to_frame,
+)
+
+JOIN_TYPES = ("inner", "left", "right", "outer")
+
+
+def _stored(
+    cfg: ServerConfig, session: str, frame: pd.DataFrame, source: str, limit: int
+) -> Dict[str, Any]:
+    handle = get_result_store(cfg).put(session, frame, source)
+    return {
+        "handle": handle,
+        "total_rows": len(frame),
+        "columns": [str(c) for c in frame.columns],
+        "rows": frame_records(frame, limit),
+    }
+
+
+def _columns(frame: pd.DataFrame, columns: Sequence[str]) -> List[str]:
+    missing = [c for c in columns if c not in frame.columns]
+    if missing:
+        raise ValueError(f"Unknown columns: {', '.join(missing)}")
+    return list(columns)
+
+
+def store_query_results(
+    cfg: ServerConfig, vql: str, session: str = "", limit: int = 20
+) -> Dict[str, Any]:
+    """
+    Run VQL once and keep the rows as a DataFrame under a handle.
+
+    Returns the handle, total row count, columns and the first `limit` rows; the
+    filter/sort/join/describe tools then work on the handle without new queries.
+    """
+    rows = get_client(cfg).query(vql, options=cfg.query_options_for("query_vql"))
+    frame = to_frame(rows, max_bytes=get_result_store(cfg).max_bytes)
+    return _stored(cfg, session, frame, vql, limit)
+
+
+def filter_results(
+    cfg: ServerConfig, handle: str, expr: str, session: str = "", limit: int = 100
+) -> Dict[str, Any]:
+    """
+    Filter a stored result with a boolean expression into a new handle.
+
+    Only column names, literals, comparisons (including `in [...]`) and
+    and/or/not are allowed, e.g. "Size > 1000 and Name != 'a.exe'"; quote dotted
+    columns with backticks (`os_info.hostname` == 'web01').
+    """
+    frame = get_result_store(cfg).get(session, handle)
+    filtered = filter_frame(frame, expr)
+    return _stored(cfg, session, filtered, f"filter({handle})", limit)
+
+
+def sort_results(
+    cfg: ServerConfig,
+    handle: str,
+    by: Sequence[str],
+    ascending: bool = True,
+    session: str = "",
+    limit: int = 100,
+) -> Dict[str, Any]:
+    """Sort a stored result by one or more columns into a new handle."""
+    frame = get_result_store(cfg).get(session, handle)
+    ordered = frame.sort_values(_columns(frame, by), ascending=ascending, kind="stable")
+    return _stored(cfg, session, ordered, f"sort({handle})", limit)
+
+
+def join_results(
+    cfg: ServerConfig,
+    left: str,
+    right: str,
+    on: Optional[Sequence[str]] = None,
+    left_on: Optional[Sequence[str]] = None,
+    right_on: Optional[Sequence[str]] = None,
+    how: str = "inner",
+    session: str = "",
+    limit: int = 100,
+) -> Dict[str, Any]:
+    """
+    Join two stored results into a new handle.
+
+    E.g. hunt results (ClientId) with clients() (client_id) to attach hostnames:
+    left_on=["ClientId"], right_on=["client_id"].
+    """
+    if how not in JOIN_TYPES:
+        raise ValueError(f"Unknown join type {how!r}; expected one of {JOIN_TYPES}")
+    store = get_result_store(cfg)
+    lframe, rframe = store.get(session, left), store.get(session, right)
+    if on:
+        keys = {"on": _columns(rframe, _columns(lframe, on))}
+    elif left_on and right_on:
+        keys = {
+            "left_on": _columns(lframe, left_on),
+            "right_on": _columns(rframe, right_on),
+        }
+    else:
+        raise ValueError("join_results needs `on` or both `left_on` and `right_on`")
+    joined = lframe.merge(rframe, how=how, suffixes=("", "_right"), **keys)
+    return _stored(cfg, session, joined, f"join({left},{right})", limit)
+
+
+def describe_results(
+    cfg: ServerConfig, handle: str, session: str = ""
+) -> Dict[str, Any]:
+    """Column types, null counts and summary statistics of a stored result."""
+    return describe_frame(get_result_store(cfg).get(session, handle))
+
+
+def drop_results(cfg: ServerConfig, handle: str, session: str = "") -> Dict[str, Any]:
+    """Release a stored result before it is evicted."""
+    return {"dropped": get_result_store(cfg).drop(session, handle)}
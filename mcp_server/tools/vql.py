@@ -1,15 +1,89 @@
 from __future__ import annotations
 
-from typing import Any, Dict
+from typing import Any, Dict, Optional, Sequence
 
-from mcp_server.client import get_client
-from mcp_server.config import ServerConfig
-from mcp_server.utils import normalize_records
+from mcp_server.client import get_async_client, get_client
+from mcp_server.config import QueryOptions, ServerConfig
+from mcp_server.cursors import spill_query
+from mcp_server.utils import shape_records
 
 
-def query_vql(cfg: ServerConfig, vql: str) -> Dict[str, Any]:
+def _call_options(
+    cfg: ServerConfig,
+    max_row: Optional[int] = None,
+    max_wait: Optional[int] = None,
+    timeout: Optional[int] = None,
+) -> QueryOptions:
+    return cfg.query_options_for("query_vql").merged(
+        QueryOptions(max_row=max_row, max_wait=max_wait, timeout=timeout)
+    )
+
+
+def query_vql(
+    cfg: ServerConfig,
+    vql: str,
+    max_row: Optional[int] = None,
+    max_wait: Optional[int] = None,
+    timeout: Optional[int] = None,
+    columns: Optional[Sequence[str]] = None,
+    max_field_bytes: int = 0,
+    format: str = "records",
+    spill: bool = False,
+    page_size: int = 100,
+    session: str = "",
+) -> Dict[str, Any]:
     """
     Execute arbitrary VQL and return results as a list of dicts.
+
+    The statement may contain LET clauses, so `columns` is applied to the returned
+    rows rather than rewritten into the VQL; see shape_records.
+    With `spill` the rows are streamed to disk instead and a cursor is returned with
+    the first `page_size` rows; page through the rest with fetch_cursor.
+    """
+    options = _call_options(cfg, max_row=max_row, max_wait=max_wait, timeout=timeout)
+    rows = get_client(cfg).query(vql, options=options)
+    if spill:
+        return spill_query(cfg, session, rows, vql, first_page=page_size)
+    return {"rows": shape_records(rows, columns, max_field_bytes, format)}
+
+
+async def query_vql_async(
+    cfg: ServerConfig,
+    vql: str,
+    max_row: Optional[int] = None,
+    max_wait: Optional[int] = None,
+    timeout: Optional[int] = None,
+    columns: Optional[Sequence[str]] = None,
+    max_field_bytes: int = 0,
+    format: str = "records",
+) -> Dict[str, Any]:
+    """
+    Execute arbitrary VQL over the shared grpc.aio channel.
+    """
+    options = _call_options(cfg, max_row=max_row, max_wait=max_wait, timeout=timeout)
+    rows = await get_async_client(cfg).query_rows(vql, options=options)
+    return {"rows": shape_records(rows, columns, max_field_bytes, format)}
+
+
+def batch_query_vql(cfg: ServerConfig, queries: Dict[str, str]) -> Dict[str, Any]:
+    """
+    Execute several named VQL statements in a single Query RPC.
+
+    Returns rows keyed by statement name, e.g. {"results": {"info": [...], "hunts": [...]}}.
+    """
+    results = get_client(cfg).query_many(
+        queries, options=cfg.query_options_for("batch_query_vql")
+    )
+    return {"results": results}
+
+
+async def batch_query_vql_async(
+    cfg: ServerConfig, queries: Dict[str, str]
+) -> Dict[str, Any]:
+    """
+    Execute several named VQL statements in a single Query RPC over grpc.aio.
     """
-    rows = get_client(cfg).query(vql)
-    return {"rows": normalize_records(rows)}
+    results = await get_async_client(cfg).query_many(
+        queries, options=cfg.query_options_for("batch_query_vql")
+    )
+    return {"results": results}
@@ -1,12 +1,158 @@
 from __future__ import annotations
 
+import base64
+import itertools
 import json
-from typing import Any, Dict, Iterable, List
+import re
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Union
+
+FORMATS = ("records", "columnar")
+TRUNCATED = "...[truncated {} bytes]"
+_COLUMN = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*(\.[A-Za-z_][A-Za-z0-9_]*)*$")
 
 
 def normalize_records(rows: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
-    """Convert generator/iterable to list of plain dicts."""
-    return [dict(r) for r in rows]
+    """
+    Convert generator/iterable to list of plain dicts.
+
+    Decoded rows already are plain dicts, so they (and a list of them) are passed
+    through without copying; only other mappings are converted.
+    """
+    records = rows if isinstance(rows, list) else list(rows)
+    if all(type(r) is dict for r in records):
+        return records
+    return [r if type(r) is dict else dict(r) for r in records]
+
+
+def check_column(name: str) -> str:
+    """Return `name` if it is a plain (optionally dotted) VQL identifier."""
+    if not _COLUMN.match(name):
+        raise ValueError(f"Invalid column name: {name!r}")
+    return name
+
+
+def select_list(columns: Optional[Sequence[str]] = None) -> str:
+    """VQL SELECT list for `columns`, or `*` when no projection was requested."""
+    return ", ".join(check_column(c) for c in columns) if columns else "*"
+
+
+def column_value(row: Dict[str, Any], column: str) -> Any:
+    """
+    Value of `column` in `row`: its own key, else a dotted path into nested dicts.
+
+    VQL names a projected `os_info.hostname` column literally, while full rows (the
+    client inventory, SELECT *) nest it; both read the same way here.
+    """
+    if column in row or "." not in column:
+        return row.get(column)
+    value: Any = row
+    for part in column.split("."):
+        if not isinstance(value, dict):
+            return None
+        value = value.get(part)
+    return value
+
+
+def _truncate(value: Any, max_bytes: int) -> Any:
+    if value is None or isinstance(value, (bool, int, float)):
+        return value
+    text = value if isinstance(value, str) else json.dumps(value, default=str)
+    raw = text.encode("utf-8")
+    if len(raw) <= max_bytes:
+        return value
+    head = raw[:max_bytes].decode("utf-8", "ignore")
+    return head + TRUNCATED.format(len(raw) - max_bytes)
+
+
+def shape_records(
+    rows: Iterable[Dict[str, Any]],
+    columns: Optional[Sequence[str]] = None,
+    max_field_bytes: int = 0,
+    format: str = "records",
+) -> Union[List[Dict[str, Any]], Dict[str, Any]]:
+    """
+    Project, truncate and lay out result rows for a tool response.
+
+    `columns` keeps only those keys (dotted names reach into nested values, see
+    column_value), `max_field_bytes` caps each value's UTF-8/JSON
+    size (nested objects are serialized first) and appends a truncation marker, and
+    format="columnar" returns {"columns": [...], "rows": [[...], ...]} so column names
+    are sent once instead of in every row.
+    """
+    if format not in FORMATS:
+        raise ValueError(f"Unknown format {format!r}; expected one of {FORMATS}")
+    records = normalize_records(rows)
+    if columns:
+        records = [{c: column_value(r, c) for c in columns} for r in records]
+    if max_field_bytes > 0:
+        records = [
+            {k: _truncate(v, max_field_bytes) for k, v in r.items()} for r in records
+        ]
+    if format == "records":
+        return records
+    names = list(columns or dict.fromkeys(k for r in records for k in r))
+    return {"columns": names, "rows": [[r.get(c) for c in names] for r in records]}
+
+
+def take_rows(
+    rows: Iterable[Dict[str, Any]], limit: int = 0, offset: int = 0
+) -> List[Dict[str, Any]]:
+    """
+    Return rows[offset:offset + limit] and stop consuming the stream once the page is full.
+
+    Closing the generator cancels the underlying gRPC stream instead of draining it.
+    """
+    page = itertools.islice(rows, offset, offset + limit if limit else None)
+    try:
+        return normalize_records(page)
+    finally:
+        close = getattr(rows, "close", None)
+        if close:
+            close()
+
+
+def encode_cursor(key: str, value: Any) -> str:
+    """Build an opaque pagination cursor resuming after `value` of column `key`."""
+    raw = json.dumps({"k": key, "v": value}, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, key: str) -> Optional[Any]:
+    """Return the resume value of a cursor built by encode_cursor for column `key`."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+    except (ValueError, UnicodeDecodeError) as exc:
+        raise ValueError(f"Invalid cursor: {cursor!r}") from exc
+    if not isinstance(data, dict) or data.get("k") != key:
+        raise ValueError(f"Cursor does not page over {key}: {cursor!r}")
+    return data.get("v")
+
+
+def confined_path(
+    root: str,
+    path: str,
+    setting: str,
+    overwrite: bool = True,
+    directory: bool = False,
+) -> Path:
+    """
+    `path` resolved inside the directory `root` (relative paths are taken from it).
+
+    Raises ValueError when `root` is not configured (`setting` names its env var),
+    when the result would lie outside it (or be `root` itself, unless `directory`),
+    or when it exists and not `overwrite`.
+    """
+    if not root:
+        raise ValueError(f"Writing local files is disabled; set {setting}")
+    base = Path(root).expanduser().resolve()
+    dest = (base / Path(path).expanduser()).resolve()
+    if (dest == base and not directory) or not dest.is_relative_to(base):
+        raise ValueError(f"{path!r} is outside {setting} ({base})")
+    if not overwrite and dest.exists():
+        raise ValueError(f"{dest} already exists; pass overwrite=true to replace it")
+    return dest
 
 
 def pretty_json(data: Any) -> str:
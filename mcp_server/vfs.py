@@ -0,0 +1,226 @@
+from __future__ import annotations
+
+import contextvars
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
+
+from .config import ServerConfig
+
+Rows = List[Dict[str, Any]]
+
+# Completed flows of these artifacts change what vfs_files() returns for the client.
+VFS_ARTIFACT_PREFIX = "System.VFS."
+
+
+def vfs_path(path: str) -> str:
+    """Canonical VFS path: forward slashes, one leading slash, no trailing slash."""
+    return "/" + "/".join(part for part in path.replace("\\", "/").split("/") if part)
+
+
+def join_vfs(parent: str, name: str) -> str:
+    return vfs_path(f"{parent}/{name}")
+
+
+def is_directory(row: Dict[str, Any]) -> bool:
+    if "IsDir" in row:
+        return bool(row["IsDir"])
+    return str(row.get("Mode") or "").startswith("d")
+
+
+def _flow_artifacts(row: Dict[str, Any]) -> List[str]:
+    flow = row.get("Flow") or {}
+    request = flow.get("request") or {}
+    return list(flow.get("artifacts_with_results") or request.get("artifacts") or [])
+
+
+class VFSCache:
+    """
+    Read-through cache of vfs_files() listings keyed by (client_id, VFS path).
+
+    Entries live `ttl` seconds and at most `max_entries` directories are kept (LRU).
+    Once subscribed to the flow completion stream, a finished System.VFS.* flow
+    (ListDirectory, DownloadFile, ...) drops every cached listing of its client.
+    """
+
+    def __init__(self, ttl: float, max_entries: int):
+        self.ttl = ttl
+        self.max_entries = max(1, max_entries)
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[float, Rows]]" = (
+            OrderedDict()
+        )
+        self._subscribed = False
+        self._stats = {"hits": 0, "misses": 0, "invalidations": 0, "evictions": 0}
+
+    def get(self, client_id: str, path: str) -> Optional[Rows]:
+        key = (client_id, vfs_path(path))
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] <= time.monotonic():
+                self._stats["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self._stats["hits"] += 1
+            return entry[1]
+
+    def put(self, client_id: str, path: str, rows: Rows) -> None:
+        key = (client_id, vfs_path(path))
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, rows)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._stats["evictions"] += 1
+
+    def invalidate_client(self, client_id: str) -> int:
+        with self._lock:
+            stale = [key for key in self._entries if key[0] == client_id]
+            for key in stale:
+                del self._entries[key]
+            self._stats["invalidations"] += len(stale)
+        return len(stale)
+
+    def on_completion(self, row: Dict[str, Any]) -> None:
+        client_id = row.get("ClientId") or (row.get("Flow") or {}).get("client_id")
+        if client_id and any(
+            a.startswith(VFS_ARTIFACT_PREFIX) for a in _flow_artifacts(row)
+        ):
+            self.invalidate_client(client_id)
+
+    def subscribe(self, client) -> None:
+        """Listen for completed VFS flows on `client`'s shared completion stream, once."""
+        with self._lock:
+            if self._subscribed:
+                return
+            self._subscribed = True
+        client.on_flow_completion(self.on_completion)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self._stats["hits"] + self._stats["misses"]
+            return {
+                **self._stats,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl": self.ttl,
+                "hit_rate": self._stats["hits"] / lookups if lookups else None,
+            }
+
+
+@lru_cache(maxsize=1)
+def get_vfs_cache(cfg: ServerConfig) -> Optional[VFSCache]:
+    """Process-wide VFS listing cache, or None when MCP_VFS_CACHE_TTL is 0."""
+    if cfg.vfs_cache_ttl <= 0:
+        return None
+    return VFSCache(cfg.vfs_cache_ttl, cfg.vfs_cache_entries)
+
+
+def list_vfs(
+    cfg: ServerConfig, client, client_id: str, path: str, tool: str = "list_directory"
+) -> Rows:
+    """vfs_files() rows of one directory, served from the VFS cache when fresh."""
+    cache = get_vfs_cache(cfg)
+    if cache is not None:
+        cache.subscribe(client)
+        rows = cache.get(client_id, path)
+        if rows is not None:
+            return rows
+    safe_client_id = client_id.replace("'", "''")
+    safe_path = path.replace("'", "''")
+    vql = f"SELECT * FROM vfs_files(client_id='{safe_client_id}', path='{safe_path}')"
+    rows = list(client.query(vql, options=cfg.query_options_for(tool)))
+    if cache is not None:
+        cache.put(client_id, path, rows)
+    return rows
+
+
+def file_metadata(
+    cfg: ServerConfig, client, client_id: str, path: str, tool: str = "get_file_info"
+) -> Optional[Dict[str, Any]]:
+    """The file's row from its (cached) parent directory listing, if present."""
+    parent, _, name = vfs_path(path).rpartition("/")
+    if not name:
+        return None
+    rows = list_vfs(cfg, client, client_id, parent or "/", tool=tool)
+    return next((row for row in rows if row.get("Name") == name), None)
+
+
+def walk_vfs(
+    cfg: ServerConfig,
+    client,
+    client_id: str,
+    path: str,
+    max_depth: int,
+    max_nodes: int,
+    concurrency: int,
+) -> Dict[str, Any]:
+    """
+    Expand a VFS subtree breadth-first, listing each level's directories in parallel.
+
+    Every returned entry carries its VFS `Path` and `Depth` (1 = child of `path`).
+    The walk stops at `max_depth` levels or once `max_nodes` entries were collected;
+    `truncated` is set when either limit left directories unexpanded. Failed
+    listings are reported under `errors` and do not stop the walk.
+    """
+    root = vfs_path(path)
+    entries: Rows = []
+    errors: List[Dict[str, str]] = []
+    listed = 0
+    truncated = False
+    level = [root]
+    # Worker threads get a copy of the caller's context so queries keep the tool
+    # call's session, priority and deadline.
+    context = contextvars.copy_context()
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as pool:
+        for depth in range(1, max_depth + 1):
+            if not level:
+                break
+            futures = [
+                (
+                    parent,
+                    pool.submit(
+                        context.copy().run,
+                        list_vfs,
+                        cfg,
+                        client,
+                        client_id,
+                        parent,
+                        "walk_directory",
+                    ),
+                )
+                for parent in level
+            ]
+            next_level: List[str] = []
+            for parent, future in futures:
+                try:
+                    rows = future.result()
+                except Exception as exc:
+                    errors.append({"path": parent, "error": str(exc)})
+                    continue
+                listed += 1
+                for row in rows:
+                    if len(entries) >= max_nodes:
+                        truncated = True
+                        break
+                    child = join_vfs(parent, str(row.get("Name") or ""))
+                    entries.append({**row, "Path": child, "Depth": depth})
+                    if is_directory(row):
+                        next_level.append(child)
+            if truncated:
+                for _, future in futures:
+                    future.cancel()
+                break
+            level = next_level
+        else:
+            truncated = bool(level)
+    return {
+        "root": root,
+        "entries": entries,
+        "directories_listed": listed,
+        "truncated": truncated,
+        "errors": errors,
+    }
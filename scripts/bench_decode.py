@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""Rows/sec of the frame decode path on a synthetic response.
+
+Usage: scripts/bench_decode.py [--rows 100000] [--frame-rows 1000]
+
+The response is split into JSON frames the way Velociraptor batches VQLResponse
+messages. "legacy" is the previous path: stdlib json.loads, one yield per row and a
+dict() copy per row in normalize_records. The other lines run the current path
+(frame-level yield, copy-free normalize_records) with each available decoder.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from mcp_server.decoding import DECODERS  # noqa: E402
+from mcp_server.utils import normalize_records  # noqa: E402
+
+
+def make_frames(rows: int, frame_rows: int) -> list:
+    def row(i: int) -> dict:
+        return {
+            "ClientId": f"C.{i % 5000:016x}",
+            "FlowId": f"F.{i:08X}",
+            "OSPath": f"C:\\Windows\\System32\\drivers\\file_{i}.sys",
+            "Size": i * 37,
+            "Mtime": "2024-05-01T12:34:56Z",
+            "Hash": {"MD5": f"{i:032x}", "SHA256": f"{i:064x}"},
+            "Tags": ["signed", "driver"],
+        }
+
+    return [
+        json.dumps([row(i) for i in range(start, min(start + frame_rows, rows))])
+        for start in range(0, rows, frame_rows)
+    ]
+
+
+def legacy(frames):
+    def stream():
+        for frame in frames:
+            for row in json.loads(frame):
+                yield row
+
+    return [dict(r) for r in stream()]
+
+
+def current(frames, decode):
+    def stream():
+        for frame in frames:
+            yield from decode(frame)
+
+    return normalize_records(stream())
+
+
+def timed(fn, *args, repeat: int = 3):
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        out = fn(*args)
+        best = min(best, time.perf_counter() - started)
+    return best, len(out)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--frame-rows", type=int, default=1000)
+    args = parser.parse_args()
+
+    frames = make_frames(args.rows, args.frame_rows)
+    size = sum(len(f) for f in frames)
+    print(f"{args.rows} rows, {len(frames)} frames, {size / 1e6:.1f} MB")
+    print(f"{'path':<16}{'seconds':>10}{'rows/s':>14}")
+    elapsed, rows = timed(legacy, frames)
+    print(f"{'legacy':<16}{elapsed:>10.3f}{rows / elapsed:>14.0f}")
+    for name, decode in DECODERS.items():
+        elapsed, rows = timed(current, frames, decode)
+        print(f"{name:<16}{elapsed:>10.3f}{rows / elapsed:>14.0f}")
+
+
+if __name__ == "__main__":
+    main()
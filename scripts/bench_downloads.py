@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""download_files throughput against concurrency on a fake server.
+
+Usage: scripts/bench_downloads.py [--files 50] [--size 4194304] [--latency-ms 20]
+
+Every VFSGetBuffer call on the fake server takes `--latency-ms`, standing in for
+the round trip to a remote client, so serial downloads are latency bound. Each run
+fetches `--files` distinct files into a fresh blob store; throughput should grow
+with concurrency until the server's worker pool (`--server-workers`) is the limit.
+"""
+
+from __future__ import annotations
+
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+from fake_velociraptor import FakeAPIServicer, LocalClient, serve
+
+from mcp_server.blobs import BlobStore, acquire_vfs_files
+from mcp_server.config import ServerConfig
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--files", type=int, default=50)
+    parser.add_argument("--size", type=int, default=4 * 1024 * 1024)
+    parser.add_argument("--latency-ms", type=float, default=20)
+    parser.add_argument("--server-workers", type=int, default=16)
+    args = parser.parse_args()
+
+    servicer = FakeAPIServicer(
+        file_size=args.size, buffer_latency=args.latency_ms / 1000
+    )
+    server, target = serve(servicer, max_workers=args.server_workers)
+    cfg = ServerConfig(api_config_path=Path("unused"), query_deadline_seconds=0)
+    client = LocalClient(cfg, target)
+    targets = [("C.1", f"/file/C:/Windows/Prefetch/F{i}.pf") for i in range(args.files)]
+    print(f"{'concurrency':>12}{'seconds':>10}{'MiB/s':>10}")
+    try:
+        for concurrency in (1, 2, 4, 8, 16, 32):
+            with tempfile.TemporaryDirectory() as tmp:
+                store = BlobStore(tmp, max_bytes=2 * args.files * args.size)
+                started = time.perf_counter()
+                manifest = acquire_vfs_files(cfg, store, client, targets, concurrency)
+                elapsed = time.perf_counter() - started
+            assert not manifest["failed"], manifest["files"][0]
+            rate = manifest["bytes"] / elapsed / (1024 * 1024)
+            print(f"{concurrency:>12}{elapsed:>10.2f}{rate:>10.1f}")
+    finally:
+        server.stop(None)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""Export throughput and peak memory against a fake server.
+
+Usage: scripts/bench_export.py [--rows 200000] [--format jsonl|parquet]
+
+For each size the query is first drained without writing anything (the gRPC stream
+rate), then exported; peak Python heap during the export is measured with tracemalloc
+and should stay flat as the row count grows.
+"""
+
+from __future__ import annotations
+
+import argparse
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+from fake_velociraptor import FakeAPIServicer, LocalClient, serve
+
+from mcp_server.config import QueryOptions, ServerConfig
+from mcp_server.export import export_rows
+
+OPTIONS = QueryOptions(max_row=5000, max_wait=1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=200000)
+    parser.add_argument("--format", default="jsonl", choices=("jsonl", "parquet"))
+    args = parser.parse_args()
+
+    server, target = serve(FakeAPIServicer())
+    client = LocalClient(ServerConfig(api_config_path=Path("unused")), target)
+    print(f"{'rows':>10}{'stream rows/s':>16}{'export rows/s':>16}{'peak MiB':>10}")
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            for rows in (args.rows // 10, args.rows):
+                vql = f"SELECT * FROM fake(rows={rows}, row_bytes=150)"
+                started = time.perf_counter()
+                for _ in client.query(vql, options=OPTIONS):
+                    pass
+                stream_rate = rows / (time.perf_counter() - started)
+
+                dest = Path(tmp) / f"out-{rows}.{args.format}"
+                tracemalloc.start()
+                started = time.perf_counter()
+                export_rows(client.query(vql, options=OPTIONS), dest, args.format)
+                export_rate = rows / (time.perf_counter() - started)
+                peak = tracemalloc.get_traced_memory()[1] / (1024 * 1024)
+                tracemalloc.stop()
+                print(
+                    f"{rows:>10}{stream_rate:>16.0f}{export_rate:>16.0f}{peak:>10.1f}"
+                )
+    finally:
+        server.stop(None)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""Latency/throughput tradeoff of VQLCollectorArgs settings against a fake server.
+
+Usage: scripts/bench_query_args.py [--bulk-rows 100000]
+
+Two workloads run for every (max_row, max_wait) setting:
+- trickle: 40 rows produced 50ms apart (monitoring-style); reports time to first row.
+- bulk: many rows produced as fast as possible (hunt export); reports frames and rows/s.
+The adaptive row repeats the bulk query so the tuner has seen its shape once.
+"""
+
+from __future__ import annotations
+
+import argparse
+import dataclasses
+import time
+from pathlib import Path
+
+from fake_velociraptor import FakeAPIServicer, LocalClient, serve
+
+from mcp_server.config import QueryOptions, ServerConfig
+
+SETTINGS = [(100, 1), (1000, 1), (10000, 1), (1000, 5)]
+
+
+def run(client, servicer, vql, options=None):
+    frames_before = servicer.frames
+    started = time.perf_counter()
+    first = None
+    rows = 0
+    for _ in client.query(vql, options=options):
+        if first is None:
+            first = time.perf_counter() - started
+        rows += 1
+    elapsed = time.perf_counter() - started
+    return first or elapsed, elapsed, servicer.frames - frames_before, rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--bulk-rows", type=int, default=100000)
+    args = parser.parse_args()
+
+    servicer = FakeAPIServicer()
+    server, target = serve(servicer)
+    cfg = ServerConfig(api_config_path=Path("unused"))
+    trickle = "SELECT * FROM fake(rows=40, interval_ms=50)"
+    bulk = f"SELECT * FROM fake(rows={args.bulk_rows}, row_bytes=150)"
+
+    print(
+        f"{'setting':<24}{'trickle TTFR s':>16}{'bulk s':>10}{'frames':>8}{'rows/s':>12}"
+    )
+    try:
+        client = LocalClient(cfg, target)
+        for max_row, max_wait in SETTINGS:
+            options = QueryOptions(max_row=max_row, max_wait=max_wait)
+            ttfr, _, _, _ = run(client, servicer, trickle, options)
+            _, elapsed, frames, rows = run(client, servicer, bulk, options)
+            label = f"max_row={max_row} wait={max_wait}"
+            print(
+                f"{label:<24}{ttfr:>16.3f}{elapsed:>10.3f}{frames:>8}{rows / elapsed:>12.0f}"
+            )
+
+        adaptive = LocalClient(
+            dataclasses.replace(cfg, adaptive_query_options=True), target
+        )
+        for vql in (trickle, bulk):
+            run(adaptive, servicer, vql)
+        ttfr, _, _, _ = run(adaptive, servicer, trickle)
+        _, elapsed, frames, rows = run(adaptive, servicer, bulk)
+        print(
+            f"{'adaptive':<24}{ttfr:>16.3f}{elapsed:>10.3f}{frames:>8}{rows / elapsed:>12.0f}"
+        )
+    finally:
+        server.stop(None)
+
+
+if __name__ == "__main__":
+    main()
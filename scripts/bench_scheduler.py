@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""Interactive lookup latency while bulk scans saturate a fake server.
+
+Usage: scripts/bench_scheduler.py [--bulk 24] [--lookups 200] [--server-workers 16]
+
+`--bulk` threads run slow bulk scans back to back while one thread issues point
+lookups. "unlimited" lets every stream through, so bulk work occupies all server
+workers and lookups queue behind it on the server; "scheduled" uses the default
+caps (8 streams, 6 of them bulk), leaving room for interactive calls.
+"""
+
+from __future__ import annotations
+
+import argparse
+import dataclasses
+import statistics
+import threading
+import time
+from pathlib import Path
+
+from fake_velociraptor import FakeAPIServicer, LocalClient, serve
+
+from mcp_server.config import ServerConfig
+from mcp_server.scheduler import CallContext, bind_call
+
+BULK_VQL = "SELECT * FROM fake(rows=100, interval_ms=10)"
+LOOKUP_VQL = "SELECT * FROM fake(rows=1)"
+
+
+def run(cfg: ServerConfig, target: str, bulk: int, lookups: int):
+    client = LocalClient(cfg, target)
+    stop = threading.Event()
+
+    def bulk_worker(i):
+        with bind_call(
+            CallContext(tool="get_hunt_results", session=f"s{i % 4}", priority="bulk")
+        ):
+            while not stop.is_set():
+                list(client.query(BULK_VQL))
+
+    threads = [threading.Thread(target=bulk_worker, args=(i,)) for i in range(bulk)]
+    for t in threads:
+        t.start()
+    time.sleep(0.5)
+    latencies = []
+    with bind_call(
+        CallContext(tool="get_client_info", session="ui", priority="interactive")
+    ):
+        for _ in range(lookups):
+            started = time.perf_counter()
+            list(client.query(LOOKUP_VQL))
+            latencies.append(time.perf_counter() - started)
+    stop.set()
+    for t in threads:
+        t.join()
+    latencies.sort()
+    return (
+        statistics.median(latencies) * 1000,
+        latencies[int(len(latencies) * 0.99) - 1] * 1000,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--bulk", type=int, default=24)
+    parser.add_argument("--lookups", type=int, default=200)
+    parser.add_argument("--server-workers", type=int, default=16)
+    args = parser.parse_args()
+
+    server, target = serve(FakeAPIServicer(), max_workers=args.server_workers)
+    base = ServerConfig(api_config_path=Path("unused"), query_deadline_seconds=0)
+    configs = {
+        "unlimited": dataclasses.replace(
+            base,
+            query_concurrency=1000,
+            session_query_concurrency=1000,
+            bulk_query_concurrency=1000,
+        ),
+        "scheduled": base,
+    }
+    print(f"{'scheduler':<12}{'lookup p50 ms':>15}{'lookup p99 ms':>15}")
+    try:
+        for label, cfg in configs.items():
+            p50, p99 = run(cfg, target, args.bulk, args.lookups)
+            print(f"{label:<12}{p50:>15.1f}{p99:>15.1f}")
+    finally:
+        server.stop(None)
+
+
+if __name__ == "__main__":
+    main()
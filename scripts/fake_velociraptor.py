@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""In-process fake Velociraptor API used by the benchmark scripts.
+
+Query() understands a tiny workload syntax embedded in the VQL so benchmarks can ask
+for a result shape without a real server: `rows=N` sets the number of rows,
+`interval_ms=M` the delay between rows and `row_bytes=B` the padding per row.
+Rows are batched the way Velociraptor does it: a frame is flushed once max_row rows
+are buffered or max_wait seconds have passed. VFSGetBuffer serves a deterministic
+synthetic file of `file_size` bytes, each call taking at least `buffer_latency`
+seconds (a round trip to a remote client).
+"""
+
+from __future__ import annotations
+
+import json
+import re
+import sys
+import time
+from concurrent import futures
+from pathlib import Path
+from typing import Tuple
+
+import grpc
+from pyvelociraptor import api_pb2, api_pb2_grpc
+
+ROOT = Path(__file__).resolve().parent.parent
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from mcp_server.client import VelociraptorClient  # noqa: E402
+from mcp_server.config import ServerConfig  # noqa: E402
+
+_PARAM = re.compile(r"\b(rows|interval_ms|row_bytes)=(\d+)")
+
+
+def workload(vql: str) -> Tuple[int, float, int]:
+    params = {k: int(v) for k, v in _PARAM.findall(vql)}
+    return (
+        params.get("rows", 1),
+        params.get("interval_ms", 0) / 1000.0,
+        params.get("row_bytes", 150),
+    )
+
+
+class FakeAPIServicer(api_pb2_grpc.APIServicer):
+    def __init__(self, file_size: int = 64 * 1024 * 1024, buffer_latency: float = 0.0):
+        self.file_size = file_size
+        self.buffer_latency = buffer_latency
+        self.frames = 0
+
+    def Query(self, request, context):
+        max_row = request.max_row or 10000
+        max_wait = request.max_wait or 10
+        for q in request.Query:
+            rows, interval, row_bytes = workload(q.VQL)
+            pad = "x" * row_bytes
+            batch: list = []
+            flushed = time.monotonic()
+            for i in range(rows):
+                if interval:
+                    time.sleep(interval)
+                batch.append({"ClientId": f"C.{i % 1000}", "Row": i, "Data": pad})
+                now = time.monotonic()
+                if len(batch) >= max_row or now - flushed >= max_wait:
+                    self.frames += 1
+                    yield api_pb2.VQLResponse(Response=json.dumps(batch), Query=q)
+                    batch, flushed = [], now
+            if batch:
+                self.frames += 1
+                yield api_pb2.VQLResponse(Response=json.dumps(batch), Query=q)
+
+    def VFSGetBuffer(self, request, context):
+        if self.buffer_latency:
+            time.sleep(self.buffer_latency)
+        start = min(request.offset, self.file_size)
+        end = min(start + request.length, self.file_size)
+        data = bytes((i * 31 + 7) % 251 for i in range(start, min(end, start + 251)))
+        block = (data * ((end - start) // max(len(data), 1) + 1))[: end - start]
+        return api_pb2.VFSFileBuffer(data=block)
+
+
+def serve(servicer: FakeAPIServicer, max_workers: int = 32):
+    server = grpc.server(
+        futures.ThreadPoolExecutor(max_workers=max_workers),
+        options=[("grpc.max_send_message_length", 256 * 1024 * 1024)],
+    )
+    api_pb2_grpc.add_APIServicer_to_server(servicer, server)
+    port = server.add_insecure_port("127.0.0.1:0")
+    server.start()
+    return server, f"127.0.0.1:{port}"
+
+
+class LocalClient(VelociraptorClient):
+    """VelociraptorClient talking to the fake server over an insecure channel."""
+
+    def __init__(self, cfg: ServerConfig, target: str):
+        super().__init__(cfg)
+        self.target = target
+
+    def _open_channel(self):
+        return grpc.insecure_channel(
+            self.target, options=[("grpc.max_receive_message_length", -1)]
+        )
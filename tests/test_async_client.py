@@ -0,0 +1,108 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import time
+from pathlib import Path
+
+import grpc
+import pytest
+
+from mcp_server.client import AsyncVelociraptorClient
+from mcp_server.config import load_config
+from mcp_server.tools import vql
+
+api_pb2 = pytest.importorskip("pyvelociraptor.api_pb2")
+api_pb2_grpc = pytest.importorskip("pyvelociraptor.api_pb2_grpc")
+
+QUERY_DELAY = 0.3
+
+
+class SlowAPIServicer(api_pb2_grpc.APIServicer):
+    """Fake Velociraptor API whose Query takes QUERY_DELAY seconds per request."""
+
+    def __init__(self):
+        self.calls = 0
+
+    async def Query(self, request, context):
+        self.calls += 1
+        await asyncio.sleep(QUERY_DELAY)
+        for q in request.Query:
+            yield api_pb2.VQLResponse(
+                Response=json.dumps([{"vql": q.VQL}]), Query=q, total_rows=1
+            )
+
+
+class LocalAsyncClient(AsyncVelociraptorClient):
+    def __init__(self, cfg, target: str):
+        super().__init__(cfg)
+        self.target = target
+
+    def _open_channel(self):
+        return grpc.aio.insecure_channel(self.target)
+
+
+@pytest.fixture()
+def cfg(tmp_path: Path):
+    api_cfg = tmp_path / "api.config.yaml"
+    api_cfg.write_text("dummy: true")
+    return load_config(default_path=api_cfg)
+
+
+def test_concurrent_query_vql_share_channel(cfg, monkeypatch):
+    n = 8
+
+    async def scenario():
+        server = grpc.aio.server()
+        api_pb2_grpc.add_APIServicer_to_server(SlowAPIServicer(), server)
+        port = server.add_insecure_port("127.0.0.1:0")
+        await server.start()
+        try:
+            client = LocalAsyncClient(cfg, f"127.0.0.1:{port}")
+            monkeypatch.setattr(vql, "get_async_client", lambda _cfg: client)
+            started = time.perf_counter()
+            outs = await asyncio.gather(
+                *(
+                    vql.query_vql_async(cfg, f"SELECT {i} FROM scope()")
+                    for i in range(n)
+                )
+            )
+            return outs, time.perf_counter() - started
+        finally:
+            await server.stop(None)
+
+    outs, elapsed = asyncio.run(scenario())
+    assert [o["rows"][0]["vql"] for o in outs] == [
+        f"SELECT {i} FROM scope()" for i in range(n)
+    ]
+    # Serialized calls would take n * QUERY_DELAY; concurrent ones take about one delay.
+    assert elapsed < QUERY_DELAY * n / 2
+
+
+def test_batch_query_vql_uses_one_rpc(cfg, monkeypatch):
+    servicer = SlowAPIServicer()
+
+    async def scenario():
+        server = grpc.aio.server()
+        api_pb2_grpc.add_APIServicer_to_server(servicer, server)
+        port = server.add_insecure_port("127.0.0.1:0")
+        await server.start()
+        try:
+            client = LocalAsyncClient(cfg, f"127.0.0.1:{port}")
+            monkeypatch.setattr(vql, "get_async_client", lambda _cfg: client)
+            return await vql.batch_query_vql_async(
+                cfg,
+                {
+                    "info": "SELECT * FROM info()",
+                    "hunts": "SELECT * FROM hunts()",
+                },
+            )
+        finally:
+            await server.stop(None)
+
+    out = asyncio.run(scenario())
+    assert out["results"] == {
+        "info": [{"vql": "SELECT * FROM info()"}],
+        "hunts": [{"vql": "SELECT * FROM hunts()"}],
+    }
+    assert servicer.calls == 1
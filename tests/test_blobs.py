@@ -0,0 +1,271 @@
+from __future__ import annotations
+
+import base64
+import dataclasses
+import hashlib
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+from mcp_server.blobs import BlobStore, BlobTooLarge, get_blob_store
+from mcp_server.config import load_config
+from mcp_server.tools import files
+from mcp_server.vfs import get_vfs_cache
+
+CONTENT = bytes(range(256)) * 64
+
+
+class FakeDownloadClient:
+    def __init__(self, size: int = len(CONTENT), mtime: str = "2024-01-01T00:00:00Z"):
+        self.size = size
+        self.mtime = mtime
+        self.downloads = []
+        self.queries = 0
+
+    def query(self, vql_stmt, params=None, **options):
+        self.queries += 1
+        return iter([{"Name": "evil.exe", "Size": self.size, "Mtime": self.mtime}])
+
+    def iter_download(self, client_id, path, offset=0, length=0, chunk_size=4096):
+        self.downloads.append((client_id, path))
+        for start in range(0, len(CONTENT), chunk_size):
+            yield CONTENT[start : start + chunk_size]
+
+    def download(self, client_id, path, offset=0, length=0):
+        self.downloads.append((client_id, path, offset, length))
+        return CONTENT[offset : offset + length] if length else CONTENT[offset:]
+
+    def on_flow_completion(self, listener):
+        pass
+
+
+@pytest.fixture()
+def cfg(tmp_path: Path, monkeypatch):
+    api_cfg = tmp_path / "api.config.yaml"
+    api_cfg.write_text("dummy: true")
+    monkeypatch.setenv("MCP_BLOB_DIR", str(tmp_path / "blobs"))
+    monkeypatch.setenv("MCP_BLOB_STORE_BYTES", str(1024 * 1024))
+    monkeypatch.setenv("MCP_DOWNLOAD_DIR", str(tmp_path))
+    monkeypatch.setenv("MCP_VFS_CACHE_TTL", "300")
+    get_blob_store.cache_clear()
+    get_vfs_cache.cache_clear()
+    yield load_config(default_path=api_cfg)
+    get_blob_store.cache_clear()
+    get_vfs_cache.cache_clear()
+
+
+def test_download_dedupes_and_serves_unchanged_files_locally(
+    cfg, monkeypatch, tmp_path
+):
+    client = FakeDownloadClient()
+    monkeypatch.setattr(files, "get_client", lambda _cfg: client)
+
+    first = files.download_file(cfg, client_id="C.1", path="/file/C:/evil.exe")
+    assert first["sha256"] == hashlib.sha256(CONTENT).hexdigest()
+    assert first["size"] == len(CONTENT) and not first["cached"]
+    assert first["preview_hex"] == CONTENT[:256].hex()
+    assert "data_base64" not in first
+
+    again = files.download_file(cfg, client_id="C.1", path="/file/C:/evil.exe")
+    assert again["cached"] and len(client.downloads) == 1
+
+    # Same bytes on another client are fetched but stored once.
+    other = files.download_file(cfg, client_id="C.2", path="/file/C:/evil.exe")
+    assert other["sha256"] == first["sha256"] and len(client.downloads) == 2
+    stats = get_blob_store(cfg).stats()
+    assert stats["blobs"] == 1 and stats["deduplicated"] == 1 and stats["indexed"] == 2
+
+    # Copies and ranges of stored files come from the store; ranges of other files
+    # are read directly without fetching them whole.
+    dest = tmp_path / "out" / "evil.exe"
+    copied = files.download_file(
+        cfg, client_id="C.1", path="/file/C:/evil.exe", dest_path=str(dest)
+    )
+    assert copied["length"] == len(CONTENT) and dest.read_bytes() == CONTENT
+    assert len(client.downloads) == 2
+    part = files.download_file(
+        cfg, client_id="C.3", path="/file/C:/evil.exe", offset=10, length=5
+    )
+    assert base64.b64decode(part["data_base64"]) == CONTENT[10:15]
+    assert client.downloads[-1] == ("C.3", "/file/C:/evil.exe", 10, 5)
+    stored = files.download_file(
+        cfg, client_id="C.1", path="/file/C:/evil.exe", offset=10, length=5
+    )
+    assert base64.b64decode(stored["data_base64"]) == CONTENT[10:15]
+    assert stored["cached"] and len(client.downloads) == 3
+    tail = files.download_file(
+        cfg,
+        client_id="C.1",
+        path="/file/C:/evil.exe",
+        offset=len(CONTENT) - 6,
+        dest_path="out/tail.bin",
+    )
+    assert tail["length"] == 6 and (tmp_path / "out" / "tail.bin").read_bytes() == (
+        CONTENT[-6:]
+    )
+    assert len(client.downloads) == 3
+
+    blob = files.read_blob(cfg, first["sha256"], offset=len(CONTENT) - 3, length=10)
+    assert base64.b64decode(blob["data_base64"]) == CONTENT[-3:]
+
+
+def test_changed_mtime_downloads_again(cfg, monkeypatch):
+    client = FakeDownloadClient()
+    monkeypatch.setattr(files, "get_client", lambda _cfg: client)
+    files.download_file(cfg, client_id="C.1", path="/file/C:/evil.exe")
+    client.mtime = "2024-02-01T00:00:00Z"
+    get_vfs_cache(cfg).invalidate_client("C.1")  # as a finished System.VFS flow does
+    out = files.download_file(cfg, client_id="C.1", path="/file/C:/evil.exe")
+    assert not out["cached"] and len(client.downloads) == 2
+
+
+def test_without_vfs_cache_downloads_skip_the_listing(cfg, monkeypatch):
+    cfg = dataclasses.replace(cfg, vfs_cache_ttl=0)
+    client = FakeDownloadClient()
+    monkeypatch.setattr(files, "get_client", lambda _cfg: client)
+    for _ in range(2):
+        out = files.download_file(cfg, client_id="C.1", path="/file/C:/evil.exe")
+        assert out["sha256"] == hashlib.sha256(CONTENT).hexdigest()
+    assert client.queries == 0 and len(client.downloads) == 2
+
+
+def test_oversized_files_bypass_the_store(cfg, monkeypatch):
+    client = FakeDownloadClient()
+    monkeypatch.setattr(files, "get_client", lambda _cfg: client)
+    files.download_file(cfg, client_id="C.1", path="/file/C:/evil.exe")
+    store = get_blob_store(cfg)
+    store.max_bytes = len(CONTENT) - 1
+    # Size unknown (no listing row): the store gives up and the direct path carries
+    # on from where it stopped, so the file is still transferred once.
+    client.query = lambda vql_stmt, params=None, **options: iter([])
+    client.downloads.clear()
+    out = files.download_file(cfg, client_id="C.2", path="/file/C:/big.bin")
+    assert base64.b64decode(out["data_base64"]) == CONTENT
+    out = files.download_file(
+        cfg, client_id="C.3", path="/file/C:/big.bin", dest_path="big.bin"
+    )
+    assert out["length"] == len(CONTENT) and Path(out["dest_path"]).read_bytes() == (
+        CONTENT
+    )
+    assert client.downloads == [
+        ("C.2", "/file/C:/big.bin"),
+        ("C.3", "/file/C:/big.bin"),
+    ]
+    assert store.stats()["blobs"] == 1 and store.stats()["evictions"] == 0
+    assert not list(store.directory.glob(".*.partial"))
+
+
+def test_lru_eviction_and_adoption(tmp_path):
+    store = BlobStore(str(tmp_path), max_bytes=10)
+    a, _ = store.put([b"aaaa"], key=("C.1", "/a", 4, ""))
+    b, _ = store.put([b"bbbb"])
+    store.read(a)  # a is now the most recently used
+    c, _ = store.put([b"cccc"])
+    assert store.lookup(("C.1", "/a", 4, "")) == a
+    with pytest.raises(KeyError):
+        store.read(b)
+    assert not store.path(b).exists() and store.stats()["evictions"] == 1
+
+    reopened = BlobStore(str(tmp_path), max_bytes=10)
+    assert reopened.read(c, 1, 2) == b"cc" and reopened.stats()["blobs"] == 2
+    assert not list(tmp_path.glob(".*.partial"))
+
+
+def test_oversized_blob_is_refused_before_evicting(tmp_path):
+    store = BlobStore(str(tmp_path), max_bytes=10)
+    a, _ = store.put([b"aaaa"])
+    pulled = []
+
+    def chunks():
+        for chunk in (b"xxxxxx", b"yyyyyy", b"zzzzzz"):
+            pulled.append(chunk)
+            yield chunk
+
+    with pytest.raises(BlobTooLarge):
+        store.put(chunks())
+    assert len(pulled) == 2 and store.read(a) == b"aaaa"
+    assert store.stats()["evictions"] == 0 and not list(tmp_path.glob(".*.partial"))
+
+
+def test_pinned_blobs_survive_eviction(tmp_path):
+    store = BlobStore(str(tmp_path), max_bytes=8)
+    a, _ = store.put([b"aaaa"], pin=True)
+    store.put([b"bbbb"])
+    store.put([b"cccc"])  # evicts b, not the pinned a
+    assert store.path(a).exists() and store.stats()["evictions"] == 1
+    store.unpin(a)
+    store.put([b"dddd"])
+    with pytest.raises(KeyError):
+        store.read(a)
+
+
+def test_download_files_manifest_dedupes_and_reports_errors(cfg, monkeypatch, tmp_path):
+    class BulkClient(FakeDownloadClient):
+        def __init__(self):
+            super().__init__()
+            self.active = self.peak = 0
+            self._lock = threading.Lock()
+
+        def query(self, vql_stmt, params=None, **options):
+            return iter([])
+
+        def iter_download(self, client_id, path, offset=0, length=0, chunk_size=4096):
+            if path.endswith("missing"):
+                raise RuntimeError("file not found")
+            with self._lock:
+                self.active += 1
+                self.peak = max(self.peak, self.active)
+            time.sleep(0.05)
+            with self._lock:
+                self.active -= 1
+            yield from super().iter_download(
+                client_id, path, offset, length, chunk_size
+            )
+
+    client = BulkClient()
+    monkeypatch.setattr(files, "get_client", lambda _cfg: client)
+    targets = [
+        {"client_id": f"C.{i}", "path": "/file/C:/Windows/notepad.exe"}
+        for i in range(6)
+    ]
+    targets += [["C.0", "/file/C:/Windows/notepad.exe"], ["C.0", "/file/C:/missing"]]
+
+    out = files.download_files(
+        cfg, targets, concurrency=100, dest_dir=str(tmp_path / "out")
+    )
+    assert len(out["files"]) == 7 and len(client.downloads) == 6
+    assert out["downloaded"] == 6 and out["failed"] == 1 and out["unique_blobs"] == 1
+    assert out["bytes"] == 6 * len(CONTENT)
+    assert out["files"][-1] == {
+        "client_id": "C.0",
+        "path": "/file/C:/missing",
+        "error": "file not found",
+    }
+    copy = tmp_path / "out" / "C.3" / "file" / "C:" / "Windows" / "notepad.exe"
+    assert copy.read_bytes() == CONTENT
+    # Requested concurrency is capped at MCP_DOWNLOAD_CONCURRENCY.
+    assert client.peak == cfg.download_concurrency
+
+
+def test_download_files_rejects_destinations_outside_dest_dir(
+    cfg, monkeypatch, tmp_path
+):
+    client = FakeDownloadClient()
+    monkeypatch.setattr(files, "get_client", lambda _cfg: client)
+    out_dir = tmp_path / "out"
+    out_dir.mkdir()
+    (out_dir / "C.1").mkdir()
+    (out_dir / "C.1" / "link").symlink_to(tmp_path)
+    targets = [
+        ["C.1", "/../../escaped.txt"],
+        ["C.1", "/file/../../../escaped.txt"],
+        ["C.1", "/link/escaped.txt"],
+        ["../x", "/file/a.txt"],
+        ["C.1/../..", "/file/a.txt"],
+        ["C.1", "/"],
+    ]
+    out = files.download_files(cfg, targets, dest_dir=str(out_dir))
+    assert out["failed"] == len(targets) and client.downloads == []
+    assert not list(tmp_path.glob("escaped*")) and not (tmp_path / "x").exists()
@@ -0,0 +1,155 @@
+from __future__ import annotations
+
+import dataclasses
+import json
+import threading
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+from mcp_server.cache import QueryCache, get_query_cache, mutating_functions
+from mcp_server.client import VelociraptorClient
+from mcp_server.config import load_config
+from mcp_server.scheduler import CallContext, QueryCancelled, QueryDeadlineExceeded
+
+api_pb2 = pytest.importorskip("pyvelociraptor.api_pb2")
+
+
+class FakeCall:
+    def __init__(self, rows, delay=0.0):
+        self.rows = rows
+        self.delay = delay
+
+    def __iter__(self):
+        time.sleep(self.delay)
+        yield SimpleNamespace(Response=json.dumps(self.rows))
+
+    def cancel(self):
+        pass
+
+
+class CountingStub:
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.vql = []
+
+    def Query(self, req):
+        self.vql.append(req.Query[0].VQL)
+        return FakeCall([{"n": len(self.vql)}], self.delay)
+
+
+@pytest.fixture()
+def cached_client(tmp_path: Path):
+    api_cfg = tmp_path / "api.config.yaml"
+    api_cfg.write_text("dummy: true")
+    cfg = dataclasses.replace(
+        load_config(default_path=api_cfg), query_cache_bytes=1 << 20
+    )
+    client = VelociraptorClient(cfg)
+    client._stub = CountingStub(delay=0.05)
+    client._api_pb2 = api_pb2
+    yield client
+    get_query_cache.cache_clear()
+
+
+def test_mutating_functions_detected():
+    assert mutating_functions("SELECT hunt_delete(hunt_id='H.1') FROM scope()") == [
+        "hunt_delete"
+    ]
+    assert mutating_functions("SELECT * FROM hunts()") == []
+
+
+def test_cache_coalesces_and_invalidates(cached_client):
+    stub = cached_client._stub
+    results = []
+
+    def read():
+        results.append(cached_client.query("SELECT *  FROM hunts()", cache_ttl=60))
+
+    threads = [threading.Thread(target=read) for _ in range(5)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    # Five concurrent callers, one RPC; whitespace variants share the entry.
+    assert len(stub.vql) == 1 and all(r == [{"n": 1}] for r in results)
+    assert cached_client.query("SELECT * FROM hunts()", cache_ttl=60) == [{"n": 1}]
+
+    list(cached_client.query("SELECT hunt_delete(hunt_id='H.1') FROM scope()"))
+    assert cached_client.query("SELECT * FROM hunts()", cache_ttl=60) == [{"n": 3}]
+    stats = get_query_cache(cached_client.cfg).stats()
+    assert stats["coalesced"] == 4 and stats["invalidations"] == 1
+
+
+def test_cache_lru_respects_byte_budget():
+    cache = QueryCache(max_bytes=25)
+    for i in range(4):
+        cache.get_or_load("", f"SELECT {i}", 60, lambda i=i: [{"v": i}])
+    stats = cache.stats()
+    assert stats["bytes"] <= 25 and stats["evictions"] >= 1
+    loads = []
+    cache.get_or_load("", "SELECT 0", 60, lambda: loads.append(1) or [])
+    assert loads == [1]
+
+
+def test_coalesced_waiters_keep_their_own_deadline_and_cancellation():
+    cache = QueryCache(max_bytes=10000)
+    release = threading.Event()
+    started = threading.Event()
+
+    def slow_loader():
+        started.set()
+        release.wait(5)
+        return [{"v": 1}]
+
+    leader = threading.Thread(
+        target=lambda: cache.get_or_load("", "SELECT 1", 60, slow_loader)
+    )
+    leader.start()
+    started.wait(5)
+
+    waiting = time.monotonic()
+    with pytest.raises(QueryDeadlineExceeded):
+        cache.get_or_load(
+            "", "SELECT 1", 60, slow_loader, call=CallContext(deadline=waiting + 0.1)
+        )
+    assert time.monotonic() - waiting < 2
+
+    call = CallContext()
+    threading.Timer(0.05, call.cancel).start()
+    with pytest.raises(QueryCancelled):
+        cache.get_or_load("", "SELECT 1", 60, slow_loader, call=call)
+
+    # A patient waiter still gets the leader's rows.
+    result = []
+    waiter = threading.Thread(
+        target=lambda: result.append(
+            cache.get_or_load("", "SELECT 1", 60, slow_loader, call=CallContext())
+        )
+    )
+    waiter.start()
+    release.set()
+    leader.join(5)
+    waiter.join(5)
+    assert result == [[{"v": 1}]] and cache.stats()["coalesced"] == 3
+
+
+def test_load_invalidated_in_flight_is_not_cached():
+    cache = QueryCache(max_bytes=10000)
+    loads = []
+
+    def loader():
+        loads.append(1)
+        # A mutation lands while the rows are still streaming in.
+        cache.invalidate_for("SELECT hunt_delete(hunt_id='H.1') FROM scope()")
+        return [{"n": len(loads)}]
+
+    assert cache.get_or_load("", "SELECT * FROM hunts()", 60, loader) == [{"n": 1}]
+    assert cache.get_or_load("", "SELECT * FROM hunts()", 60, loader) == [{"n": 2}]
+    assert cache.stats()["stale_loads"] == 2 and cache.stats()["entries"] == 0
+    # Loads that other plugins' mutations do not touch are cached as usual.
+    cache.get_or_load("", "SELECT * FROM clients()", 60, loader)
+    cache.get_or_load("", "SELECT * FROM clients()", 60, loader)
+    assert len(loads) == 3
@@ -0,0 +1,109 @@
+from __future__ import annotations
+
+import dataclasses
+from pathlib import Path
+
+import pytest
+
+from mcp_server import client as client_module
+from mcp_server.catalog import ArtifactCatalog, tokenize
+from mcp_server.config import load_config
+from mcp_server.tools import artifacts
+
+DEFINITIONS = [
+    {
+        "name": "Windows.Forensics.Prefetch",
+        "description": "Parse prefetch files to show program execution.",
+        "type": "CLIENT",
+        "parameters": [{"name": "prefetchGlobs"}],
+        "sources": [{"query": "SELECT * FROM prefetch(filename=OSPath)"}],
+    },
+    {
+        "name": "Windows.Sys.Autoruns",
+        "description": "Startup items and persistence mechanisms.",
+        "type": "CLIENT",
+        "parameters": [{"name": "AutorunsPath"}],
+        "sources": [{"queries": ["SELECT * FROM execve(argv=[AutorunsPath])"]}],
+    },
+    {
+        "name": "Linux.Sys.Users",
+        "description": "List users from /etc/passwd.",
+        "type": "CLIENT",
+        "sources": [
+            {"query": "SELECT * FROM parse_records_with_regex(file='/etc/passwd')"}
+        ],
+    },
+    {
+        "name": "Server.Monitor.Health",
+        "description": "Server health, mentions windows prefetch in passing.",
+        "type": "SERVER_EVENT",
+    },
+]
+
+
+class CatalogFakeClient:
+    def __init__(self):
+        self.definitions = list(DEFINITIONS)
+        self.queries = []
+
+    def query(self, vql_stmt, params=None, **options):
+        self.queries.append(vql_stmt)
+        return iter(self.definitions)
+
+
+@pytest.fixture()
+def cfg(tmp_path: Path):
+    api_cfg = tmp_path / "api.config.yaml"
+    api_cfg.write_text("dummy: true")
+    return load_config(default_path=api_cfg)
+
+
+@pytest.fixture()
+def catalog():
+    return ArtifactCatalog(CatalogFakeClient(), ttl=3600)
+
+
+def test_tokenize_splits_names_and_camel_case():
+    assert tokenize("Windows.Sys.Autoruns") == ["windows", "sys", "autoruns"]
+    assert tokenize("prefetchGlobs") == ["prefetch", "globs"]
+
+
+def test_ranked_search_over_all_fields(catalog):
+    names = [a["name"] for a in catalog.search("windows prefetch")]
+    # Name matches outrank a passing mention in another artifact's description.
+    assert names == ["Windows.Forensics.Prefetch", "Server.Monitor.Health"]
+    # Prefix terms, parameter names and source VQL are indexed too.
+    assert [a["name"] for a in catalog.search("autorun")] == ["Windows.Sys.Autoruns"]
+    assert [a["name"] for a in catalog.search("passwd")] == ["Linux.Sys.Users"]
+    assert catalog.search("execve")[0]["name"] == "Windows.Sys.Autoruns"
+    assert catalog.search("windows nonexistent") == []
+    assert catalog.search("Linux.Sys.Users")[0]["score"] > 100
+    assert [a["name"] for a in catalog.search(None, limit=2)] == [
+        "Linux.Sys.Users",
+        "Server.Monitor.Health",
+    ]
+    assert len(catalog.client.queries) == 1
+
+
+def test_artifact_set_refreshes_index(catalog, cfg):
+    assert catalog.search("custom") == []
+    catalog.client.definitions.append(
+        {"name": "Custom.Triage", "description": "Team triage.", "type": "CLIENT"}
+    )
+    client_module._invalidate_cache(cfg, "SELECT * FROM clients()")
+    assert catalog.search("custom") == []
+    # Any statement calling artifact_set() marks the index stale.
+    client_module._invalidate_cache(
+        cfg, "SELECT artifact_set(artifact='...') AS Uploaded FROM scope()"
+    )
+    assert [a["name"] for a in catalog.search("custom")] == ["Custom.Triage"]
+    assert catalog.stats()["refreshes"] == 2
+
+
+def test_list_artifacts_uses_index(cfg, monkeypatch):
+    cfg = dataclasses.replace(cfg, artifact_catalog_ttl=60.0)
+    catalog = ArtifactCatalog(CatalogFakeClient(), ttl=60.0)
+    monkeypatch.setattr(artifacts, "get_artifact_catalog", lambda _cfg: catalog)
+    out = artifacts.list_artifacts(cfg, search="Prefetch", limit=1)
+    assert [a["name"] for a in out["artifacts"]] == ["Windows.Forensics.Prefetch"]
+    assert set(out["artifacts"][0]) == {"name", "description", "type", "score"}
@@ -0,0 +1,283 @@
+from __future__ import annotations
+
+from pathlib import Path
+from types import SimpleNamespace
+
+import grpc
+import pytest
+
+from mcp_server.client import VelociraptorClient
+from mcp_server.config import load_config
+
+api_pb2 = pytest.importorskip("pyvelociraptor.api_pb2")
+
+
+class StatusError(grpc.RpcError):
+    def __init__(self, code):
+        self._code = code
+
+    def code(self):
+        return self._code
+
+
+class FlakyBufferStub:
+    """Serves VFSGetBuffer ranges from `blob`, failing once at `fail_at` if set."""
+
+    def __init__(
+        self,
+        blob: bytes,
+        fail_at: int | None = None,
+        code: grpc.StatusCode = grpc.StatusCode.ABORTED,
+    ):
+        self.blob = blob
+        self.fail_at = fail_at
+        self.code = code
+        self.requests = []
+        self.org_ids = set()
+
+    def VFSGetBuffer(self, req):
+        self.requests.append((list(req.components), req.offset, req.length))
+        self.org_ids.add(req.org_id)
+        if self.fail_at is not None and req.offset >= self.fail_at:
+            self.fail_at = None
+            raise StatusError(self.code)
+        return SimpleNamespace(data=self.blob[req.offset : req.offset + req.length])
+
+
+class EmptyCall:
+    def __iter__(self):
+        return iter(())
+
+    def cancel(self):
+        pass
+
+
+@pytest.fixture()
+def cfg(tmp_path: Path):
+    api_cfg = tmp_path / "api.config.yaml"
+    api_cfg.write_text("dummy: true")
+    return load_config(default_path=api_cfg)
+
+
+def make_client(cfg, stub) -> VelociraptorClient:
+    client = VelociraptorClient(cfg)
+    client._stub = stub
+    client._api_pb2 = api_pb2
+    return client
+
+
+def test_iter_download_reads_fixed_ranges(cfg):
+    stub = FlakyBufferStub(bytes(range(256)) * 10)
+    client = make_client(cfg, stub)
+    chunks = list(client.iter_download("C.1", "/file/C:/x.bin", chunk_size=1000))
+    assert [len(c) for c in chunks] == [1000, 1000, 560]
+    assert b"".join(chunks) == stub.blob
+    assert stub.requests[0] == (["file", "C:", "x.bin"], 0, 1000)
+
+    assert client.download("C.1", "/file/x", offset=10, length=5) == stub.blob[10:15]
+
+    client._cfg = {"org_id": "O.123"}
+    client.download("C.1", "/file/x", length=5)
+    assert stub.org_ids == {"", "O.123"}
+
+
+def test_download_to_file_retries_and_resumes(cfg, tmp_path: Path, monkeypatch):
+    monkeypatch.setattr("mcp_server.client.time.sleep", lambda _s: None)
+    blob = b"A" * 2500
+    stub = FlakyBufferStub(blob, fail_at=1000)
+    client = make_client(cfg, stub)
+    dest = tmp_path / "out" / "x.bin"
+    out = client.download_to_file("C.1", "/file/x", dest, chunk_size=1000)
+    assert dest.read_bytes() == blob and out["bytes"] == 2500
+    # The retry continued from byte 1000 instead of starting over.
+    assert [r[1] for r in stub.requests] == [0, 1000, 1000, 2000]
+    assert not list(dest.parent.glob("*.part*"))
+
+    # An interrupted download leaves a .part file that the next call continues.
+    stub.fail_at, stub.code = 1000, grpc.StatusCode.PERMISSION_DENIED
+    dest.unlink()
+    with pytest.raises(grpc.RpcError):
+        client.download_to_file("C.1", "/file/x", dest, chunk_size=1000)
+    assert not dest.exists() and stub.fail_at is None
+    out = client.download_to_file("C.1", "/file/x", dest, chunk_size=1000)
+    assert out["resumed_from"] == 1000 and dest.read_bytes() == blob
+
+
+def test_download_to_file_ignores_foreign_partial_files(cfg, tmp_path: Path):
+    blob = bytes(range(256)) * 10
+    stub = FlakyBufferStub(blob, fail_at=1000, code=grpc.StatusCode.NOT_FOUND)
+    client = make_client(cfg, stub)
+    dest = tmp_path / "x.bin"
+    with pytest.raises(grpc.RpcError):
+        client.download_to_file("C.1", "/file/x", dest, chunk_size=1000)
+    # Permanent errors are not retried.
+    assert [r[1] for r in stub.requests] == [0, 1000]
+
+    part = tmp_path / "x.bin.part"
+    part.write_bytes(b"junk" * 250)  # same size, but not what was recorded
+    out = client.download_to_file("C.1", "/file/x", dest, chunk_size=1000)
+    assert out["resumed_from"] == 0 and dest.read_bytes() == blob
+    # A plain file at dest is replaced, never appended to.
+    out = client.download_to_file("C.1", "/file/x", dest, chunk_size=1000)
+    assert out["resumed_from"] == 0 and dest.read_bytes() == blob
+
+
+def test_adaptive_tuner_grows_max_row_and_flags_point_lookups():
+    from mcp_server.client import AdaptiveQueryTuner
+    from mcp_server.config import QueryOptions
+
+    tuner = AdaptiveQueryTuner(max_row_cap=10000)
+    base = QueryOptions(max_row=1000, max_wait=5)
+    assert tuner.tune("bulk", base) == base
+    tuner.observe("bulk", 40000)
+    assert tuner.tune("bulk", base).max_row == 10000
+    tuner.observe("point", 1)
+    assert tuner.tune("point", base) == QueryOptions(max_row=1000, max_wait=1)
+
+
+def test_query_sends_configured_collector_args(cfg):
+    import dataclasses
+
+    from mcp_server.config import QueryOptions
+
+    sent = []
+
+    class RecordingStub:
+        def Query(self, req):
+            sent.append(req)
+            return EmptyCall()
+
+    client = make_client(
+        dataclasses.replace(cfg, query_options=QueryOptions(max_row=50, max_wait=3)),
+        RecordingStub(),
+    )
+    list(client.query("SELECT 1 FROM scope()", options=QueryOptions(timeout=30)))
+    assert (sent[0].max_row, sent[0].max_wait, sent[0].timeout) == (50, 3, 30)
+
+
+def test_query_reconnects_after_unavailable(cfg):
+    import json as jsonlib
+    from concurrent import futures
+
+    api_pb2_grpc = pytest.importorskip("pyvelociraptor.api_pb2_grpc")
+
+    class FlakyServicer(api_pb2_grpc.APIServicer):
+        calls = 0
+
+        def Query(self, request, context):
+            FlakyServicer.calls += 1
+            if FlakyServicer.calls == 1:
+                context.abort(grpc.StatusCode.UNAVAILABLE, "restarting")
+            yield api_pb2.VQLResponse(Response=jsonlib.dumps([{"ok": 1}]))
+
+    server = grpc.server(futures.ThreadPoolExecutor(max_workers=4))
+    api_pb2_grpc.add_APIServicer_to_server(FlakyServicer(), server)
+    port = server.add_insecure_port("127.0.0.1:0")
+    server.start()
+
+    class LocalClient(VelociraptorClient):
+        def _open_channel(self):
+            return grpc.insecure_channel(f"127.0.0.1:{port}")
+
+    try:
+        client = LocalClient(cfg)
+        assert list(client.query("SELECT 1 FROM scope()")) == [{"ok": 1}]
+        assert client.reconnects == 1 and len(client._stubs) == cfg.grpc_pool_size
+        # Mutating statements are never replayed, only the pool is reset.
+        FlakyServicer.calls = 0
+        with pytest.raises(grpc.RpcError):
+            list(client.query("SELECT hunt_delete(hunt_id='H.1') FROM scope()"))
+        assert client.reconnects == 2
+    finally:
+        server.stop(None)
+
+
+def test_failed_stream_replaces_only_its_channel(cfg):
+    import dataclasses
+    import json as jsonlib
+    import threading
+    from concurrent import futures
+
+    api_pb2_grpc = pytest.importorskip("pyvelociraptor.api_pb2_grpc")
+    release = threading.Event()
+
+    class MixedServicer(api_pb2_grpc.APIServicer):
+        failures = 0
+
+        def Query(self, request, context):
+            vql = request.Query[0].VQL
+            if "fail" in vql and MixedServicer.failures == 0:
+                MixedServicer.failures += 1
+                context.abort(grpc.StatusCode.UNAVAILABLE, "connection lost")
+            yield api_pb2.VQLResponse(Response=jsonlib.dumps([{"n": 0}]))
+            if "slow" in vql:
+                release.wait(10)
+                yield api_pb2.VQLResponse(Response=jsonlib.dumps([{"n": 1}]))
+
+    server = grpc.server(futures.ThreadPoolExecutor(max_workers=4))
+    api_pb2_grpc.add_APIServicer_to_server(MixedServicer(), server)
+    port = server.add_insecure_port("127.0.0.1:0")
+    server.start()
+
+    class LocalClient(VelociraptorClient):
+        def _open_channel(self):
+            return grpc.insecure_channel(f"127.0.0.1:{port}")
+
+    try:
+        client = LocalClient(dataclasses.replace(cfg, grpc_pool_size=2))
+        slow = client.query("SELECT 'slow' FROM scope()")
+        assert next(slow) == {"n": 0}
+        first_channel, failing_channel = client._channels
+        # The other slot's stream fails; only that channel is replaced.
+        assert list(client.query("SELECT 'fail' FROM scope()")) == [{"n": 0}]
+        assert client.reconnects == 1
+        assert client._channels[0] is first_channel
+        assert client._channels[1] is not failing_channel
+        # The stream on the untouched channel keeps running to its end.
+        release.set()
+        assert list(slow) == [{"n": 1}]
+
+        # Callers failing on an already replaced stub do not reconnect again.
+        with client._lease() as stub:
+            client._replace_channel(stub)
+            client._replace_channel(stub)
+            assert client.reconnects == 2 and client._retired
+        assert not client._retired and not client._leases
+    finally:
+        release.set()
+        server.stop(None)
+
+
+@pytest.mark.parametrize("decoder", ["json", "orjson"])
+def test_query_decodes_frames_with_configured_decoder(cfg, decoder):
+    import dataclasses
+    import json as jsonlib
+
+    from mcp_server.decoding import DECODERS
+    from mcp_server.utils import normalize_records
+
+    if decoder not in DECODERS:
+        pytest.skip(f"{decoder} not installed")
+
+    frames = [
+        SimpleNamespace(Response=jsonlib.dumps([{"n": 1}, {"n": 2}])),
+        SimpleNamespace(Response=""),
+        SimpleNamespace(Response=jsonlib.dumps([{"n": 3, "nested": {"a": [1]}}])),
+    ]
+
+    class FrameCall:
+        def __iter__(self):
+            return iter(frames)
+
+        def cancel(self):
+            pass
+
+    class FrameStub:
+        def Query(self, req):
+            return FrameCall()
+
+    client = make_client(dataclasses.replace(cfg, json_decoder=decoder), FrameStub())
+    rows = normalize_records(client.query("SELECT * FROM scope()"))
+    assert rows == [{"n": 1}, {"n": 2}, {"n": 3, "nested": {"a": [1]}}]
+    # Plain dict rows are passed through, not copied again.
+    assert normalize_records(rows) is rows
@@ -0,0 +1,92 @@
+from __future__ import annotations
+
+import dataclasses
+from pathlib import Path
+
+import pytest
+
+from mcp_server.config import load_config
+from mcp_server.cursors import CursorStore, get_cursor_store
+from mcp_server.tools import cursors, hunts, vql
+
+
+@pytest.fixture()
+def cfg(tmp_path: Path):
+    api_cfg = tmp_path / "api.config.yaml"
+    api_cfg.write_text("dummy: true")
+    get_cursor_store.cache_clear()
+    cfg = load_config(default_path=api_cfg)
+    return dataclasses.replace(cfg, cursor_dir=str(tmp_path / "cursors"))
+
+
+@pytest.fixture()
+def fake_client(monkeypatch):
+    class FakeClient:
+        def __init__(self):
+            self.queries = []
+            self.closed = False
+
+        def query(self, vql_stmt, params=None, **options):
+            self.queries.append(vql_stmt)
+
+            def rows():
+                try:
+                    for i in range(250):
+                        yield {"ClientId": f"C.{i}", "Row": i}
+                finally:
+                    self.closed = True
+
+            return rows()
+
+    fc = FakeClient()
+    for module in (vql, hunts):
+        monkeypatch.setattr(module, "get_client", lambda _cfg, fc=fc: fc)
+    return fc
+
+
+def test_spilled_query_pages_without_requerying(cfg, fake_client):
+    out = vql.query_vql(cfg, "SELECT * FROM big()", spill=True, page_size=100)
+    assert out["total_rows"] == 250 and len(out["rows"]) == 100
+    assert out["remaining"] == 150 and not out["done"]
+
+    page = cursors.fetch_cursor(cfg, out["cursor_id"], n=200)
+    assert [r["Row"] for r in page["rows"]] == list(range(100, 250))
+    assert page["offset"] == 100 and page["done"]
+    assert len(fake_client.queries) == 1
+
+    with pytest.raises(ValueError):
+        cursors.fetch_cursor(cfg, out["cursor_id"], session="other")
+    assert cursors.close_cursor(cfg, out["cursor_id"]) == {"closed": True}
+    assert not list(Path(cfg.cursor_dir).iterdir())
+
+
+def test_hunt_results_spill_drops_limit(cfg, fake_client):
+    out = hunts.get_hunt_results(cfg, hunt_id="H.1", limit=10, spill=True)
+    assert "LIMIT" not in fake_client.queries[-1]
+    assert out["total_rows"] == 250
+
+
+def test_disk_budget_evicts_then_truncates(tmp_path: Path, fake_client):
+    store = CursorStore(str(tmp_path), max_bytes=4000, ttl=60)
+    rows = lambda n: ({"Row": i, "Pad": "x" * 20} for i in range(n))  # noqa: E731
+    first = store.spill("", rows(80), "q1")
+    assert not first["truncated"]
+    second = store.spill("", rows(80), "q2")
+    # The older cursor made room for the new one.
+    with pytest.raises(ValueError):
+        store.fetch("", first["cursor_id"])
+    assert store.fetch("", second["cursor_id"], 1)["rows"] == [
+        {"Row": 0, "Pad": "x" * 20}
+    ]
+
+    big = store.spill("", rows(1000), "q3")
+    assert big["truncated"] and 0 < big["total_rows"] < 1000
+    assert store.stats()["bytes"] <= 4000
+
+
+def test_cursors_expire(tmp_path: Path):
+    store = CursorStore(str(tmp_path), max_bytes=10_000, ttl=0)
+    out = store.spill("", iter([{"a": 1}]), "q")
+    with pytest.raises(ValueError):
+        store.fetch("", out["cursor_id"])
+    assert store.stats()["cursors"] == 0
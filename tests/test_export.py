@@ -0,0 +1,132 @@
+from __future__ import annotations
+
+import gzip
+import json
+from pathlib import Path
+
+import pytest
+
+from mcp_server.config import load_config
+from mcp_server import export as export_module
+from mcp_server.export import export_rows
+from mcp_server.tools import export
+
+
+def rows(n):
+    for i in range(n):
+        yield {"ClientId": f"C.{i % 3}", "Row": i, "Hash": {"MD5": f"{i:032x}"}}
+
+
+@pytest.fixture()
+def cfg(tmp_path: Path, monkeypatch):
+    api_cfg = tmp_path / "api.config.yaml"
+    api_cfg.write_text("dummy: true")
+    monkeypatch.setenv("MCP_EXPORT_DIR", str(tmp_path))
+    return load_config(default_path=api_cfg)
+
+
+def test_export_hunt_results_to_gzip_jsonl(cfg, tmp_path: Path, monkeypatch):
+    queries = []
+
+    class FakeClient:
+        def query(self, vql_stmt, params=None, **options):
+            queries.append(vql_stmt)
+            return rows(1000)
+
+    monkeypatch.setattr(export, "get_client", lambda _cfg: FakeClient())
+    dest = tmp_path / "out" / "hunt.jsonl.gz"
+    out = export.export_results(cfg, dest_path=str(dest), hunt_id="H.1", artifact="A")
+    assert queries == ["SELECT * FROM hunt_results(hunt_id='H.1', artifact='A')"]
+    assert out["rows"] == 1000 and out["format"] == "jsonl"
+    assert out["bytes"] == dest.stat().st_size
+    assert out["schema"] == {"ClientId": "string", "Row": "integer", "Hash": "object"}
+    with gzip.open(dest, "rt") as fh:
+        lines = fh.read().splitlines()
+    assert json.loads(lines[-1])["Row"] == 999 and len(lines) == 1000
+
+    with pytest.raises(ValueError):
+        export.export_results(cfg, dest_path=str(dest))
+
+
+def test_export_destination_is_confined(cfg, tmp_path: Path, monkeypatch):
+    monkeypatch.setattr(export, "get_client", lambda _cfg: None)
+    existing = tmp_path / "old.jsonl.gz"
+    existing.write_bytes(b"keep")
+    for dest in ["../escaped.jsonl.gz", "/etc/cron.d/x", str(tmp_path), "old.jsonl.gz"]:
+        with pytest.raises(ValueError):
+            export.export_results(cfg, dest_path=dest, hunt_id="H.1")
+    assert existing.read_bytes() == b"keep"
+    monkeypatch.delenv("MCP_EXPORT_DIR")
+    with pytest.raises(ValueError, match="MCP_EXPORT_DIR"):
+        export.export_results(
+            load_config(default_path=tmp_path / "api.config.yaml"),
+            dest_path="new.jsonl.gz",
+            hunt_id="H.1",
+        )
+
+
+def test_export_parquet_in_row_groups(tmp_path: Path):
+    pq = pytest.importorskip("pyarrow.parquet")
+    dest = tmp_path / "rows.parquet"
+    out = export_rows(rows(2500), dest, batch_rows=1000)
+    assert out["rows"] == 2500 and out["format"] == "parquet"
+    meta = pq.ParquetFile(dest).metadata
+    assert meta.num_rows == 2500 and meta.num_row_groups == 3
+    # Nested values are stored as JSON text.
+    assert out["schema"]["Hash"] == "string"
+
+
+def test_export_parquet_widens_schema_across_batches(tmp_path: Path):
+    pq = pytest.importorskip("pyarrow.parquet")
+
+    def drifting():
+        for i in range(30):
+            row = {"Row": i, "Note": None, "Size": i}
+            if i >= 10:
+                row.update(Row=f"r{i}", Note="set", Size=i + 0.5)
+            if i >= 20:
+                row["Extra"] = True
+            yield row
+
+    dest = tmp_path / "drift.parquet"
+    out = export_rows(drifting(), dest, batch_rows=10)
+    assert out["rows"] == 30
+    assert out["schema"] == {
+        "Row": "string",
+        "Note": "string",
+        "Size": "double",
+        "Extra": "bool",
+    }
+    table = pq.read_table(dest)
+    assert table.num_rows == 30
+    assert table.column("Row").to_pylist()[:2] == ["0", "1"]
+    assert table.column("Extra").to_pylist()[0] is None
+    assert not list(tmp_path.glob("*.old"))
+
+
+def test_export_parquet_caps_schema_rewrites(tmp_path: Path, monkeypatch):
+    pytest.importorskip("pyarrow.parquet")
+    monkeypatch.setattr(export_module, "PARQUET_SAMPLE_BATCHES", 2)
+    rewrites = []
+    rewrite = export_module._rewrite_parquet
+    monkeypatch.setattr(
+        export_module,
+        "_rewrite_parquet",
+        lambda *args: rewrites.append(args[3]) or rewrite(*args),
+    )
+
+    def drifting(new_columns):
+        # Two steady batches (the sample), then one new column per batch.
+        for i in range(20 + 10 * new_columns):
+            row = {"Row": i}
+            for n in range(max(0, i // 10 - 1)):
+                row[f"Extra{n}"] = n
+            yield row
+
+    out = export_rows(drifting(2), tmp_path / "ok.parquet", batch_rows=10)
+    assert out["rows"] == 40 and len(rewrites) == 2
+    assert list(out["schema"]) == ["Row", "Extra0", "Extra1"]
+
+    with pytest.raises(ValueError, match="jsonl"):
+        export_rows(drifting(3), tmp_path / "drift.parquet", batch_rows=10)
+    assert not list(tmp_path.glob("drift.parquet*"))
@@ -0,0 +1,164 @@
+from __future__ import annotations
+
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+from mcp_server.config import load_config
+from mcp_server.flows import COMPLETION_VQL, READY_COLUMN, FlowWaiter
+from mcp_server.scheduler import CallContext, QueryCancelled, bind_call
+from mcp_server.tools import artifacts
+
+
+class CompletionStreamClient:
+    """Fake client: flows are RUNNING until `finish()` pushes a completion row."""
+
+    def __init__(self, connect_delay: float = 0.0):
+        self.queries = []
+        self.events = []
+        self.stream_opened = 0
+        self.scheduled = 0
+        self.finished = set()
+        self.connect_delay = connect_delay
+        self.drop = threading.Event()
+        self._rows = []
+        self._cond = threading.Condition()
+
+    def finish(self, client_id, flow_id, state="FINISHED"):
+        with self._cond:
+            self._rows.append(
+                {
+                    "Flow": {
+                        "client_id": client_id,
+                        "session_id": flow_id,
+                        "state": state,
+                    }
+                }
+            )
+            self._cond.notify_all()
+
+    def _stream(self):
+        self.stream_opened += 1
+        time.sleep(self.connect_delay)
+        self.events.append("ready")
+        yield {READY_COLUMN: True}
+        while True:
+            with self._cond:
+                while not self._rows and not self.drop.is_set():
+                    self._cond.wait(0.01)
+                if self.drop.is_set():
+                    self.drop.clear()
+                    raise ConnectionError("stream lost")
+                row = self._rows.pop(0)
+            yield row
+
+    def query(self, vql_stmt, params=None, **options):
+        if vql_stmt == COMPLETION_VQL:
+            return self._stream()
+        self.queries.append(vql_stmt)
+        if "collect_client(" in vql_stmt:
+            self.scheduled += 1
+            return [{"FlowId": f"F.{self.scheduled}"}]
+        if "FROM flows(" in vql_stmt:
+            self.events.append("flows")
+            flow_id = vql_stmt.split("flow_id='")[1].split("'")[0]
+            return [{"state": "FINISHED" if flow_id in self.finished else "RUNNING"}]
+        if "FROM source(" in vql_stmt:
+            return [{"Row": 1}, {"Row": 2}]
+        return []
+
+
+def test_waiters_share_one_completion_stream():
+    client = CompletionStreamClient()
+    waiter = FlowWaiter(client)
+    results = {}
+
+    def wait(flow_id):
+        results[flow_id] = waiter.wait("C.1", flow_id, timeout=5)
+
+    threads = [threading.Thread(target=wait, args=(f"F.{i}",)) for i in range(5)]
+    for t in threads:
+        t.start()
+    while waiter.pending() < 5:
+        threading.Event().wait(0.01)
+    for i in range(5):
+        client.finish("C.1", f"F.{i}")
+    for t in threads:
+        t.join(5)
+
+    assert client.stream_opened == 1
+    assert {k: v["Flow"]["session_id"] for k, v in results.items()} == {
+        f"F.{i}": f"F.{i}" for i in range(5)
+    }
+    assert waiter.wait("C.1", "F.missing", timeout=0.05) is None
+
+
+def test_flow_state_is_checked_only_once_the_stream_is_open():
+    client = CompletionStreamClient(connect_delay=0.2)
+    waiter = FlowWaiter(client)
+    threading.Timer(0.3, client.finish, args=("C.1", "F.1")).start()
+    assert waiter.wait("C.1", "F.1", timeout=5)["Flow"]["session_id"] == "F.1"
+    assert client.events[:2] == ["ready", "flows"]
+
+
+def test_reconnect_rechecks_pending_flows():
+    client = CompletionStreamClient()
+    waiter = FlowWaiter(client, reconnect_delay=0.05)
+    result = {}
+    thread = threading.Thread(
+        target=lambda: result.update(row=waiter.wait("C.1", "F.7", timeout=5))
+    )
+    thread.start()
+    while "flows" not in client.events:
+        time.sleep(0.01)
+    # The flow finishes while the stream is down; its completion row is never seen.
+    client.finished.add("F.7")
+    client.drop.set()
+    thread.join(5)
+    assert result["row"] == {"state": "FINISHED"}
+    assert client.stream_opened == 2
+
+
+def test_wait_follows_the_bound_call():
+    client = CompletionStreamClient()
+    waiter = FlowWaiter(client)
+    call = CallContext(tool="collect_and_wait", deadline=time.monotonic() + 0.2)
+    started = time.monotonic()
+    with bind_call(call):
+        assert waiter.wait("C.1", "F.1", timeout=30) is None
+    assert time.monotonic() - started < 2
+
+    call = CallContext(tool="collect_and_wait")
+    threading.Timer(0.1, call.cancel).start()
+    started = time.monotonic()
+    with bind_call(call), pytest.raises(QueryCancelled):
+        waiter.wait("C.1", "F.2", timeout=30)
+    assert time.monotonic() - started < 2 and waiter.pending() == 0
+
+
+def test_collect_and_wait_returns_flow_results(tmp_path: Path, monkeypatch):
+    api_cfg = tmp_path / "api.config.yaml"
+    api_cfg.write_text("dummy: true")
+    cfg = load_config(default_path=api_cfg)
+
+    client = CompletionStreamClient()
+    waiter = FlowWaiter(client)
+    client.wait_for_flow = waiter.wait
+    monkeypatch.setattr(artifacts, "get_client", lambda _cfg: client)
+
+    threading.Timer(0.1, client.finish, args=("C.1", "F.1")).start()
+    out = artifacts.collect_and_wait(
+        cfg, client_id="C.1", artifact="Generic.Client.Info"
+    )
+    assert out["flow_id"] == "F.1" and out["state"] == "FINISHED"
+    assert out["results"] == [{"Row": 1}, {"Row": 2}]
+    assert (
+        "collect_client(" in client.queries[0]
+        and ".flow_id AS FlowId" in client.queries[0]
+    )
+    assert "source(client_id='C.1', flow_id='F.1'" in client.queries[-1]
+
+    out = artifacts.collect_and_wait(cfg, client_id="C.1", artifact="X", timeout=0.05)
+    assert out["state"] == "TIMEOUT" and out["results"] == []
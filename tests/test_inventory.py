@@ -0,0 +1,136 @@
+from __future__ import annotations
+
+import dataclasses
+import re
+from pathlib import Path
+
+import pytest
+
+from mcp_server.config import load_config
+from mcp_server.inventory import ClientInventory
+from mcp_server.tools import clients
+from mcp_server.utils import column_value
+
+
+class InventoryFakeClient:
+    def __init__(self, rows):
+        self.rows = rows
+        self.queries = []
+
+    def query(self, vql_stmt, params=None):
+        self.queries.append(vql_stmt)
+        if "last_seen_at >" in vql_stmt:
+            watermark = int(vql_stmt.rsplit(">", 1)[1])
+            return [r for r in self.rows if r["last_seen_at"] > watermark]
+        return list(self.rows)
+
+
+def client_row(client_id, hostname, labels=(), last_seen_at=1):
+    return {
+        "client_id": client_id,
+        "os_info": {"hostname": hostname},
+        "labels": list(labels),
+        "last_seen_at": last_seen_at,
+    }
+
+
+@pytest.fixture()
+def cfg(tmp_path: Path):
+    api_cfg = tmp_path / "api.config.yaml"
+    api_cfg.write_text("dummy: true")
+    return dataclasses.replace(
+        load_config(default_path=api_cfg), client_inventory_ttl=60.0
+    )
+
+
+@pytest.fixture()
+def inventory(cfg, monkeypatch):
+    fake = InventoryFakeClient(
+        [
+            client_row("C.1", "web01", ["prod"], 10),
+            client_row("C.2", "web02", ["dev"], 20),
+            client_row("C.3", "db01", ["prod"], 30),
+        ]
+    )
+    inv = ClientInventory(fake, ttl=0)
+    monkeypatch.setattr(clients, "get_inventory", lambda _cfg: inv)
+    return inv
+
+
+def test_inventory_incremental_refresh(inventory):
+    fake = inventory.client
+    assert inventory.get("C.2")["os_info"]["hostname"] == "web02"
+    fake.rows.append(client_row("C.4", "web03", ["prod"], 40))
+    assert inventory.refresh() == 1
+    assert fake.queries[-1] == "SELECT * FROM clients() WHERE last_seen_at > 30"
+    assert [r["client_id"] for r in inventory.by_label("PROD")] == ["C.1", "C.3", "C.4"]
+    stats = inventory.stats()
+    assert stats["clients"] == 4 and stats["incremental_refreshes"] == 1
+    assert stats["hit_rate"] == 1.0
+
+
+def test_client_tools_served_from_inventory(cfg, inventory):
+    queries_before = len(inventory.client.queries)
+    out = clients.search_clients(cfg, hostname="web*", label="prod")
+    assert [r["client_id"] for r in out["clients"]] == ["C.1"]
+    page = clients.list_clients(cfg, limit=2)
+    assert [r["client_id"] for r in page["clients"]] == ["C.1", "C.2"]
+    page = clients.list_clients(cfg, limit=2, cursor=page["next_cursor"])
+    assert [r["client_id"] for r in page["clients"]] == ["C.3"]
+    assert clients.get_client_info(cfg, "C.3")["client"][0]["client_id"] == "C.3"
+    # Only the initial full load reached the server.
+    assert len(inventory.client.queries) - queries_before <= 1
+
+
+class VQLFakeClient:
+    """Evaluates the `col =~ 'regex'` WHERE clauses search_clients builds."""
+
+    def __init__(self, rows):
+        self.rows = rows
+
+    def query(self, vql_stmt, params=None, **options):
+        select = re.match(r"SELECT (.+?) FROM", vql_stmt).group(1)
+        where = re.search(r" WHERE (.+?) ORDER BY", vql_stmt)
+        out = []
+        for row in self.rows:
+            predicates = where.group(1).split(" AND ") if where else []
+            if all(self._matches(row, p) for p in predicates):
+                out.append(row)
+        if select == "*":
+            return out
+        columns = select.split(", ")
+        return [{c: column_value(r, c) for c in columns} for r in out]
+
+    @staticmethod
+    def _matches(row, predicate):
+        column, _, regex = predicate.partition(" =~ ")
+        value = column_value(row, column)
+        items = value if isinstance(value, list) else [value]
+        pattern = re.compile(regex[1:-1].replace("''", "'"), re.IGNORECASE)
+        return any(isinstance(item, str) and pattern.search(item) for item in items)
+
+
+def test_inventory_and_vql_searches_agree(cfg, inventory, monkeypatch):
+    rows = inventory.client.rows
+    monkeypatch.setattr(clients, "get_client", lambda _cfg: VQLFakeClient(rows))
+    vql_cfg = dataclasses.replace(cfg, client_inventory_ttl=0.0)
+    columns = ["client_id", "os_info.hostname"]
+    for hostname, label in [
+        ("WEB", None),
+        ("^web01$", None),
+        ("web*", "PROD"),
+        ("0[12]$", None),
+        (None, "^prod$"),
+        ("db", "prod|dev"),
+    ]:
+        local, remote = (
+            clients.search_clients(c, hostname=hostname, label=label, columns=columns)
+            for c in (cfg, vql_cfg)
+        )
+        assert local == remote and local["clients"], (hostname, label)
+        assert all(r["os_info.hostname"] for r in local["clients"])
+    assert clients.get_client_info(cfg, "C.1", columns=columns)["client"] == [
+        {"client_id": "C.1", "os_info.hostname": "web01"}
+    ]
+    with pytest.raises(ValueError, match="Invalid pattern"):
+        clients.search_clients(cfg, hostname="web[")
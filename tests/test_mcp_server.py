@@ -27,3 +27,23 @@ def test_build_server_initializes(tmp_path: Path):
 
     mcp = server.build_server(cfg)
     assert hasattr(mcp, "run")
+
+
+def test_load_config_query_options_from_env(tmp_path: Path, monkeypatch):
+    api_cfg = tmp_path / "api.config.yaml"
+    api_cfg.write_text("dummy: true")
+    monkeypatch.setenv("MCP_QUERY_MAX_ROW", "2000")
+    monkeypatch.setenv("MCP_TOOL_QUERY_OPTIONS", "get_hunt_results.max_row=20000")
+    cfg = load_config(default_path=api_cfg)
+    assert cfg.query_options_for("list_hunts").max_row == 2000
+    hunt_opts = cfg.query_options_for("get_hunt_results")
+    assert hunt_opts.max_row == 20000 and hunt_opts.max_wait == 2
+
+    monkeypatch.setenv("MCP_TOOL_QUERY_OPTIONS", "bogus")
+    with pytest.raises(ConfigError):
+        load_config(default_path=api_cfg)
+
+    monkeypatch.delenv("MCP_TOOL_QUERY_OPTIONS")
+    monkeypatch.setenv("MCP_JSON_DECODER", "simdjson")
+    with pytest.raises(ConfigError):
+        load_config(default_path=api_cfg)
@@ -0,0 +1,89 @@
+from __future__ import annotations
+
+import asyncio
+import json
+from pathlib import Path
+
+import pytest
+
+from mcp_server import server, tools
+from mcp_server.config import load_config
+from mcp_server.metrics import Metrics, result_bytes, result_rows
+from mcp_server.tools import hunts
+
+
+@pytest.fixture()
+def cfg(tmp_path: Path):
+    api_cfg = tmp_path / "api.config.yaml"
+    api_cfg.write_text("dummy: true")
+    return load_config(default_path=api_cfg)
+
+
+def test_quantiles_and_prometheus_text():
+    metrics = Metrics()
+    for ms in range(1, 101):
+        metrics.observe("grpc:Query", ms / 1000, rows=10, bytes=100)
+    metrics.observe("grpc:Query", 0.2, error="UNAVAILABLE")
+
+    op = metrics.snapshot()["operations"]["grpc:Query"]
+    assert op["calls"] == 101 and op["rows"] == 1000 and op["bytes"] == 10000
+    assert op["errors"] == {"UNAVAILABLE": 1}
+    assert 40 <= op["p50_ms"] <= 60
+    assert 90 <= op["p95_ms"] <= 100 and op["p99_ms"] <= 250
+
+    text = metrics.prometheus()
+    assert 'velociraptor_mcp_calls_total{kind="grpc",op="Query"} 101' in text
+    assert 'code="UNAVAILABLE"} 1' in text
+    assert (
+        'velociraptor_mcp_latency_seconds_bucket{kind="grpc",op="Query",le="+Inf"} 101'
+        in text
+    )
+
+
+def test_result_rows_reads_response_dicts():
+    assert result_rows({"hunts": [1, 2], "next_cursor": None}) == 2
+    assert result_rows({"rows": {"columns": ["a"], "rows": [[1], [2], [3]]}}) == 3
+    assert result_rows({"results": [1], "files": [1, 2]}) == 1
+    assert result_rows({"items": []}) == 0 and result_rows({"a": [1], "b": [2]}) == 0
+
+
+def test_result_bytes_estimates_without_serializing():
+    page = {"rows": [{"ClientId": f"C.{i:04d}", "Size": 4096} for i in range(5000)]}
+    exact = len(json.dumps(page, separators=(",", ":")))
+    assert abs(result_bytes(page) - exact) <= exact // 100
+    blob = {"data_base64": "A" * (4 << 20), "length": 3 << 20}
+    assert result_bytes(blob) == len(json.dumps(blob, separators=(",", ":")))
+
+
+def test_tool_calls_are_recorded(cfg, monkeypatch):
+    class FakeClient:
+        def query(self, vql_stmt, params=None, **options):
+            return iter([{"HuntId": "H.1"}, {"HuntId": "H.2"}])
+
+    def failing_stop_hunt(_cfg, hunt_id):
+        raise ValueError("boom")
+
+    monkeypatch.setattr(hunts, "get_client", lambda _cfg: FakeClient())
+    monkeypatch.setattr(tools, "stop_hunt", failing_stop_hunt)
+    mcp = server.build_server(cfg)
+    metrics = server.get_metrics(cfg)
+
+    async def scenario():
+        listed = {t.name: t for t in await mcp.list_tools()}
+        # The wrapper must keep the schema FastMCP derives from the handler.
+        assert "ctx" not in listed["query_vql"].inputSchema["properties"]
+        assert "limit" in listed["list_hunts"].inputSchema["properties"]
+        await mcp.call_tool("list_hunts", {"limit": 5})
+        with pytest.raises(Exception):
+            await mcp.call_tool("stop_hunt", {"hunt_id": "H.1"})
+        return await mcp.read_resource("resource://metrics/prometheus")
+
+    prometheus = asyncio.run(scenario())
+    ops = metrics.snapshot()["operations"]
+    assert ops["tool:list_hunts"]["calls"] == 1 and ops["tool:list_hunts"]["rows"] == 2
+    payload = {"hunts": [{"HuntId": "H.1"}, {"HuntId": "H.2"}]}
+    assert ops["tool:list_hunts"]["bytes"] == len(
+        json.dumps(payload, separators=(",", ":"))
+    )
+    assert ops["tool:stop_hunt"]["errors"] == {"ValueError": 1}
+    assert 'op="list_hunts"' in list(prometheus)[0].content
@@ -0,0 +1,150 @@
+from __future__ import annotations
+
+import re
+from pathlib import Path
+
+import pytest
+
+from mcp_server.config import load_config
+from mcp_server.polling import WatermarkStore, get_watermarks
+from mcp_server.tools import hunts
+
+
+class FakeHunt:
+    """A hunt whose flows gain rows between polls; answers query_many only."""
+
+    def __init__(self):
+        self.state = "RUNNING"
+        self.flows = {}  # flow_id -> [client_id, state, rows, active_time]
+        self.statements = []
+        self.clock = 1000
+
+    def add(self, client_id, flow_id, n, state="RUNNING"):
+        self.clock += 1
+        flow = self.flows.setdefault(flow_id, [client_id, state, [], 0])
+        flow[1] = state
+        flow[3] = self.clock
+        start = len(flow[2])
+        flow[2].extend({"ClientId": client_id, "Row": start + i} for i in range(n))
+
+    @staticmethod
+    def _moved(vql, flow_id, rows, active_time):
+        # WHERE TotalRows > 0 [AND (ActiveTime >= N [OR FlowId IN ('F.1', ...)])]
+        since = re.search(r"ActiveTime >= (\d+)", vql)
+        listed = re.search(r"FlowId IN \(([^)]*)\)", vql)
+        return bool(rows) and (
+            not since
+            or active_time >= int(since.group(1))
+            or bool(listed and f"'{flow_id}'" in listed.group(1))
+        )
+
+    def query_many(self, queries, options=None):
+        out = {}
+        for name, vql in queries.items():
+            self.statements.append(vql)
+            if "FROM hunts(" in vql:
+                out[name] = [
+                    {
+                        "state": self.state,
+                        "stats": {"total_clients_scheduled": 2},
+                        "artifacts": ["Custom.Art"],
+                    }
+                ]
+            elif "count() AS Flows" in vql:
+                running = [
+                    s not in hunts.FLOW_FINAL_STATES
+                    for _, s, _, _ in self.flows.values()
+                ]
+                out[name] = [{"Flows": len(running), "Running": sum(running)}]
+            elif "hunt_flows(" in vql:
+                out[name] = [
+                    {
+                        "ClientId": c,
+                        "FlowId": f,
+                        "State": s,
+                        "TotalRows": len(rows),
+                        "ActiveTime": active,
+                    }
+                    for f, (c, s, rows, active) in self.flows.items()
+                    if self._moved(vql, f, rows, active)
+                ]
+            else:
+                flow_id = re.search(r"flow_id='([^']+)'", vql).group(1)
+                start = int(re.search(r"start_row=(\d+)", vql).group(1))
+                limit = int(re.search(r"LIMIT (\d+)", vql).group(1))
+                out[name] = self.flows[flow_id][2][start : start + limit]
+        self.returned = out
+        return out
+
+
+@pytest.fixture()
+def cfg(tmp_path: Path):
+    api_cfg = tmp_path / "api.config.yaml"
+    api_cfg.write_text("dummy: true")
+    get_watermarks.cache_clear()
+    return load_config(default_path=api_cfg)
+
+
+@pytest.fixture()
+def hunt(monkeypatch):
+    fake = FakeHunt()
+    monkeypatch.setattr(hunts, "get_client", lambda _cfg: fake)
+    return fake
+
+
+def poll(cfg, **kwargs):
+    return hunts.get_hunt_results(cfg, "H.1", incremental=True, session="s1", **kwargs)
+
+
+def test_polls_return_only_new_rows(cfg, hunt):
+    hunt.add("C.1", "F.1", 3)
+    first = poll(cfg)
+    assert [r["Row"] for r in first["results"]] == [0, 1, 2]
+    assert not first["more"] and not first["done"]
+
+    # Nothing new: no source() reads and the cursor stays put.
+    hunt.statements.clear()
+    idle = poll(cfg)
+    assert idle["results"] == [] and idle["cursor"] == first["cursor"]
+    assert not any("source(" in s for s in hunt.statements)
+    # Fully read flows are not listed in the query; only the active_time mark is.
+    flows_vql = next(s for s in hunt.statements if "TotalRows >" in s)
+    assert "ActiveTime >= 1001" in flows_vql and "FlowId IN" not in flows_vql
+    assert idle["flows"] == 1
+
+    hunt.add("C.1", "F.1", 2, state="FINISHED")
+    hunt.add("C.2", "F.2", 4)
+    hunt.statements.clear()
+    second = poll(cfg, limit=4)
+    assert len(second["results"]) == 4 and second["more"]
+    assert second["cursor"] > first["cursor"]
+    assert "start_row=3" in next(s for s in hunt.statements if "flow_id='F.1'" in s)
+
+    hunt.add("C.2", "F.2", 0, state="FINISHED")
+    hunt.state = "STOPPED"
+    hunt.statements.clear()
+    third = poll(cfg)
+    # F.2 still has rows left, so it is listed by id.
+    assert "FlowId IN ('F.2')" in next(s for s in hunt.statements if "TotalRows >" in s)
+    assert len(third["results"]) == 2 and not third["more"] and third["done"]
+    rows = first["results"] + second["results"] + third["results"]
+    assert sorted((r["ClientId"], r["Row"]) for r in rows) == sorted(
+        [("C.1", i) for i in range(5)] + [("C.2", i) for i in range(4)]
+    )
+
+    # Replaying an earlier cursor returns the same rows again; 0 starts over.
+    assert poll(cfg, cursor=second["cursor"])["results"] == third["results"]
+    assert len(poll(cfg, cursor=0)["results"]) == 9
+    # Other sessions have their own watermark.
+    other = hunts.get_hunt_results(cfg, "H.1", incremental=True, session="s2")
+    assert len(other["results"]) == 9
+
+
+def test_unknown_cursor_is_rejected():
+    store = WatermarkStore(history=2)
+    key = ("s", "H.1", "")
+    cursors = [store.commit(key, 0, {"F.1": (n, n)}, n) for n in (1, 2, 3)]
+    assert cursors == sorted(cursors)
+    with pytest.raises(ValueError):
+        store.begin(key, cursors[0])
+    assert store.begin(key, None) == (cursors[-1], {"F.1": (3, 3)})
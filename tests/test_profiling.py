@@ -0,0 +1,80 @@
+from __future__ import annotations
+
+import logging
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+from mcp_server.client import VelociraptorClient
+from mcp_server.config import load_config
+from mcp_server.profiling import QueryProfiler
+
+api_pb2 = pytest.importorskip("pyvelociraptor.api_pb2")
+
+
+class FramesCall:
+    def __init__(self, frames, delay=0.0):
+        self.frames = frames
+        self.delay = delay
+
+    def __iter__(self):
+        for frame in self.frames:
+            time.sleep(self.delay)
+            yield SimpleNamespace(Response=frame)
+
+    def cancel(self):
+        pass
+
+
+class FramesStub:
+    def __init__(self, frames, delay=0.0):
+        self.frames = frames
+        self.delay = delay
+
+    def Query(self, req):
+        return FramesCall(self.frames, self.delay)
+
+
+@pytest.fixture()
+def cfg(tmp_path: Path, monkeypatch):
+    api_cfg = tmp_path / "api.config.yaml"
+    api_cfg.write_text("dummy: true")
+    monkeypatch.setenv("MCP_SLOW_QUERY_SECONDS", "0.05")
+    return load_config(default_path=api_cfg)
+
+
+def test_query_profiles_grouped_by_shape(cfg, caplog):
+    client = VelociraptorClient(cfg)
+    client._stub = FramesStub(['[{"a": 1}, {"a": 2}]', '[{"a": 3}]'], delay=0.03)
+    client._api_pb2 = api_pb2
+    client.profiler = QueryProfiler(100, cfg.slow_query_seconds)
+
+    with caplog.at_level(logging.WARNING, logger="mcp_server.profiling"):
+        for client_id in ("C.1", "C.2"):
+            list(client.query(f"SELECT * FROM flows(client_id='{client_id}') LIMIT 10"))
+    client._stub = FramesStub(['[{"b": 1}]'])
+    list(client.query("SELECT * FROM info()"))
+
+    report = client.profiler.top(5)
+    assert report["profiled"] == 3 and report["slow_total"] == 2
+    top = report["shapes"][0]
+    assert top["shape"] == "SELECT * FROM flows(client_id=?) LIMIT ?"
+    assert top["count"] == 2 and top["slow"] == 2
+    assert top["frames"] == 4 and top["rows"] == 6
+    assert 0.02 < top["avg_first_row_seconds"] < top["avg_seconds"]
+    assert report["shapes"][1]["shape"] == "SELECT * FROM info()"
+    assert "slow query" in caplog.text and "client_id='C.2'" in caplog.text
+
+
+def test_ring_buffer_is_bounded_and_skips_event_queries():
+    profiler = QueryProfiler(2, 0)
+    for vql in ("SELECT 1", "SELECT 2", "SELECT 3"):
+        with profiler.profile(vql) as profile:
+            profile.frame(1, 10)
+    with profiler.profile("SELECT * FROM watch_monitoring(artifact='X')"):
+        pass
+    report = profiler.top()
+    assert report["profiled"] == 2 and report["slow_total"] == 0
+    assert report["shapes"][0]["count"] == 2
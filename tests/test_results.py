@@ -0,0 +1,146 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+from mcp_server.config import load_config
+from mcp_server import results as results_module
+from mcp_server.results import ResultStore, get_result_store, to_frame
+from mcp_server.tools import results
+
+HUNT_ROWS = [
+    {"ClientId": "C.1", "Name": "a.exe", "Size": 10},
+    {"ClientId": "C.2", "Name": "b.dll", "Size": 5000},
+    {"ClientId": "C.2", "Name": "c.exe", "Size": 2500},
+]
+CLIENT_ROWS = [
+    {"client_id": "C.1", "os_info": {"hostname": "web01", "system": "linux"}},
+    {"client_id": "C.2", "os_info": {"hostname": "db01", "system": "windows"}},
+]
+
+
+@pytest.fixture()
+def cfg(tmp_path: Path):
+    api_cfg = tmp_path / "api.config.yaml"
+    api_cfg.write_text("dummy: true")
+    get_result_store.cache_clear()
+    return load_config(default_path=api_cfg)
+
+
+@pytest.fixture()
+def fake_client(monkeypatch):
+    class FakeClient:
+        def __init__(self):
+            self.queries = []
+
+        def query(self, vql_stmt, params=None, **options):
+            self.queries.append(vql_stmt)
+            return iter(CLIENT_ROWS if "clients()" in vql_stmt else HUNT_ROWS)
+
+    fc = FakeClient()
+    monkeypatch.setattr(results, "get_client", lambda _cfg: fc)
+    return fc
+
+
+def test_filter_sort_join_run_locally(cfg, fake_client):
+    hunt = results.store_query_results(cfg, "SELECT * FROM hunt_results()", limit=1)
+    assert hunt["total_rows"] == 3 and len(hunt["rows"]) == 1
+    hosts = results.store_query_results(cfg, "SELECT * FROM clients()")
+    assert "os_info.hostname" in hosts["columns"]
+
+    big = results.filter_results(cfg, hunt["handle"], "Size > 1000")
+    assert [r["Name"] for r in big["rows"]] == ["b.dll", "c.exe"]
+    ordered = results.sort_results(cfg, big["handle"], by=["Size"])
+    assert [r["Size"] for r in ordered["rows"]] == [2500, 5000]
+
+    joined = results.join_results(
+        cfg,
+        ordered["handle"],
+        hosts["handle"],
+        left_on=["ClientId"],
+        right_on=["client_id"],
+    )
+    assert [r["os_info.hostname"] for r in joined["rows"]] == ["db01", "db01"]
+
+    described = results.describe_results(cfg, hunt["handle"])
+    assert described["rows"] == 3 and described["nulls"]["Size"] == 0
+    # Every re-slice above ran on the stored frames, not on the server.
+    assert len(fake_client.queries) == 2
+
+    with pytest.raises(ValueError):
+        results.sort_results(cfg, hunt["handle"], by=["Missing"])
+    with pytest.raises(ValueError):
+        results.filter_results(cfg, hunt["handle"], "Size >")
+
+
+def test_filter_grammar_is_restricted(cfg, fake_client, tmp_path):
+    hunt = results.store_query_results(cfg, "SELECT * FROM hunt_results()")
+    hosts = results.store_query_results(cfg, "SELECT * FROM clients()")
+
+    def names(expr, handle=hunt["handle"]):
+        rows = results.filter_results(cfg, handle, expr)["rows"]
+        return [r.get("Name") or r.get("client_id") for r in rows]
+
+    assert names("Size >= 2500 and not Name == 'c.exe'") == ["b.dll"]
+    assert names("ClientId in ['C.1'] or 100 < Size < 3000") == ["a.exe", "c.exe"]
+    assert names("Name not in ('a.exe', 'b.dll') and Size != -1") == ["c.exe"]
+    assert names("`os_info.hostname` == 'web01'", hosts["handle"]) == ["C.1"]
+
+    target = tmp_path / "pwn.csv"
+    for expr in (
+        f"a.to_csv('{target}')",
+        "Size.max() > 0",
+        "@frame",
+        "Size > @limit",
+        "__import__('os')",
+        "Name[0] == 'a'",
+        "Size + 1 > 0",
+        "Missing > 1",
+        "lambda: 1",
+    ):
+        with pytest.raises(ValueError):
+            results.filter_results(cfg, hunt["handle"], expr)
+    assert not target.exists()
+
+
+def test_handles_are_session_scoped(cfg, fake_client):
+    out = results.store_query_results(cfg, "SELECT 1", session="s1")
+    with pytest.raises(ValueError):
+        results.describe_results(cfg, out["handle"], session="s2")
+    assert results.drop_results(cfg, out["handle"], session="s1") == {"dropped": True}
+    with pytest.raises(ValueError):
+        results.describe_results(cfg, out["handle"], session="s1")
+
+
+def test_to_frame_stops_reading_at_the_budget(monkeypatch):
+    monkeypatch.setattr(results_module, "FRAME_CHUNK_ROWS", 10)
+    read = []
+
+    def rows():
+        for i in range(20000):
+            read.append(i)
+            yield {"Row": i, "Data": "x" * 100}
+
+    with pytest.raises(ValueError, match="budget"):
+        to_frame(rows(), max_bytes=5000)
+    assert len(read) < 100
+    assert len(to_frame(rows(), max_bytes=0).index) == 20000
+    assert to_frame(iter([])).empty
+
+
+def test_result_store_evicts_least_recently_used():
+    frame = pd.DataFrame(HUNT_ROWS)
+    store = ResultStore(max_bytes=10 * 1024 * 1024, max_handles=2)
+    first = store.put("", frame, "q1")
+    second = store.put("", frame, "q2")
+    store.get("", first)
+    store.put("", frame, "q3")
+    assert store.get("", first) is frame
+    with pytest.raises(ValueError):
+        store.get("", second)
+    assert store.stats()["evictions"] == 1
+
+    with pytest.raises(ValueError):
+        ResultStore(max_bytes=10, max_handles=2).put("", frame, "too big")
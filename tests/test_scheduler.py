@@ -0,0 +1,157 @@
+from __future__ import annotations
+
+import asyncio
+import dataclasses
+import threading
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+import grpc
+import pytest
+
+from mcp_server import server
+from mcp_server.client import VelociraptorClient
+from mcp_server.config import load_config
+from mcp_server.scheduler import (
+    CallContext,
+    QueryDeadlineExceeded,
+    QueryScheduler,
+    bind_call,
+    current_call,
+)
+
+api_pb2 = pytest.importorskip("pyvelociraptor.api_pb2")
+
+
+@pytest.fixture()
+def cfg(tmp_path: Path):
+    api_cfg = tmp_path / "api.config.yaml"
+    api_cfg.write_text("dummy: true")
+    return load_config(default_path=api_cfg)
+
+
+def hold(scheduler, call, started, release, order=None):
+    def run():
+        with scheduler.slot("SELECT 1", call):
+            if order is not None:
+                order.append(call.priority)
+            started.set()
+            release.wait(5)
+
+    thread = threading.Thread(target=run)
+    thread.start()
+    return thread
+
+
+def test_interactive_runs_before_queued_bulk():
+    scheduler = QueryScheduler(max_concurrent=1, per_session=4, max_bulk=1)
+    release, order = threading.Event(), []
+    first = threading.Event()
+    threads = [hold(scheduler, CallContext(priority="normal"), first, release)]
+    first.wait(5)
+    for priority in ("bulk", "interactive"):
+        threads.append(
+            hold(
+                scheduler,
+                CallContext(priority=priority),
+                threading.Event(),
+                release,
+                order,
+            )
+        )
+        while scheduler.stats()["waiting"] < len(threads) - 1:
+            time.sleep(0.01)
+    release.set()
+    for t in threads:
+        t.join(5)
+    assert order == ["interactive", "bulk"]
+    assert scheduler.stats()["running"] == 0
+
+
+def test_bulk_cap_leaves_room_and_queue_wait_hits_deadline():
+    scheduler = QueryScheduler(max_concurrent=2, per_session=4, max_bulk=1)
+    release, started = threading.Event(), threading.Event()
+    busy = hold(scheduler, CallContext(priority="bulk"), started, release)
+    started.wait(5)
+    with scheduler.slot("SELECT 1", CallContext(priority="interactive")):
+        assert scheduler.stats()["running"] == 2
+    with pytest.raises(QueryDeadlineExceeded):
+        deadline = time.monotonic() + 0.05
+        with scheduler.slot(
+            "SELECT 1", CallContext(priority="bulk", deadline=deadline)
+        ):
+            pass
+    # Event streams are never queued.
+    with scheduler.slot("SELECT * FROM watch_monitoring(artifact='X')", None):
+        pass
+    release.set()
+    busy.join(5)
+    assert scheduler.stats()["timeouts"] == 1
+
+
+class BlockingCall:
+    """A Query stream that produces nothing until it is cancelled."""
+
+    def __init__(self):
+        self.cancelled = threading.Event()
+        self.kwargs = None
+
+    def __iter__(self):
+        self.cancelled.wait(5)
+        raise grpc.RpcError("cancelled")
+
+    def cancel(self):
+        self.cancelled.set()
+
+
+def test_mcp_cancellation_cancels_grpc_call(cfg):
+    call = BlockingCall()
+
+    class Stub:
+        def Query(self, req, **kwargs):
+            call.kwargs = kwargs
+            return call
+
+    client = VelociraptorClient(cfg)
+    client._stub = Stub()
+    client._api_pb2 = api_pb2
+
+    async def handler():
+        return await asyncio.to_thread(
+            lambda: list(client.query("SELECT * FROM clients()"))
+        )
+
+    mcp = SimpleNamespace(get_context=lambda: None)
+    wrapped = server.scheduled(cfg, mcp, handler)
+
+    async def scenario():
+        task = asyncio.create_task(wrapped())
+        await asyncio.sleep(0.1)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(scenario())
+    assert call.cancelled.wait(2)
+    # The tool call's deadline is passed to gRPC.
+    assert 0 < call.kwargs["timeout"] <= cfg.query_deadline_seconds
+
+
+def test_bulk_and_streaming_tools_have_their_own_deadline(cfg):
+    assert cfg.query_deadline("get_client_info") == cfg.query_deadline_seconds == 600
+    for tool in ("export_results", "download_files", "query_vql", "download_file"):
+        assert cfg.query_deadline(tool) == cfg.bulk_query_deadline_seconds == 0
+    cfg = dataclasses.replace(cfg, bulk_query_deadline_seconds=3600)
+    assert cfg.query_deadline("store_query_results") == 3600
+
+
+def test_bound_call_reaches_worker_threads():
+    seen = []
+
+    async def scenario():
+        with bind_call(CallContext(tool="get_client_info", priority="interactive")):
+            await asyncio.to_thread(lambda: seen.append(current_call()))
+
+    asyncio.run(scenario())
+    assert seen[0].tool == "get_client_info"
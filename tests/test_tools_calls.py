@@ -1,5 +1,7 @@
 from __future__ import annotations
 
+import dataclasses
+import re
 from pathlib import Path
 
 import pytest
@@ -22,7 +24,7 @@ def fake_client(monkeypatch):
             self.queries = []
             self.downloads = []
 
-        def query(self, vql_stmt, params=None):
+        def query(self, vql_stmt, params=None, **options):
             self.queries.append((vql_stmt, params))
             return [{"ok": True}]
 
@@ -30,6 +32,10 @@ def fake_client(monkeypatch):
             self.downloads.append((client_id, path, offset, length))
             return b"data"
 
+        def download_to_file(self, client_id, path, dest, offset=0, length=0):
+            self.downloads.append((client_id, path, offset, length))
+            return {"dest": str(dest), "bytes": 4, "resumed_from": 0}
+
     fc = FakeClient()
     # Replace get_client in each tool module so every call uses the shared fake.
     for module in (vql, clients, hunts, artifacts, files):
@@ -47,7 +53,24 @@ def test_query_vql_passes_through(cfg, fake_client):
 def test_list_clients_builds_vql(cfg, fake_client):
     clients.list_clients(cfg, limit=10, offset=5)
     stmt, _ = fake_client.queries[-1]
-    assert stmt.strip() == "SELECT * FROM clients()"
+    assert stmt.strip() == "SELECT * FROM clients() ORDER BY client_id LIMIT 15"
+
+
+def test_list_clients_cursor_pages_by_client_id(cfg, fake_client):
+    fake_client.query = lambda vql_stmt, params=None, **options: (
+        fake_client.queries.append((vql_stmt, params))
+        or iter([{"client_id": "C.1"}, {"client_id": "C.2"}, {"client_id": "C.3"}])
+    )
+    first = clients.list_clients(cfg, limit=2)
+    assert [r["client_id"] for r in first["clients"]] == ["C.1", "C.2"]
+    assert first["next_cursor"]
+
+    clients.list_clients(cfg, limit=2, cursor=first["next_cursor"])
+    stmt, _ = fake_client.queries[-1]
+    assert "WHERE client_id > 'C.2'" in stmt and stmt.endswith("LIMIT 2")
+
+    with pytest.raises(ValueError):
+        clients.list_clients(cfg, cursor="not-a-cursor")
 
 
 def test_get_client_info_uses_id(cfg, fake_client):
@@ -58,15 +81,89 @@ def test_get_client_info_uses_id(cfg, fake_client):
 
 def test_search_clients_combines_predicates(cfg, fake_client):
     clients.search_clients(
-        cfg, hostname="host", label="prod", query="OS = 'linux'", limit=50
+        cfg, hostname="host[0-9]+", label="prod|dev", query="OS = 'linux'", limit=50
     )
     stmt, _ = fake_client.queries[-1]
-    assert "Hostname =~ 'host'" in stmt
-    assert "Labels =~ 'prod'" in stmt
+    assert "os_info.hostname =~ 'host[0-9]+'" in stmt
+    assert "labels =~ 'prod|dev'" in stmt
     assert "OS = 'linux'" in stmt
     assert stmt.strip().startswith("SELECT * FROM clients() WHERE")
 
 
+def test_search_clients_uses_client_index(cfg, fake_client):
+    clients.search_clients(cfg, hostname="^web01.corp.local$")
+    stmt, _ = fake_client.queries[-1]
+    assert stmt.startswith("SELECT * FROM clients(search='host:web01.corp.local')")
+
+    clients.search_clients(cfg, hostname="^web", label="^prod$")
+    stmt, _ = fake_client.queries[-1]
+    assert "clients(search='host:web*')" in stmt
+    assert "labels =~ '(?i)^prod$'" in stmt
+
+    # A bare literal stays a substring match over a scan.
+    clients.search_clients(cfg, hostname="web")
+    stmt, _ = fake_client.queries[-1]
+    assert stmt.startswith("SELECT * FROM clients() WHERE os_info.hostname =~ 'web'")
+
+    clients.search_clients(cfg, hostname="w.+", label="prod*")
+    stmt, _ = fake_client.queries[-1]
+    assert "clients(search='label:prod*')" in stmt
+    assert "os_info.hostname =~ 'w.+'" in stmt
+
+
+def _vql_regex_filter(rows, predicates):
+    """
+    Apply `column =~ 'regex'` predicates the way VQL does: case-insensitively, with
+    lists matching when any item does.
+    """
+    out = []
+    for row in rows:
+        keep = True
+        for predicate in predicates:
+            column, _, regex = predicate.partition(" =~ ")
+            value = row
+            for part in column.split("."):
+                value = value.get(part) if isinstance(value, dict) else None
+            items = value if isinstance(value, list) else [value]
+            pattern = re.compile(regex[1:-1].replace("''", "'"), re.IGNORECASE)
+            keep = keep and any(
+                isinstance(item, str) and pattern.search(item) for item in items
+            )
+        if keep:
+            out.append(row)
+    return out
+
+
+def test_search_rechecks_match_real_client_rows():
+    rows = [
+        {
+            "client_id": "C.1",
+            "os_info": {"hostname": "WEB01", "fqdn": "web01.corp"},
+            "labels": ["Prod"],
+        },
+        {
+            "client_id": "C.2",
+            "os_info": {"hostname": "web011", "fqdn": "web011.corp"},
+            "labels": ["prod"],
+        },
+        {"client_id": "C.3", "os_info": {"hostname": "db01"}, "labels": ["production"]},
+    ]
+    plan = clients.plan_client_search(hostname="^web01$", label="^prod$")
+    assert [r["client_id"] for r in _vql_regex_filter(rows, plan.predicates)] == ["C.1"]
+    # Bare literals keep matching substrings.
+    plan = clients.plan_client_search(hostname="eb01", label="prod")
+    assert plan.search is None
+    assert [r["client_id"] for r in _vql_regex_filter(rows, plan.predicates)] == [
+        "C.1",
+        "C.2",
+    ]
+    plan = clients.plan_client_search(hostname="web*", label="prod*")
+    assert [r["client_id"] for r in _vql_regex_filter(rows, plan.predicates)] == [
+        "C.1",
+        "C.2",
+    ]
+
+
 def test_list_hunts_with_state(cfg, fake_client):
     hunts.list_hunts(cfg, state="RUNNING", limit=10)
     stmt, _ = fake_client.queries[-1]
@@ -126,7 +223,52 @@ def test_artifact_tools(cfg, fake_client):
     assert "artifact_definitions" in stmt and "Windows.Sys" in stmt
 
 
-def test_file_tools_and_download(cfg, fake_client):
+def test_collect_artifact_bulk_single_statement(cfg, fake_client):
+    fake_client.query = lambda vql_stmt, params=None, **options: (
+        fake_client.queries.append((vql_stmt, params))
+        or [{"ClientId": "C.1", "FlowId": "F.1"}, {"ClientId": "C.2", "FlowId": "F.2"}]
+    )
+    out = artifacts.collect_artifact_bulk(
+        cfg, artifact="Generic.Client.Info", client_ids=["C.1", "C.2"]
+    )
+    assert out["flows"] == {"C.1": "F.1", "C.2": "F.2"} and out["scheduled"] == 2
+    assert len(fake_client.queries) == 1
+    stmt, _ = fake_client.queries[-1]
+    assert stmt.startswith("SELECT * FROM foreach(row={SELECT client_id FROM clients()")
+    assert "collect_client(client_id=client_id" in stmt and "LIMIT 1000" in stmt
+
+    artifacts.collect_artifact_bulk(cfg, artifact="X", label="prod", params={"a": 1})
+    stmt, _ = fake_client.queries[-1]
+    assert "clients(search='label:prod')" in stmt and "parameters=dict(a='1')" in stmt
+
+    with pytest.raises(ValueError):
+        artifacts.collect_artifact_bulk(cfg, artifact="X", label="a", search="host:b")
+
+
+def test_collect_artifact_bulk_reports_missed_clients(cfg, fake_client):
+    fake_client.query = lambda vql_stmt, params=None, **options: [
+        {"ClientId": "C.1", "FlowId": "F.1"},
+        {"ClientId": "C.2", "FlowId": "F.2"},
+    ]
+    out = artifacts.collect_artifact_bulk(
+        cfg, artifact="X", client_ids=["C.1", "C.2", "C.9", "C.1"], max_clients=3
+    )
+    assert out["scheduled"] == 2 and out["unscheduled"] == ["C.9"]
+    with pytest.raises(ValueError, match="exceed max_clients"):
+        artifacts.collect_artifact_bulk(
+            cfg, artifact="X", client_ids=["C.1", "C.2", "C.3"], max_clients=2
+        )
+    out = artifacts.collect_artifact_bulk(
+        cfg, artifact="X", label="prod", max_clients=2
+    )
+    assert out["truncated"] and "unscheduled" not in out
+    out = artifacts.collect_artifact_bulk(
+        cfg, artifact="X", label="prod", max_clients=3
+    )
+    assert not out["truncated"]
+
+
+def test_file_tools_and_download(cfg, fake_client, tmp_path):
     files.list_directory(cfg, client_id="C.7", path="/tmp")
     assert "vfs_files" in fake_client.queries[-1][0]
 
@@ -141,6 +283,20 @@ def test_file_tools_and_download(cfg, fake_client):
     assert out["length"] >= 0
     assert fake_client.downloads[-1] == ("C.7", "/tmp/file.txt", 1, 2)
 
+    with pytest.raises(ValueError, match="MCP_DOWNLOAD_DIR"):
+        files.download_file(
+            cfg, client_id="C.7", path="/tmp/file.txt", dest_path="out.bin"
+        )
+    cfg = dataclasses.replace(cfg, download_dir=str(tmp_path))
+    out = files.download_file(
+        cfg, client_id="C.7", path="/tmp/file.txt", dest_path="out.bin"
+    )
+    assert out["dest_path"] == str(tmp_path / "out.bin") and "data_base64" not in out
+    with pytest.raises(ValueError):
+        files.download_file(
+            cfg, client_id="C.7", path="/tmp/file.txt", dest_path="/tmp/out.bin"
+        )
+
 
 def test_monitoring_tools(cfg, fake_client):
     with pytest.raises(RuntimeError):
@@ -153,3 +309,62 @@ def test_monitoring_tools(cfg, fake_client):
         monitoring.create_alert(
             cfg, title="t", message="m", client_id="C.5", severity="ERROR"
         )
+
+
+def test_summarize_hunt_results_groups_server_side(cfg, fake_client):
+    out = hunts.summarize_hunt_results(
+        cfg, hunt_id="H.1", group_by=["Name"], aggregates=["count", "max:Size"]
+    )
+    assert out["groups"] == [{"ok": True}]
+    stmt, _ = fake_client.queries[-1]
+    assert stmt == (
+        "SELECT Name, count() AS count, max(item=Size) AS max_Size "
+        "FROM hunt_results(hunt_id='H.1') GROUP BY Name ORDER BY count DESC LIMIT 1000"
+    )
+
+    hunts.summarize_hunt_results(cfg, hunt_id="H.1", group_by=["Name"])
+    stmt, _ = fake_client.queries[-1]
+    assert "GROUP BY Name, ClientId" in stmt
+    assert "sum(item=_n) AS count, count() AS count_distinct_ClientId" in stmt
+
+    # Dotted keys are aliased through the inner GROUP BY and renamed back.
+    stmt = hunts.summarize_hunt_vql("H.1", group_by=["os_info.hostname", "Name"])
+    assert stmt == (
+        "SELECT _g0 AS `os_info.hostname`, Name, sum(item=_n) AS count, "
+        "count() AS count_distinct_ClientId FROM foreach(row={"
+        "SELECT os_info.hostname AS _g0, Name, ClientId, count() AS _n "
+        "FROM hunt_results(hunt_id='H.1') GROUP BY _g0, Name, ClientId}) "
+        "GROUP BY _g0, Name ORDER BY count DESC LIMIT 1000"
+    )
+
+    with pytest.raises(ValueError):
+        hunts.summarize_hunt_results(cfg, hunt_id="H.1", group_by=["Name; DROP"])
+    with pytest.raises(ValueError):
+        hunts.summarize_hunt_results(
+            cfg, hunt_id="H.1", group_by=["Name"], aggregates=["avg:Size"]
+        )
+
+
+def test_columns_truncation_and_columnar_format(cfg, fake_client):
+    wide = [
+        {"client_id": "C.1", "os_info": {"blob": "x" * 500}, "Hostname": "h1"},
+        {"client_id": "C.2", "os_info": {"blob": "y" * 500}, "Hostname": "h2"},
+    ]
+    fake_client.query = lambda vql_stmt, params=None, **options: (
+        fake_client.queries.append((vql_stmt, params)) or iter(wide)
+    )
+
+    out = clients.list_clients(cfg, limit=2, columns=["Hostname"], format="columnar")
+    stmt, _ = fake_client.queries[-1]
+    assert stmt.startswith("SELECT Hostname, client_id FROM clients()")
+    assert out["clients"]["columns"] == ["Hostname", "client_id"]
+    assert out["clients"]["rows"][0] == ["h1", "C.1"]
+    assert out["next_cursor"]
+
+    out = vql.query_vql(cfg, "SELECT * FROM clients()", max_field_bytes=20)
+    blob = out["rows"][0]["os_info"]
+    assert blob.startswith('{"blob": "xxx') and blob.endswith("[truncated 492 bytes]")
+    assert out["rows"][0]["Hostname"] == "h1"
+
+    with pytest.raises(ValueError):
+        clients.list_clients(cfg, columns=["client_id FROM x"])
@@ -0,0 +1,103 @@
+from __future__ import annotations
+
+import re
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+from mcp_server.config import load_config
+from mcp_server.tools import files
+
+TREE = {
+    "/file/C:": [
+        {"Name": "Windows", "IsDir": True},
+        {"Name": "boot.ini", "IsDir": False},
+    ],
+    "/file/C:/Windows": [
+        {"Name": "System32", "Mode": "drwxr-xr-x"},
+        {"Name": "Temp", "Mode": "drwxr-xr-x"},
+        {"Name": "notepad.exe", "Mode": "-rw-r--r--", "Size": 1024},
+    ],
+    "/file/C:/Windows/System32": [
+        {"Name": f"f{i}.dll", "IsDir": False} for i in range(5)
+    ],
+    "/file/C:/Windows/Temp": [{"Name": "x.tmp", "IsDir": False}],
+}
+
+
+class FakeVFSClient:
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+        self.paths = []
+        self.listeners = []
+        self.active = 0
+        self.peak = 0
+        self._lock = threading.Lock()
+
+    def query(self, vql_stmt, params=None, **options):
+        path = re.search(r"path='([^']*)'", vql_stmt).group(1).rstrip("/")
+        with self._lock:
+            self.paths.append(path)
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+        time.sleep(self.delay)
+        with self._lock:
+            self.active -= 1
+        return iter(TREE.get(path, []))
+
+    def on_flow_completion(self, listener):
+        self.listeners.append(listener)
+
+
+@pytest.fixture()
+def cfg(tmp_path: Path, monkeypatch):
+    api_cfg = tmp_path / "api.config.yaml"
+    api_cfg.write_text("dummy: true")
+    monkeypatch.setenv("MCP_VFS_CACHE_TTL", "60")
+    return load_config(default_path=api_cfg)
+
+
+def test_listing_cache_and_file_info_from_parent(cfg, monkeypatch):
+    client = FakeVFSClient()
+    monkeypatch.setattr(files, "get_client", lambda _cfg: client)
+
+    files.list_directory(cfg, client_id="C.1", path="/file/C:/Windows/")
+    files.list_directory(cfg, client_id="C.1", path="/file/C:/Windows")
+    info = files.get_file_info(
+        cfg, client_id="C.1", path="/file/C:/Windows/notepad.exe"
+    )
+    assert info["info"] == [TREE["/file/C:/Windows"][2]]
+    assert client.paths == ["/file/C:/Windows"]
+
+    # A finished VFS flow for the client drops its listings.
+    client.listeners[0](
+        {
+            "ClientId": "C.1",
+            "Flow": {"artifacts_with_results": ["System.VFS.ListDirectory"]},
+        }
+    )
+    files.list_directory(cfg, client_id="C.1", path="/file/C:/Windows")
+    assert client.paths == ["/file/C:/Windows"] * 2
+
+
+def test_walk_directory_breadth_first_with_budgets(cfg, monkeypatch):
+    client = FakeVFSClient(delay=0.05)
+    monkeypatch.setattr(files, "get_client", lambda _cfg: client)
+
+    out = files.walk_directory(cfg, client_id="C.2", path="/file/C:", max_depth=5)
+    assert not out["truncated"] and out["directories_listed"] == 4
+    assert [e["Depth"] for e in out["entries"]] == sorted(
+        e["Depth"] for e in out["entries"]
+    )
+    paths = {e["Path"] for e in out["entries"]}
+    assert "/file/C:/Windows/System32/f4.dll" in paths and len(paths) == 11
+    # System32 and Temp were listed concurrently.
+    assert client.peak == 2
+
+    shallow = files.walk_directory(cfg, client_id="C.3", path="/file/C:", max_depth=1)
+    assert shallow["truncated"] and len(shallow["entries"]) == 2
+
+    capped = files.walk_directory(cfg, client_id="C.4", path="/file/C:", max_nodes=4)
+    assert capped["truncated"] and len(capped["entries"]) == 4